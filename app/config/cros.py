@@ -9,4 +9,6 @@ def add_cors_middleware(app):
         allow_methods=["*"],
         allow_headers=["*"],
         allow_origin_regex="https?://.*localhost.*",
+        # Заголовки, которые фронтенд читает из ответа (постраничный вывод, кэш отчётов)
+        expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "Retry-After", "Content-Disposition"],
     )
\ No newline at end of file
@@ -0,0 +1,7 @@
+import os
+
+# Массовый импорт сотрудников и отпусков
+# Сколько строк вставлять одним executemany
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+# Максимум строк в одном файле импорта
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "20000"))
@@ -0,0 +1,15 @@
+import os
+
+# Рассылка сброса кэшей между воркерами uvicorn
+# Транспорт: auto (postgres для asyncpg, file для SQLite), postgres, file, memory (один процесс)
+INVALIDATION_BACKEND = os.getenv("INVALIDATION_BACKEND", "auto")
+# Канал LISTEN/NOTIFY в PostgreSQL
+INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL", "cache_invalidation")
+# Общий файл сообщений для транспорта file (все воркеры должны видеть один и тот же файл)
+INVALIDATION_FILE = os.getenv("INVALIDATION_FILE", "./cache_invalidation.log")
+# Как часто воркер проверяет файл сообщений, секунды
+INVALIDATION_POLL_INTERVAL = float(os.getenv("INVALIDATION_POLL_INTERVAL", "1"))
+# Размер файла сообщений, после которого он начинается заново
+INVALIDATION_FILE_MAX_BYTES = int(os.getenv("INVALIDATION_FILE_MAX_BYTES", "1048576"))
+# Пауза перед повторным подключением к PostgreSQL, секунды
+INVALIDATION_RECONNECT_DELAY = float(os.getenv("INVALIDATION_RECONNECT_DELAY", "5"))
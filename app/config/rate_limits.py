@@ -0,0 +1,29 @@
+import os
+
+# Ограничение попыток входа (/users/login)
+LOGIN_RATE_LIMIT_ENABLED = os.getenv("LOGIN_RATE_LIMIT_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+# Хранилище счётчиков: memory (в памяти процесса, отклонённая попытка не обращается к базе),
+# database (общая таблица для всех воркеров, каждая попытка — запись в базу)
+LOGIN_RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "memory")
+
+# Адреса обратных прокси (через запятую, можно подсети: 10.0.0.0/8). Для запросов
+# от них адрес клиента берётся из X-Forwarded-For; пусто — заголовок не используется
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "")
+
+# Корзина токенов на логин: запас попыток и пополнение в минуту
+LOGIN_PER_LOGIN_BURST = int(os.getenv("LOGIN_PER_LOGIN_BURST", "5"))
+LOGIN_PER_LOGIN_PER_MINUTE = float(os.getenv("LOGIN_PER_LOGIN_PER_MINUTE", "5"))
+# Корзина токенов на IP-адрес
+LOGIN_PER_IP_BURST = int(os.getenv("LOGIN_PER_IP_BURST", "20"))
+LOGIN_PER_IP_PER_MINUTE = float(os.getenv("LOGIN_PER_IP_PER_MINUTE", "30"))
+
+# Блокировка логина: столько неудачных попыток за окно (с) блокирует вход на LOGIN_LOCKOUT_SECONDS
+# (memory — скользящее окно, database — окно от первой неудачной попытки)
+LOGIN_LOCKOUT_THRESHOLD = int(os.getenv("LOGIN_LOCKOUT_THRESHOLD", "10"))
+LOGIN_LOCKOUT_WINDOW = float(os.getenv("LOGIN_LOCKOUT_WINDOW", "900"))
+LOGIN_LOCKOUT_SECONDS = float(os.getenv("LOGIN_LOCKOUT_SECONDS", "900"))
+
+# Сколько ключей (логинов и адресов) держать в памяти, прежде чем удалять неактивные
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Как часто удалять из таблицы неактивные счётчики, секунды
+RATE_LIMIT_PURGE_INTERVAL = float(os.getenv("RATE_LIMIT_PURGE_INTERVAL", "60"))
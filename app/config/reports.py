@@ -0,0 +1,23 @@
+import os
+
+# Настройки пула генерации отчётов (DOCX/PDF)
+# Тип пула: "thread" или "process"
+REPORT_EXECUTOR_KIND = os.getenv("REPORT_EXECUTOR_KIND", "thread")
+# Количество одновременно формируемых отчётов
+REPORT_MAX_WORKERS = int(os.getenv("REPORT_MAX_WORKERS", "2"))
+# Сколько отчётов может ждать в очереди, прежде чем отвечать 503
+REPORT_MAX_QUEUE = int(os.getenv("REPORT_MAX_QUEUE", "8"))
+# Значение заголовка Retry-After (секунды) при переполнении очереди
+REPORT_RETRY_AFTER = int(os.getenv("REPORT_RETRY_AFTER", "5"))
+# Каталог для готовых отчётов (кэш на диске)
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", "./report_cache")
+# Сколько завершённых заданий на формирование отчётов хранить в базе
+REPORT_MAX_JOBS = int(os.getenv("REPORT_MAX_JOBS", "500"))
+# Аренда задания воркером, секунды: продлевается, пока отчёт строится;
+# задание воркера, который остановился, после её окончания достраивает другой
+REPORT_JOB_LEASE = float(os.getenv("REPORT_JOB_LEASE", "60"))
+# Сколько задание ждёт освобождения переполненного пула, секунды; затем задание завершается ошибкой
+REPORT_JOB_BUSY_TIMEOUT = float(os.getenv("REPORT_JOB_BUSY_TIMEOUT", "300"))
+# TTF-шрифты с кириллицей для PDF (если файл не найден, ищется DejaVu в системных каталогах)
+REPORT_PDF_FONT = os.getenv("REPORT_PDF_FONT", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+REPORT_PDF_FONT_BOLD = os.getenv("REPORT_PDF_FONT_BOLD", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
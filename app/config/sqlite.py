@@ -0,0 +1,77 @@
+import asyncio
+import os
+import weakref
+from sqlalchemy import event
+from sqlalchemy.util import await_only
+
+# Режим SQLite для нескольких одновременных запросов
+# WAL: чтения не блокируются записью
+SQLITE_WAL = os.getenv("SQLITE_WAL", "true").strip().lower() in ("1", "true", "yes", "on")
+# NORMAL в режиме WAL безопасен и заметно быстрее FULL
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# Размер кэша страниц (отрицательное значение — в КиБ)
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))
+# Сколько байт файла базы читать через mmap
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Ожидание блокировки другим процессом, мс
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+# Пропускать пишущие транзакции по одной (очередь писателей внутри процесса)
+SQLITE_SINGLE_WRITER = os.getenv("SQLITE_SINGLE_WRITER", "true").strip().lower() in ("1", "true", "yes", "on")
+
+WRITE_LOCK_KEY = "sqlite_write_lock"
+
+# Очередь писателей: отдельная блокировка на каждый event loop
+_write_locks = weakref.WeakKeyDictionary()
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """PRAGMA для каждого нового соединения SQLite"""
+    cursor = dbapi_connection.cursor()
+    if SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _write_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _write_locks.get(loop)
+    if lock is None:
+        lock = _write_locks[loop] = asyncio.Lock()
+    return lock
+
+
+def _acquire_before_write(conn, cursor, statement, parameters, context, executemany):
+    """Дождаться очереди перед первым INSERT/UPDATE/DELETE транзакции.
+
+    SQLite допускает одного писателя: вместо опроса блокировки
+    (и ошибки "database is locked" по таймауту) транзакции ждут по очереди
+    в порядке поступления. Чтения в режиме WAL идут параллельно и очереди не ждут.
+    """
+    if context is None or not (context.isinsert or context.isupdate or context.isdelete):
+        return
+    if WRITE_LOCK_KEY not in conn.info:
+        lock = _write_lock()
+        # Код движка выполняется внутри greenlet AsyncEngine, поэтому можно дождаться очереди
+        await_only(lock.acquire())
+        conn.info[WRITE_LOCK_KEY] = lock
+
+
+def _release_on_checkin(dbapi_connection, connection_record):
+    """Освободить очередь, когда соединение после commit/rollback вернулось в пул"""
+    lock = connection_record.info.pop(WRITE_LOCK_KEY, None)
+    if lock is not None:
+        lock.release()
+
+
+def configure_sqlite_engine(async_engine, single_writer: bool = SQLITE_SINGLE_WRITER):
+    """Включить PRAGMA на всех соединениях движка и очередь писателей"""
+    sync_engine = async_engine.sync_engine
+    event.listen(sync_engine, "connect", set_sqlite_pragmas)
+    if single_writer:
+        event.listen(sync_engine, "before_cursor_execute", _acquire_before_write)
+        event.listen(sync_engine.pool, "checkin", _release_on_checkin)
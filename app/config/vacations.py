@@ -0,0 +1,4 @@
+import os
+
+# Максимум одновременно отсутствующих сотрудников в отделе (0 — без ограничения)
+VACATION_MAX_CONCURRENT_PER_DEPARTMENT = int(os.getenv("VACATION_MAX_CONCURRENT_PER_DEPARTMENT", "0"))
@@ -4,7 +4,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload  # Добавлено
 
 from app.config.cros import add_cors_middleware
-from app.config.database import async_engine, Base, get_db
+from app.config.database import async_engine, AsyncSessionLocal, Base, get_db, create_missing_indexes
 from app import models
 from app.schemas import role_s as role_schema
 from app.routers import role as role_router
@@ -15,6 +15,15 @@ from app.routers import staff as staff_router
 from app.routers import vacation_schedule as vacation_router
 from app.routers import user as user_router
 from app.routers import generate_pdf as generate_pdf_router
+from app.utils.docx_reports import report_executor
+from app.utils.password import password_executor
+from app.utils.report_jobs import report_jobs
+from app.utils.hierarchy import ensure_staff_hierarchy
+from app.utils.dictionaries import DICTIONARIES_TOPIC, dictionary_cache
+from app.utils.invalidation import invalidation_bus
+from app.utils.auth import PRINCIPALS_TOPIC, principal_cache
+from app.utils.revocation import REVOCATIONS_TOPIC, revocation_list
+from app.utils.permissions import SYSTEM_MONITOR, require
 from fastapi.security import OAuth2PasswordBearer
 
 
@@ -32,7 +41,30 @@ add_cors_middleware(app)
 async def startup_event():
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_indexes)
+    # Таблица замыкания иерархии подчинения заполняется из supervisor_id при первом запуске
+    async with AsyncSessionLocal() as db:
+        await ensure_staff_hierarchy(db)
+        # Справочники загружаются в кэш заранее, чтобы первые запросы не ждали
+        await dictionary_cache.load(db)
+        # Отозванные токены: проверка при каждом запросе идёт по списку в памяти
+        await revocation_list.load(db)
 
+    # Сообщения о сбросе кэшей от остальных воркеров
+    invalidation_bus.subscribe(DICTIONARIES_TOPIC, dictionary_cache.on_invalidation)
+    invalidation_bus.subscribe(DICTIONARIES_TOPIC, principal_cache.on_dictionaries_invalidation)
+    invalidation_bus.subscribe(PRINCIPALS_TOPIC, principal_cache.on_invalidation)
+    invalidation_bus.subscribe(REVOCATIONS_TOPIC, revocation_list.on_invalidation)
+    await invalidation_bus.start()
+
+
+# Останавливаем задания и пул генерации отчётов
+@app.on_event("shutdown")
+async def shutdown_event():
+    await invalidation_bus.stop()
+    await report_jobs.shutdown()
+    report_executor.shutdown()
+    password_executor.shutdown()
 
 
 # Подключаем роутеры
@@ -46,6 +78,15 @@ app.include_router(user_router.router)
 app.include_router(generate_pdf_router.router)
 
 
+# Состояние пулов: задачи в работе и в очереди, отказы, время ожидания и выполнения
+@app.get("/executors/stats", dependencies=[Depends(require(SYSTEM_MONITOR))])
+def read_executors_stats():
+    return {
+        "reports": report_executor.stats(),
+        "passwords": password_executor.stats(),
+    }
+
+
 @app.get("/")
 def read_root():
     return {"test": "v1.0"}
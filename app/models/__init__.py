@@ -6,6 +6,12 @@ from .position_s import Position_s
 from .staff import Staff
 from .user import User
 from .vacation_schedule import VacationSchedule
+from .report_data_version import ReportDataVersion
+from .staff_hierarchy import StaffHierarchy
+from .data_scope_version import DataScopeVersion
+from .revoked_token import RevokedToken
+from .rate_limit_counter import RateLimitCounter
+from .report_job import ReportJob
 
 # Экспортируем все модели для создания таблиц
 __all__ = ["Role_s", 
@@ -15,4 +21,10 @@ __all__ = ["Role_s",
            "Staff", 
            "Base", 
            "VacationSchedule", 
-           "User"]
\ No newline at end of file
+           "User",
+           "ReportDataVersion",
+           "StaffHierarchy",
+           "DataScopeVersion",
+           "RevokedToken",
+           "RateLimitCounter",
+           "ReportJob"]
\ No newline at end of file
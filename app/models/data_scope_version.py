@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String
+from app.config.database import Base
+
+class DataScopeVersion(Base):
+    """Счётчик изменений данных по области (сотрудники, отпуска, справочники) для ETag"""
+    __tablename__ = "data_scope_versions"
+
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
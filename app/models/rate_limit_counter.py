@@ -0,0 +1,16 @@
+from sqlalchemy import Boolean, Column, Float, Integer, String
+from app.config.database import Base
+
+class RateLimitCounter(Base):
+    """Счётчики ограничения попыток входа, общие для всех воркеров"""
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String, primary_key=True)
+    # Корзина токенов: остаток, время обновления (с от эпохи), результат последнего запроса
+    tokens = Column(Float, nullable=False, default=0)
+    updated_at = Column(Float, nullable=False, index=True)
+    allowed = Column(Boolean, nullable=False, default=False)
+    # Неудачные попытки в текущем окне и блокировка
+    failures = Column(Integer, nullable=False, default=0)
+    window_start = Column(Float, nullable=False, default=0)
+    locked_until = Column(Float, nullable=False, default=0)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer
+from app.config.database import Base
+
+class ReportDataVersion(Base):
+    """Счётчик изменений данных, попадающих в графики отпусков"""
+    __tablename__ = "report_data_versions"
+
+    # 0 — изменение затрагивает все отделы (например, переименование должности)
+    department_id = Column(Integer, primary_key=True, autoincrement=False)
+    # 0 — изменение затрагивает все годы (например, изменение данных сотрудника)
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
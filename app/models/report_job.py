@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, Float, Integer, String
+from app.config.database import Base
+
+class ReportJob(Base):
+    """Задание на формирование отчёта, видимое всем воркерам"""
+    __tablename__ = "report_jobs"
+
+    id = Column(String(32), primary_key=True)
+    report_type = Column(String, nullable=False)
+    department_id = Column(Integer, nullable=True)
+    year = Column(Integer, nullable=False)
+    format = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending | running | done | failed
+    error = Column(String, nullable=True)
+    # Путь к готовому файлу в каталоге кэша отчётов
+    path = Column(String, nullable=True)
+    filename = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    finished_at = Column(DateTime, nullable=True)
+    # До какого момента (с от эпохи) задание закреплено за воркером; просроченное забирает другой
+    lease_until = Column(Float, nullable=False, default=0)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+from app.config.database import Base
+
+class RevokedToken(Base):
+    """Отозванный токен (jti) или сессия (sid) до окончания срока действия"""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    # Время окончания действия, секунды от эпохи: после него запись не нужна
+    expires_at = Column(Integer, nullable=False, index=True)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from app.config.database import Base
+
+class StaffHierarchy(Base):
+    """Таблица замыкания иерархии подчинения: все пары (начальник, подчинённый) любого уровня"""
+    __tablename__ = "staff_hierarchy"
+    __table_args__ = (
+        # Поиск всех начальников сотрудника (при переносе поддерева)
+        Index("ix_staff_hierarchy_descendant", "descendant_id", "depth"),
+    )
+
+    ancestor_id = Column(Integer, ForeignKey("staff.id"), primary_key=True, autoincrement=False)
+    descendant_id = Column(Integer, ForeignKey("staff.id"), primary_key=True, autoincrement=False)
+    # 0 — сам сотрудник, 1 — прямой подчинённый и т.д.
+    depth = Column(Integer, nullable=False)
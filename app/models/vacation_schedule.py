@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, Date, ForeignKey
+from sqlalchemy import Column, Integer, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.config.database import Base
 
 class VacationSchedule(Base):
     __tablename__ = "vacation_schedules"
+    __table_args__ = (
+        # Поиск пересекающихся отпусков сотрудника диапазонным запросом
+        Index("ix_vacation_schedules_staff_period", "staff_id", "start_date", "end_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     staff_id = Column(Integer, ForeignKey("staff.id"), nullable=False)
@@ -1,21 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.config.database import get_db
 from app import models
 from app.schemas import department_s as department_schema
+from app.utils.pagination import Page, page_params, paginate
+from app.utils.permissions import DICTIONARIES_READ, DICTIONARIES_WRITE, require
+from app.utils.data_versions import DICTIONARIES_SCOPE, bump_report_versions, bump_scope_versions
+from app.utils.dictionaries import DEPARTMENTS, invalidate_dictionary
 
 # Создаем роутер для должностей
 router = APIRouter(
     prefix="/departments",
-    tags=["department"]  # Для документации
+    tags=["department"],  # Для документации
+    dependencies=[Depends(require(DICTIONARIES_READ))]
 )
 
 # Получение всех должностей
 @router.get("/",response_model=list[department_schema.Department])
-async def read_departments(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Department_s).offset(skip).limit(limit))
-    departments = result.scalars().all()
+async def read_departments(
+    response: Response,
+    page: Page = Depends(page_params),
+    db: AsyncSession = Depends(get_db)
+):
+    departments = await paginate(db, select(models.Department_s), models.Department_s.id, page, response)
     return departments
 
 
@@ -31,7 +39,7 @@ async def read_rdepartments(departments_id: int, db:AsyncSession = Depends(get_d
     
     
 # Создание должности
-@router.post("/", response_model=department_schema.Department)
+@router.post("/", response_model=department_schema.Department, dependencies=[Depends(require(DICTIONARIES_WRITE))])
 async def create_deportament(deportament:department_schema.DepartmentCreate, db: AsyncSession = Depends(get_db)):
     # Проверяем существование
     result = await db.execute(select(models.Department_s).where(models.Department_s.name == deportament.name))
@@ -42,12 +50,17 @@ async def create_deportament(deportament:department_schema.DepartmentCreate, db:
     
     new_deportament= models.Department_s(name=deportament.name)
     db.add(new_deportament)
+    await db.flush()
+    # Новый отдел появляется в графике отпусков всех отделов
+    await bump_report_versions(db, [new_deportament.id])
+    await bump_scope_versions(db, DICTIONARIES_SCOPE)
     await db.commit()
+    await invalidate_dictionary(DEPARTMENTS)
     await db.refresh(new_deportament)
     return new_deportament
 
 # Обновление должности
-@router.put("/{departments_id}", response_model=department_schema.Department)
+@router.put("/{departments_id}", response_model=department_schema.Department, dependencies=[Depends(require(DICTIONARIES_WRITE))])
 async def update_role(
     departments_id: int, 
     departments: department_schema.DepartmentUpdate, 
@@ -69,13 +82,16 @@ async def update_role(
     
     # Обновляем данные
     db_departments.name = departments.name
+    await bump_report_versions(db, [db_departments.id])
+    await bump_scope_versions(db, DICTIONARIES_SCOPE)
     await db.commit()
+    await invalidate_dictionary(DEPARTMENTS)
     await db.refresh(db_departments)
     return db_departments
 
 
 # Удаление должности
-@router.delete("/{departments_id}")
+@router.delete("/{departments_id}", dependencies=[Depends(require(DICTIONARIES_WRITE))])
 async def delete_departments(departments_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.Department_s).where(models.Department_s.id == departments_id))
     departments = result.scalar_one_or_none()
@@ -83,6 +99,9 @@ async def delete_departments(departments_id: int, db: AsyncSession = Depends(get
     if departments is None:
         raise HTTPException(status_code=404, detail="Role not found")
     
+    await bump_report_versions(db, [departments.id])
     await db.delete(departments)
+    await bump_scope_versions(db, DICTIONARIES_SCOPE)
     await db.commit()
+    await invalidate_dictionary(DEPARTMENTS)
     return {"message": "Role deleted successfully"}
\ No newline at end of file
@@ -1,203 +1,244 @@
-from fastapi import FastAPI, HTTPException, APIRouter, Depends
-from fastapi.responses import StreamingResponse
+import os
+from pathlib import Path
+from typing import BinaryIO, Optional, Literal
+from fastapi import FastAPI, HTTPException, APIRouter, Depends, Header, Query
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from app.config.database import get_db
-from app import models
-from sqlalchemy.orm import selectinload
-from io import BytesIO
-from docx import Document
-from docx.shared import Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH  # ✅ Добавьте это
-import asyncio
+from app.config.reports import REPORT_RETRY_AFTER
+from app.schemas import report as report_schema
+from app.utils.executor import ExecutorBusy
+from app.utils.docx_reports import report_executor
+from app.utils.report_data import ReportNotFound, load_departments, get_department_name
+from app.utils.calendar_report import SCALE_DAY, vacation_calendar_chunks
+from app.utils.data_versions import get_report_version
+from app.utils.etags import etag_matches
+from app.utils.permissions import REPORTS_GENERATE, require
+from app.utils.report_jobs import (
+    REPORT_DEPARTMENT,
+    REPORT_ALL,
+    FORMAT_DOCX,
+    FORMAT_XLSX,
+    MEDIA_TYPES,
+    all_departments_docx_chunks,
+    open_report,
+    report_cache,
+    report_etag,
+    report_filename,
+    report_jobs,
+)
+
+# Размер части при отдаче готового файла отчёта
+FILE_CHUNK_SIZE = 64 * 1024
 
 router = APIRouter(
     prefix="/generate_pdf",
-    tags=["generate_pdf"]
+    tags=["generate_pdf"],
+    dependencies=[Depends(require(REPORTS_GENERATE))]
 )
 
-@router.post("/generate-vacation-schedule-docx/")
-async def generate_vacation_schedule_docx(department_id: int, year: int, db: AsyncSession = Depends(get_db)):
+async def render_in_pool(func, *args):
+    """Построение документа в пуле; при переполнении очереди — 503"""
     try:
-        # Получаем имя отдела
-        dept_result = await db.execute(
-            select(models.Department_s).where(models.Department_s.id == department_id)
+        return await report_executor.run(func, *args)
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Сервер занят формированием отчётов, повторите запрос позже",
+            headers={"Retry-After": str(REPORT_RETRY_AFTER)},
         )
-        department = dept_result.scalar_one_or_none()
 
-        if not department:
-            raise HTTPException(status_code=404, detail="Отдел не найден")
 
-        # Выполняем запрос к базе
-        result = await db.execute(
-            select(models.VacationSchedule)
-            .options(
-                selectinload(models.VacationSchedule.staff)
-                .selectinload(models.Staff.position)
-            )
-            .join(models.Staff)
-            .where(
-                models.Staff.department_id == department_id,
-                models.VacationSchedule.start_date >= f"{year}-01-01",
-                models.VacationSchedule.end_date <= f"{year}-12-31"
-            )
-        )
-        vacations_db = result.scalars().all()
-
-        if not vacations_db:
-            raise HTTPException(status_code=404, detail="Нет данных об отпусках для выбранного отдела и года")
-
-        # Создаём документ
-        doc = Document()
-
-        # Заголовок "График отпусков за {year} год" по центру
-        heading1 = doc.add_paragraph()
-        heading1.alignment = WD_ALIGN_PARAGRAPH.CENTER  # ✅ Центрируем
-        heading1.add_run(f'График отпусков за {year} год').bold = True
-
-        # Заголовок "отдел: {department.name}" по центру
-        heading2 = doc.add_paragraph()
-        heading2.alignment = WD_ALIGN_PARAGRAPH.CENTER  # ✅ Центрируем
-        heading2.add_run(f'отдел: {department.name}').bold = True
-
-        # Добавляем таблицу
-        table = doc.add_table(rows=1, cols=6)
-        hdr_cells = table.rows[0].cells
-        hdr_cells[0].text = 'Должность'
-        hdr_cells[1].text = 'Фамилия'
-        hdr_cells[2].text = 'Имя'
-        hdr_cells[3].text = 'Отчество'
-        hdr_cells[4].text = 'Кол-во дней'
-        hdr_cells[5].text = 'Период отпуска'
-
-        # Центрируем текст в заголовках таблицы (опционально)
-        for cell in hdr_cells:
-            for paragraph in cell.paragraphs:
-                paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        for vac in vacations_db:
-            row_cells = table.add_row().cells
-            row_cells[0].text = vac.staff.position.name if vac.staff.position else "Не указана"
-            row_cells[1].text = vac.staff.last_name
-            row_cells[2].text = vac.staff.first_name
-            row_cells[3].text = vac.staff.middle_name or ""
-            row_cells[4].text = str(vac.main_vacation_days)
-            row_cells[5].text = f"{vac.start_date.strftime('%d.%m.%Y')} - {vac.end_date.strftime('%d.%m.%Y')}"
-
-        # Подпись внизу по центру
-        doc.add_paragraph()  # пустая строка перед подписью
-        signature = doc.add_paragraph()
-        signature.add_run('Начальник отдела: _____________________________')
-
-        # Сохраняем в BytesIO
-        buffer = BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-
-        # Возвращаем файл
+def _file_chunks(file: BinaryIO):
+    with file:
+        while chunk := file.read(FILE_CHUNK_SIZE):
+            yield chunk
+
+
+def report_file_response(file: BinaryIO, filename: str, fmt: str, etag: Optional[str] = None) -> StreamingResponse:
+    """Отдать открытый файл отчёта: его можно дочитать, даже если файл удалят из кэша"""
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Content-Length": str(os.fstat(file.fileno()).st_size),
+    }
+    if etag:
+        headers["ETag"] = etag
+    # Файл закрывается и при обрыве соединения
+    return StreamingResponse(
+        _file_chunks(file), media_type=MEDIA_TYPES[fmt], headers=headers, background=BackgroundTask(file.close)
+    )
+
+
+async def report_response(
+    db,
+    report_type: str,
+    department_id: Optional[int],
+    year: int,
+    fmt: str,
+    if_none_match: Optional[str],
+):
+    """Ответ с отчётом: 304 по ETag, файл из кэша или новый документ"""
+    version = await get_report_version(db, year, department_id)
+    etag = report_etag(report_type, department_id, year, version, fmt)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    if (
+        report_type == REPORT_ALL
+        and fmt == FORMAT_DOCX
+        and report_cache.get(REPORT_ALL, None, year, version) is None
+    ):
+        # Большой отчёт отдаём по мере построения, параллельно сохраняя в кэш
+        departments = await load_departments(db)
+        chunks = all_departments_docx_chunks(year, departments)
         return StreamingResponse(
-            buffer,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            report_cache.stream_into(REPORT_ALL, None, year, version, chunks),
+            media_type=MEDIA_TYPES[FORMAT_DOCX],
             headers={
-                "Content-Disposition": f"attachment; filename=grafik_otpuska_{year}_{department.name}.docx"
+                "Content-Disposition": f"attachment; filename={report_filename(REPORT_ALL, year)}",
+                "ETag": etag,
             }
         )
 
+    file, filename = await open_report(
+        db, report_type, department_id, year, render_in_pool, version=version, fmt=fmt
+    )
+    return report_file_response(file, filename, fmt, etag)
+
+
+@router.post("/generate-vacation-schedule-docx/")
+async def generate_vacation_schedule_docx(
+    department_id: int,
+    year: int,
+    output_format: Literal["docx", "pdf"] = Query("docx", alias="format"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        # Готовый отчёт берётся из кэша, если данные не менялись
+        return await report_response(db, REPORT_DEPARTMENT, department_id, year, output_format, if_none_match)
+
+    except ReportNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ошибка генерации DOCX: {str(e)}")
-    
-    
-    
-    
+        raise HTTPException(status_code=500, detail=f"Ошибка генерации {output_format.upper()}: {str(e)}")
+
+
+
+
 
 @router.post("/generate-all-departments-schedule-docx/")
-async def generate_all_departments_schedule_docx(year: int, db: AsyncSession = Depends(get_db)):
+async def generate_all_departments_schedule_docx(
+    year: int,
+    output_format: Literal["docx", "pdf"] = Query("docx", alias="format"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
     try:
-        # Получаем все отделы
-        dept_result = await db.execute(
-            select(models.Department_s)
-        )
-        departments = dept_result.scalars().all()
-
-        if not departments:
-            raise HTTPException(status_code=404, detail="Нет отделов в системе")
-
-        # Создаём документ
-        doc = Document()
-        doc.add_heading(f'График отпусков за {year} год (все отделы)', 0)
-
-        for dept in departments:
-            # Заголовок отдела
-            dept_heading = doc.add_paragraph()
-            dept_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            dept_heading.add_run(f'Отдел: {dept.name}').bold = True
-
-            # Запрос отпусков для отдела
-            result = await db.execute(
-                select(models.VacationSchedule)
-                .options(
-                    selectinload(models.VacationSchedule.staff)
-                    .selectinload(models.Staff.position)
-                )
-                .join(models.Staff)
-                .where(
-                    models.Staff.department_id == dept.id,
-                    models.VacationSchedule.start_date >= f"{year}-01-01",
-                    models.VacationSchedule.end_date <= f"{year}-12-31"
-                )
-            )
-            vacations_db = result.scalars().all()
-
-            if not vacations_db:
-                # Если нет отпусков — пропускаем
-                doc.add_paragraph('Нет данных об отпусках.')
-            else:
-                # Добавляем таблицу
-                table = doc.add_table(rows=1, cols=6)
-                hdr_cells = table.rows[0].cells
-                hdr_cells[0].text = 'Должность'
-                hdr_cells[1].text = 'Фамилия'
-                hdr_cells[2].text = 'Имя'
-                hdr_cells[3].text = 'Отчество'
-                hdr_cells[4].text = 'Кол-во дней'
-                hdr_cells[5].text = 'Период отпуска'
-
-                # Центрируем заголовки таблицы (опционально)
-                for cell in hdr_cells:
-                    for paragraph in cell.paragraphs:
-                        paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-                for vac in vacations_db:
-                    row_cells = table.add_row().cells
-                    row_cells[0].text = vac.staff.position.name if vac.staff.position else "Не указана"
-                    row_cells[1].text = vac.staff.last_name
-                    row_cells[2].text = vac.staff.first_name
-                    row_cells[3].text = vac.staff.middle_name or ""
-                    row_cells[4].text = str(vac.main_vacation_days)
-                    row_cells[5].text = f"{vac.start_date.strftime('%d.%m.%Y')} - {vac.end_date.strftime('%d.%m.%Y')}"
-
-            # Разделитель между отделами
-            doc.add_page_break()  # или doc.add_paragraph() для пустой строки
-
-        # Подпись внизу (опционально — можно убрать или оставить на последней странице)
-        # doc.add_paragraph()
-        # signature = doc.add_paragraph()
-        # signature.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        # signature.add_run('Начальник отдела: _____________________________')
-
-        # Сохраняем в BytesIO
-        buffer = BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-
-        # Возвращаем файл
+        # Готовый отчёт берётся из кэша, если данные не менялись
+        return await report_response(db, REPORT_ALL, None, year, output_format, if_none_match)
+
+    except ReportNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка генерации {output_format.upper()}: {str(e)}")
+
+
+# Годовой календарь отпусков (сотрудник × день/неделя) в XLSX
+@router.post("/generate-vacation-calendar-xlsx/")
+async def generate_vacation_calendar_xlsx(
+    year: int,
+    department_id: Optional[int] = None,
+    scale: Literal["day", "week"] = SCALE_DAY,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        report_type = f"calendar-{scale}"
+        version = await get_report_version(db, year, department_id)
+        etag = report_etag(report_type, department_id, year, version, FORMAT_XLSX)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        if department_id is not None:
+            department_name = await get_department_name(db, department_id)
+            filename = f"kalendar_otpuskov_{year}_{department_name}.xlsx"
+        else:
+            filename = f"kalendar_otpuskov_{year}.xlsx"
+
+        path = report_cache.get(report_type, department_id, year, version, FORMAT_XLSX)
+        file = report_cache.open(path) if path is not None else None
+        if file is not None:
+            return report_file_response(file, filename, FORMAT_XLSX, etag)
+
+        # Календарь отдаём по мере построения, параллельно сохраняя в кэш
+        chunks = vacation_calendar_chunks(year, scale, department_id)
         return StreamingResponse(
-            buffer,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            report_cache.stream_into(report_type, department_id, year, version, chunks, FORMAT_XLSX),
+            media_type=MEDIA_TYPES[FORMAT_XLSX],
             headers={
-                "Content-Disposition": f"attachment; filename=grafik_otpuska_all_departments_{year}.docx"
+                "Content-Disposition": f"attachment; filename={filename}",
+                "ETag": etag,
             }
         )
 
+    except ReportNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ошибка генерации DOCX: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Ошибка генерации XLSX: {str(e)}")
+
+
+def job_response(job) -> report_schema.ReportJobResponse:
+    response = report_schema.ReportJobResponse.model_validate(job)
+    if job.status == "done":
+        response.download_url = router.url_path_for("download_report_job", job_id=job.id)
+    return response
+
+
+# Постановка задания на формирование отчёта
+@router.post("/jobs/", response_model=report_schema.ReportJobResponse, status_code=202)
+async def create_report_job(job_request: report_schema.ReportJobCreate):
+    if job_request.report_type == REPORT_DEPARTMENT and job_request.department_id is None:
+        raise HTTPException(status_code=400, detail="Не указан отдел")
+
+    department_id = job_request.department_id if job_request.report_type == REPORT_DEPARTMENT else None
+    job = await report_jobs.submit(job_request.report_type, department_id, job_request.year, job_request.format)
+    return job_response(job)
+
+
+# Состояние задания
+@router.get("/jobs/{job_id}", response_model=report_schema.ReportJobResponse)
+async def read_report_job(job_id: str):
+    job = await report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    return job_response(job)
+
+
+# Скачивание готового отчёта
+@router.get("/jobs/{job_id}/download")
+async def download_report_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    if job.status == "failed":
+        raise HTTPException(status_code=422, detail=job.error)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail="Отчёт ещё формируется")
+    file = report_cache.open(Path(job.path))
+    if file is None:
+        # Файл вытеснен более новой версией отчёта — промах кэша, отчёт по текущим данным
+        try:
+            file, _ = await open_report(
+                db, job.report_type, job.department_id, job.year, render_in_pool, fmt=job.format
+            )
+        except ReportNotFound as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    return report_file_response(file, job.filename, job.format)
@@ -1,21 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.config.database import get_db
 from app import models
 from app.schemas import position_s as position_schema
+from app.utils.pagination import Page, page_params, paginate
+from app.utils.permissions import DICTIONARIES_READ, DICTIONARIES_WRITE, require
+from app.utils.data_versions import ALL, DICTIONARIES_SCOPE, bump_report_versions, bump_scope_versions
+from app.utils.dictionaries import POSITIONS, invalidate_dictionary
 
 # Создаем роутер для звания
 router = APIRouter(
     prefix="/position",
-    tags=["position"]  # Для документации
+    tags=["position"],  # Для документации
+    dependencies=[Depends(require(DICTIONARIES_READ))]
 )
 
 
 @router.get("/", response_model=list[position_schema.Position])
-async def read_positions(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Position_s).offset(skip).limit(limit))
-    positions = result.scalars().all()
+async def read_positions(
+    response: Response,
+    page: Page = Depends(page_params),
+    db: AsyncSession = Depends(get_db)
+):
+    positions = await paginate(db, select(models.Position_s), models.Position_s.id, page, response)
     return positions
 
 
@@ -30,7 +38,7 @@ async def read_position(position_id: int, db: AsyncSession = Depends(get_db)):
     return position
 
 # Создание должности
-@router.post("/", response_model=position_schema.Position)
+@router.post("/", response_model=position_schema.Position, dependencies=[Depends(require(DICTIONARIES_WRITE))])
 async def create_position(position: position_schema.PositionCreate, db: AsyncSession = Depends(get_db)):
     # Проверяем существование
     result = await db.execute(select(models.Position_s).where(models.Position_s.name == position.name))
@@ -42,13 +50,15 @@ async def create_position(position: position_schema.PositionCreate, db: AsyncSes
     # Создаем новую звание
     new_position = models.Position_s(name=position.name)
     db.add(new_position)
+    await bump_scope_versions(db, DICTIONARIES_SCOPE)
     await db.commit()
+    await invalidate_dictionary(POSITIONS)
     await db.refresh(new_position)
     return new_position
 
 
 # Обновление звания
-@router.put("/{position_id}", response_model=position_schema.Position)
+@router.put("/{position_id}", response_model=position_schema.Position, dependencies=[Depends(require(DICTIONARIES_WRITE))])
 async def update_position(
     position_id: int, 
     position: position_schema.PositionUpdate, 
@@ -70,13 +80,17 @@ async def update_position(
     
     # Обновляем данные
     db_position.name = position.name
+    # Должности выводятся в графиках отпусков всех отделов
+    await bump_report_versions(db, [ALL])
+    await bump_scope_versions(db, DICTIONARIES_SCOPE)
     await db.commit()
+    await invalidate_dictionary(POSITIONS)
     await db.refresh(db_position)
     return db_position
 
 
 # Удаление звания
-@router.delete("/{position_id}")
+@router.delete("/{position_id}", dependencies=[Depends(require(DICTIONARIES_WRITE))])
 async def delete_position(position_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.Position_s).where(models.Position_s.id == position_id))
     position = result.scalar_one_or_none()
@@ -85,5 +99,8 @@ async def delete_position(position_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="position not found")
     
     await db.delete(position)
+    await bump_report_versions(db, [ALL])
+    await bump_scope_versions(db, DICTIONARIES_SCOPE)
     await db.commit()
+    await invalidate_dictionary(POSITIONS)
     return {"message": "position deleted successfully"}
\ No newline at end of file
@@ -1,20 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.config.database import get_db
 from app import models
 from app.schemas import rank_s as rank_schema
+from app.utils.pagination import Page, page_params, paginate
+from app.utils.permissions import DICTIONARIES_READ, DICTIONARIES_WRITE, require
+from app.utils.data_versions import DICTIONARIES_SCOPE, bump_scope_versions
+from app.utils.dictionaries import RANKS, invalidate_dictionary
 
 # Создаем роутер для звания
 router = APIRouter(
     prefix="/rank",
-    tags=["rank"]  # Для документации
+    tags=["rank"],  # Для документации
+    dependencies=[Depends(require(DICTIONARIES_READ))]
 )
 
 @router.get("/", response_model=list[rank_schema.Rank])
-async def read_ranks(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Rank_s).offset(skip).limit(limit))
-    rank = result.scalars().all()
+async def read_ranks(
+    response: Response,
+    page: Page = Depends(page_params),
+    db: AsyncSession = Depends(get_db)
+):
+    rank = await paginate(db, select(models.Rank_s), models.Rank_s.id, page, response)
     return rank
 
 
@@ -30,7 +38,7 @@ async def read_rank(rank_id: int, db: AsyncSession = Depends(get_db)):
 
 
 # Создание звания
-@router.post("/", response_model=rank_schema.Rank)
+@router.post("/", response_model=rank_schema.Rank, dependencies=[Depends(require(DICTIONARIES_WRITE))])
 async def create_rank(rank: rank_schema.RankCreate, db: AsyncSession = Depends(get_db)):
     # Проверяем существование
     result = await db.execute(select(models.Rank_s).where(models.Rank_s.name == rank.name))
@@ -42,13 +50,15 @@ async def create_rank(rank: rank_schema.RankCreate, db: AsyncSession = Depends(g
     # Создаем новую звание
     new_rank = models.Rank_s(name=rank.name)
     db.add(new_rank)
+    await bump_scope_versions(db, DICTIONARIES_SCOPE)
     await db.commit()
+    await invalidate_dictionary(RANKS)
     await db.refresh(new_rank)
     return new_rank
 
 
 # Обновление звания
-@router.put("/{rank_id}", response_model=rank_schema.Rank)
+@router.put("/{rank_id}", response_model=rank_schema.Rank, dependencies=[Depends(require(DICTIONARIES_WRITE))])
 async def update_rank(
     rank_id: int, 
     rank: rank_schema.RankUpdate, 
@@ -70,14 +80,16 @@ async def update_rank(
     
     # Обновляем данные
     db_rank.name = rank.name
+    await bump_scope_versions(db, DICTIONARIES_SCOPE)
     await db.commit()
+    await invalidate_dictionary(RANKS)
     await db.refresh(db_rank)
     return db_rank
 
 
 
 # Удаление звания
-@router.delete("/{rank_id}")
+@router.delete("/{rank_id}", dependencies=[Depends(require(DICTIONARIES_WRITE))])
 async def delete_rank(rank_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.Rank_s).where(models.Rank_s.id == rank_id))
     rank = result.scalar_one_or_none()
@@ -86,5 +98,7 @@ async def delete_rank(rank_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="rank not found")
     
     await db.delete(rank)
+    await bump_scope_versions(db, DICTIONARIES_SCOPE)
     await db.commit()
+    await invalidate_dictionary(RANKS)
     return {"message": "rank deleted successfully"}
\ No newline at end of file
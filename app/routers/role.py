@@ -1,21 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.config.database import get_db
 from app import models
 from app.schemas import role_s as role_schema
+from app.utils.pagination import Page, page_params, paginate
+from app.utils.permissions import DICTIONARIES_READ, ROLES_WRITE, require
+from app.utils.dictionaries import ROLES, invalidate_dictionary
 
 # Создаем роутер для ролей
 router = APIRouter(
     prefix="/roles",
-    tags=["roles"]  # Для документации
+    tags=["roles"],  # Для документации
+    dependencies=[Depends(require(DICTIONARIES_READ))]
 )
 
 # Получение всех ролей
 @router.get("/", response_model=list[role_schema.Role])
-async def read_roles(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Role_s).offset(skip).limit(limit))
-    roles = result.scalars().all()
+async def read_roles(
+    response: Response,
+    page: Page = Depends(page_params),
+    db: AsyncSession = Depends(get_db)
+):
+    roles = await paginate(db, select(models.Role_s), models.Role_s.id, page, response)
     return roles
 
 # Получение роли по ID
@@ -29,7 +36,7 @@ async def read_role(role_id: int, db: AsyncSession = Depends(get_db)):
     return role
 
 # Создание роли
-@router.post("/", response_model=role_schema.Role)
+@router.post("/", response_model=role_schema.Role, dependencies=[Depends(require(ROLES_WRITE))])
 async def create_role(role: role_schema.RoleCreate, db: AsyncSession = Depends(get_db)):
     # Проверяем существование
     result = await db.execute(select(models.Role_s).where(models.Role_s.name == role.name))
@@ -42,11 +49,12 @@ async def create_role(role: role_schema.RoleCreate, db: AsyncSession = Depends(g
     new_role = models.Role_s(name=role.name)
     db.add(new_role)
     await db.commit()
+    await invalidate_dictionary(ROLES)
     await db.refresh(new_role)
     return new_role
 
 # Обновление роли
-@router.put("/{role_id}", response_model=role_schema.Role)
+@router.put("/{role_id}", response_model=role_schema.Role, dependencies=[Depends(require(ROLES_WRITE))])
 async def update_role(
     role_id: int, 
     role: role_schema.RoleUpdate, 
@@ -69,11 +77,12 @@ async def update_role(
     # Обновляем данные
     db_role.name = role.name
     await db.commit()
+    await invalidate_dictionary(ROLES)
     await db.refresh(db_role)
     return db_role
 
 # Удаление роли
-@router.delete("/{role_id}")
+@router.delete("/{role_id}", dependencies=[Depends(require(ROLES_WRITE))])
 async def delete_role(role_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.Role_s).where(models.Role_s.id == role_id))
     role = result.scalar_one_or_none()
@@ -83,4 +92,5 @@ async def delete_role(role_id: int, db: AsyncSession = Depends(get_db)):
     
     await db.delete(role)
     await db.commit()
+    await invalidate_dictionary(ROLES)
     return {"message": "Role deleted successfully"}
\ No newline at end of file
@@ -1,192 +1,271 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from app.config.database import get_db
 from app import models
 from app.schemas import staff as staff_schema
+from app.utils.auth import Principal, get_current_principal, invalidate_principal
+from app.utils.bulk_import import IMPORT_FORMAT_PATTERN, NDJSON_MEDIA_TYPE, import_staff_rows, read_import_file
+from app.utils.data_versions import (
+    DICTIONARIES_SCOPE,
+    STAFF_SCOPE,
+    bump_report_versions,
+    bump_scope_versions,
+    get_scope_versions,
+)
+from app.utils.dictionaries import DEPARTMENTS, POSITIONS, RANKS, dictionary_cache
+from app.utils.etags import data_etag, etag_matches, not_modified, set_etag
+from app.utils.hierarchy import (
+    DEPTH_PATTERN,
+    HierarchyCycle,
+    add_staff_node,
+    check_supervisor,
+    descendant_ids,
+    descendants_query,
+    is_under,
+    move_staff_node,
+    parse_depth,
+    remove_staff_node,
+)
+from app.utils.pagination import Page, page_params, paginate
+from app.utils.permissions import STAFF_READ_ALL, STAFF_READ_OWN, STAFF_WRITE, can_access_staff, require
+from app.utils.references import missing_references
 
 router = APIRouter(
     prefix="/staff",
-    tags=["staff"]
+    tags=["staff"],
+    dependencies=[Depends(require(STAFF_READ_OWN))]
 )
 
+
+# Проверка ссылок на отдел, должность, звание и начальника одним запросом
+async def validate_staff_references(db: AsyncSession, staff: staff_schema.StaffBase):
+    missing = await missing_references(db, staff.dict())
+    if missing:
+        raise HTTPException(status_code=400, detail=f"{missing[0]} not found")
+
+
+async def staff_dictionary_names(db: AsyncSession, staff_list, db_version: Optional[int] = None) -> dict:
+    """Названия отделов, должностей и званий сотрудников для версии справочников в базе.
+
+    Справочник без нужного id перечитывается (см. get_covering), а не даёт пустое название.
+    """
+    if db_version is None:
+        (db_version,) = await get_scope_versions(db, DICTIONARIES_SCOPE)
+    return await dictionary_cache.get_many_covering(
+        db,
+        {
+            DEPARTMENTS: [staff.department_id for staff in staff_list],
+            POSITIONS: [staff.position_id for staff in staff_list],
+            RANKS: [staff.rank_id for staff in staff_list],
+        },
+        db_version,
+    )
+
+
+# Сотрудник вне доступа неотличим от несуществующего — 404, как отпуска в get_accessible_vacation
+async def check_staff_visible(db: AsyncSession, principal: Principal, staff_id: int):
+    if not await can_access_staff(db, principal, staff_id, STAFF_READ_ALL, STAFF_READ_OWN):
+        raise HTTPException(status_code=404, detail="Staff not found")
+    result = await db.execute(select(models.Staff.id).where(models.Staff.id == staff_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Staff not found")
+
+
+# Ответ с названиями отдела, должности и звания из кэша справочников
+def staff_response(staff: models.Staff, names: dict) -> staff_schema.StaffResponse:
+    return staff_schema.StaffResponse(
+        id=staff.id,
+        last_name=staff.last_name,
+        first_name=staff.first_name,
+        middle_name=staff.middle_name,
+        hire_date=staff.hire_date,
+        dismissal_date=staff.dismissal_date,
+        display_color=staff.display_color,
+        department_id=staff.department_id,
+        position_id=staff.position_id,
+        rank_id=staff.rank_id,
+        supervisor_id=staff.supervisor_id,
+        is_active=staff.is_active,
+        # Добавляем названия
+        department_name=names[DEPARTMENTS].get(staff.department_id),
+        position_name=names[POSITIONS].get(staff.position_id),
+        rank_name=names[RANKS].get(staff.rank_id),
+        supervisor_name=f"{staff.supervisor.first_name} {staff.supervisor.last_name}" if staff.supervisor else None
+    )
+
+
 # Создание сотрудника
-@router.post("/", response_model=staff_schema.StaffResponse)
+@router.post("/", response_model=staff_schema.StaffResponse, dependencies=[Depends(require(STAFF_WRITE))])
 async def create_staff(staff: staff_schema.StaffCreate, db: AsyncSession = Depends(get_db)):
-    # Проверяем существование связанных записей
-    # Проверка department
-    if staff.department_id:
-        dept_result = await db.execute(
-            select(models.Department_s).where(models.Department_s.id == staff.department_id)
-        )
-        if not dept_result.scalar_one_or_none():
-            raise HTTPException(status_code=400, detail="Department not found")
-    
-    # Проверка position
-    if staff.position_id:
-        pos_result = await db.execute(
-            select(models.Position_s).where(models.Position_s.id == staff.position_id)
-        )
-        if not pos_result.scalar_one_or_none():
-            raise HTTPException(status_code=400, detail="Position not found")
-    
-    # Проверка rank
-    if staff.rank_id:
-        rank_result = await db.execute(
-            select(models.Rank_s).where(models.Rank_s.id == staff.rank_id)
-        )
-        if not rank_result.scalar_one_or_none():
-            raise HTTPException(status_code=400, detail="Rank not found")
-    
-    # Проверка supervisor
-    if staff.supervisor_id:
-        sup_result = await db.execute(
-            select(models.Staff).where(models.Staff.id == staff.supervisor_id)
-        )
-        if not sup_result.scalar_one_or_none():
-            raise HTTPException(status_code=400, detail="Supervisor not found")
-    
+    await validate_staff_references(db, staff)
     new_staff = models.Staff(**staff.dict())
     db.add(new_staff)
+    await db.flush()
+    await add_staff_node(db, new_staff.id, new_staff.supervisor_id)
+    # Новый сотрудник появляется в календаре отпусков отдела
+    await bump_report_versions(db, [new_staff.department_id])
+    await bump_scope_versions(db, STAFF_SCOPE)
     await db.commit()
     await db.refresh(new_staff)
     return new_staff
 
 
-# Получение всех сотрудников (с загрузкой связей)
-@router.get("/", response_model=list[staff_schema.StaffResponse])
-async def read_staff_list(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
+# Массовый импорт сотрудников из CSV / XLSX / JSON Lines.
+# Ответ — поток NDJSON: ошибки по строкам, последней строкой итог.
+@router.post("/import", dependencies=[Depends(require(STAFF_WRITE))])
+async def import_staff(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, alias="format", pattern=IMPORT_FORMAT_PATTERN),
+    all_or_nothing: bool = Query(False, description="Не вставлять ничего, если хотя бы одна строка с ошибкой"),
+):
+    rows = await read_import_file(file, file_format)
+    return StreamingResponse(import_staff_rows(rows, all_or_nothing), media_type=NDJSON_MEDIA_TYPE)
+
+
+# Получение всех сотрудников (с загрузкой связей).
+# ETag по версиям сотрудников и справочников: без изменений — 304 без запроса списка
+@router.get("/", response_model=list[staff_schema.StaffResponse], dependencies=[Depends(require(STAFF_READ_ALL))])
+async def read_staff_list(
+    response: Response,
+    page: Page = Depends(page_params),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    staff_version, dictionaries_version = await get_scope_versions(db, STAFF_SCOPE, DICTIONARIES_SCOPE)
+    etag = data_etag(f"staff-{page.key()}", staff_version, dictionaries_version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    staff_list = await paginate(
+        db,
         select(models.Staff)
         .options(
-            selectinload(models.Staff.department),
-            selectinload(models.Staff.position),
-            selectinload(models.Staff.rank),
             selectinload(models.Staff.supervisor)
-        )
-        .offset(skip)
-        .limit(limit)
+        ),
+        models.Staff.id,
+        page,
+        response
     )
-    staff_list = result.scalars().all()
+    names = await staff_dictionary_names(db, staff_list, dictionaries_version)
 
     return [
-        staff_schema.StaffResponse(
-            id=staff.id,
-            last_name=staff.last_name,
-            first_name=staff.first_name,
-            middle_name=staff.middle_name,
-            hire_date=staff.hire_date,
-            dismissal_date=staff.dismissal_date,
-            display_color=staff.display_color,
-            department_id=staff.department_id,
-            position_id=staff.position_id,
-            rank_id=staff.rank_id,
-            supervisor_id=staff.supervisor_id,
-            is_active=staff.is_active,
-            # Добавляем названия
-            department_name=staff.department.name if staff.department else None,
-            position_name=staff.position.name if staff.position else None,
-            rank_name=staff.rank.name if staff.rank else None,
-            supervisor_name=f"{staff.supervisor.first_name} {staff.supervisor.last_name}" if staff.supervisor else None
-        )
+        staff_response(staff, names)
         for staff in staff_list
     ]
 
-# Получение всех сотрудников (с загрузкой связей)
+# Подчинённые начальника: depth=1 — прямые, N — до N уровней, all — всё поддерево
 @router.get("/boss/{boss_id}", response_model=list[staff_schema.StaffResponse])
-async def read_staff_list(boss_id: int, db: AsyncSession = Depends(get_db)):
+async def read_staff_list(
+    boss_id: int,
+    depth: str = Query("1", pattern=DEPTH_PATTERN),
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    await check_staff_visible(db, principal, boss_id)
     result = await db.execute(
         select(models.Staff)
         .options(
-            selectinload(models.Staff.department),
-            selectinload(models.Staff.position),
-            selectinload(models.Staff.rank),
             selectinload(models.Staff.supervisor)
         )
-        .where(models.Staff.supervisor_id == boss_id)    )
+        .where(models.Staff.id.in_(descendant_ids(boss_id, parse_depth(depth))))
+    )
     staff_list = result.scalars().all()
+    names = await staff_dictionary_names(db, staff_list)
 
     return [
-        staff_schema.StaffResponse(
-            id=staff.id,
-            last_name=staff.last_name,
-            first_name=staff.first_name,
-            middle_name=staff.middle_name,
-            hire_date=staff.hire_date,
-            dismissal_date=staff.dismissal_date,
-            display_color=staff.display_color,
-            department_id=staff.department_id,
-            position_id=staff.position_id,
-            rank_id=staff.rank_id,
-            supervisor_id=staff.supervisor_id,
-            is_active=staff.is_active,
-            # Добавляем названия
-            department_name=staff.department.name if staff.department else None,
-            position_name=staff.position.name if staff.position else None,
-            rank_name=staff.rank.name if staff.rank else None,
-            supervisor_name=f"{staff.supervisor.first_name} {staff.supervisor.last_name}" if staff.supervisor else None
-        )
+        staff_response(staff, names)
         for staff in staff_list
     ]
 
 
+# Все подчинённые начальника с уровнем подчинения
+@router.get("/{boss_id}/descendants", response_model=list[staff_schema.StaffDescendant])
+async def read_staff_descendants(
+    boss_id: int,
+    depth: str = Query("all", pattern=DEPTH_PATTERN),
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    await check_staff_visible(db, principal, boss_id)
+    result = await db.execute(
+        descendants_query(boss_id, parse_depth(depth))
+        .order_by(models.StaffHierarchy.depth, models.StaffHierarchy.descendant_id)
+    )
+    return [
+        staff_schema.StaffDescendant(staff_id=descendant_id, depth=level)
+        for descendant_id, level in result.all()
+    ]
+
+
+# Проверка, подчинён ли сотрудник начальнику (на любом уровне)
+@router.get("/{staff_id}/is-under/{boss_id}", response_model=staff_schema.StaffIsUnder)
+async def read_staff_is_under(
+    staff_id: int,
+    boss_id: int,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    await check_staff_visible(db, principal, boss_id)
+    # Иначе по ответу можно узнать положение в иерархии чужого сотрудника
+    await check_staff_visible(db, principal, staff_id)
+    level = await is_under(db, staff_id, boss_id)
+    return staff_schema.StaffIsUnder(
+        staff_id=staff_id,
+        boss_id=boss_id,
+        is_under=level is not None,
+        depth=level
+    )
+
+
 # Получение сотрудника по ID
 @router.get("/{staff_id}", response_model=staff_schema.StaffResponse)
-async def read_staff(staff_id: int, db: AsyncSession = Depends(get_db)):
+async def read_staff(
+    staff_id: int,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
     result = await db.execute(
         select(models.Staff)
         .options(
-            selectinload(models.Staff.department),
-            selectinload(models.Staff.position),
-            selectinload(models.Staff.rank),
             selectinload(models.Staff.supervisor)
         )
         .where(models.Staff.id == staff_id)
     )
     staff = result.scalar_one_or_none()
 
-    if staff is None:
+    if staff is None or not await can_access_staff(db, principal, staff_id, STAFF_READ_ALL, STAFF_READ_OWN):
         raise HTTPException(status_code=404, detail="Staff not found")
 
-    return staff_schema.StaffResponse(
-        id=staff.id,
-        last_name=staff.last_name,
-        first_name=staff.first_name,
-        middle_name=staff.middle_name,
-        hire_date=staff.hire_date,
-        dismissal_date=staff.dismissal_date,
-        display_color=staff.display_color,
-        department_id=staff.department_id,
-        position_id=staff.position_id,
-        rank_id=staff.rank_id,
-        supervisor_id=staff.supervisor_id,
-        is_active=staff.is_active,
-        # Добавляем названия
-        department_name=staff.department.name if staff.department else None,
-        position_name=staff.position.name if staff.position else None,
-        rank_name=staff.rank.name if staff.rank else None,
-        supervisor_name=f"{staff.supervisor.first_name} {staff.supervisor.last_name}" if staff.supervisor else None
-    )
+    names = await staff_dictionary_names(db, [staff])
+    return staff_response(staff, names)
 
 # Получение всех сотрудников (с загрузкой связей)
-@router.get("/full/", response_model=list[staff_schema.StaffResponse])
-async def read_staff_list_full(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
+@router.get("/full/", response_model=list[staff_schema.StaffResponse], dependencies=[Depends(require(STAFF_READ_ALL))])
+async def read_staff_list_full(
+    response: Response,
+    page: Page = Depends(page_params),
+    db: AsyncSession = Depends(get_db)
+):
+    staff_list = await paginate(
+        db,
         select(models.Staff)
         .options(
-            selectinload(models.Staff.department),
-            selectinload(models.Staff.position),
-            selectinload(models.Staff.rank)
-        )
-        .offset(skip)
-        .limit(limit)
+            selectinload(models.Staff.supervisor)
+        ),
+        models.Staff.id,
+        page,
+        response
     )
-    staff_list = result.scalars().all()
-    return staff_list
+    names = await staff_dictionary_names(db, staff_list)
+    return [staff_response(staff, names) for staff in staff_list]
 
 # Обновление сотрудника
-@router.put("/{staff_id}", response_model=staff_schema.StaffResponse)
+@router.put("/{staff_id}", response_model=staff_schema.StaffResponse, dependencies=[Depends(require(STAFF_WRITE))])
 async def update_staff(
     staff_id: int, 
     staff_update: staff_schema.StaffCreate, 
@@ -200,15 +279,30 @@ async def update_staff(
     if db_staff is None:
         raise HTTPException(status_code=404, detail="Staff not found")
     
+    await validate_staff_references(db, staff_update)
+    old_department_id = db_staff.department_id
+    old_supervisor_id = db_staff.supervisor_id
+    if staff_update.supervisor_id != old_supervisor_id:
+        try:
+            await check_supervisor(db, staff_id, staff_update.supervisor_id)
+        except HierarchyCycle as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     # Обновляем поля
     for field, value in staff_update.dict().items():
         setattr(db_staff, field, value)
+
+    if db_staff.supervisor_id != old_supervisor_id:
+        await move_staff_node(db, staff_id, db_staff.supervisor_id)
     
+    # Данные сотрудника входят в графики отпусков старого и нового отдела за все годы
+    await bump_report_versions(db, [old_department_id, db_staff.department_id])
+    await bump_scope_versions(db, STAFF_SCOPE)
     await db.commit()
     await db.refresh(db_staff)
     return db_staff
 # Удаление сотрудника
-@router.delete("/{staff_id}")
+@router.delete("/{staff_id}", dependencies=[Depends(require(STAFF_WRITE))])
 async def delete_staff(staff_id: int, db: AsyncSession = Depends(get_db)):
     # Проверяем, есть ли у сотрудника связанный пользователь
     user_result = await db.execute(
@@ -229,6 +323,11 @@ async def delete_staff(staff_id: int, db: AsyncSession = Depends(get_db)):
     if staff is None:
         raise HTTPException(status_code=404, detail="Staff not found")
 
+    await bump_report_versions(db, [staff.department_id])
+    await bump_scope_versions(db, STAFF_SCOPE)
+    await remove_staff_node(db, staff_id)
     await db.delete(staff)
     await db.commit()
+    if user:
+        await invalidate_principal(user.id)
     return {"message": "Staff deleted successfully"}
\ No newline at end of file
@@ -1,24 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 from app.config.database import get_db
 from app import models
 from app.schemas import user as user_schema
-from app.config.security import verify_password, get_password_hash, create_access_token, decode_access_token
-from datetime import timedelta
-from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import selectinload  # <-- Добавьте этот импорт
-
-# Создаем OAuth2PasswordBearer здесь, а не внутри функции
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+from app.utils.auth import (
+    Principal,
+    authenticate_token,
+    get_current_principal,
+    invalidate_principal,
+    issue_tokens,
+    oauth2_scheme,
+    refresh_tokens,
+    revoke_session,
+)
+from app.utils.dictionaries import ROLES, dictionary_cache
+from app.utils.pagination import Page, page_params, paginate
+from app.utils.permissions import USERS_MANAGE, require
+from app.utils.password import hash_password_async, verify_password_async
+from app.utils.rate_limit import check_login_allowed, client_ip, login_limiter
 
 router = APIRouter(
     prefix="/users",
     tags=["users"]
 )
 
-@router.post("/", response_model=user_schema.UserResponse)
+@router.post("/", response_model=user_schema.UserResponse, dependencies=[Depends(require(USERS_MANAGE))])
 async def create_user(user: user_schema.UserCreate, db: AsyncSession = Depends(get_db)):
     # Проверяем, существует ли пользователь с таким логином
     result = await db.execute(
@@ -47,7 +55,7 @@ async def create_user(user: user_schema.UserCreate, db: AsyncSession = Depends(g
     # Создаем нового пользователя с хэшированным паролем
     new_user = models.User(
         login=user.login,
-        password=get_password_hash(user.password),
+        password=await hash_password_async(user.password),
         id_role_s=user.id_role_s,
         id_staff=user.id_staff,
         is_active=user.is_active
@@ -55,6 +63,7 @@ async def create_user(user: user_schema.UserCreate, db: AsyncSession = Depends(g
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
+    await invalidate_principal(new_user.id)
 
     # ✅ Возвращаем в формате UserResponse
     return user_schema.UserResponse(
@@ -66,7 +75,14 @@ async def create_user(user: user_schema.UserCreate, db: AsyncSession = Depends(g
     )
 # Аутентификация пользователя и выдача JWT токена
 @router.post("/login", response_model=user_schema.Token)
-async def login_for_access_token(user_credentials: user_schema.UserLogin, db: AsyncSession = Depends(get_db)):
+async def login_for_access_token(
+    user_credentials: user_schema.UserLogin,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    # Ограничение попыток проверяется до запроса к базе и bcrypt (429 с Retry-After)
+    await check_login_allowed(user_credentials.login, client_ip(request))
+
     # Находим пользователя по логину
     result = await db.execute(
         select(models.User).where(models.User.login == user_credentials.login)
@@ -74,118 +90,109 @@ async def login_for_access_token(user_credentials: user_schema.UserLogin, db: As
     user = result.scalar_one_or_none()
     
     # Проверяем существование пользователя и правильность пароля
-    if not user or not verify_password(user_credentials.password, user.password):
+    if not user or not await verify_password_async(user_credentials.password, user.password):
+        await login_limiter.failed(user_credentials.login)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    await login_limiter.succeeded(user_credentials.login)
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     
-    # Создаем JWT токен
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": user.login, "user_id": user.id}, 
-        expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
-
-
-# Получение текущего пользователя по токену
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+    # Роль и сотрудник в access-токене: проверка токена не требует запроса к базе
+    roles = await dictionary_cache.get_covering(db, ROLES, [user.id_role_s])
+    principal = Principal(
+        user_id=user.id,
+        login=user.login,
+        role_id=user.id_role_s,
+        role=roles.get(user.id_role_s),
+        staff_id=user.id_staff,
+        is_active=user.is_active
     )
+    return issue_tokens(principal)
 
-    payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
 
-    login: str = payload.get("sub")
-    if login is None:
-        raise credentials_exception
+# Новая пара токенов по refresh-токену (без проверки пароля)
+@router.post("/refresh", response_model=user_schema.Token)
+async def refresh_access_token(request: user_schema.RefreshRequest, db: AsyncSession = Depends(get_db)):
+    return await refresh_tokens(db, request.refresh_token)
 
-    result = await db.execute(
-        select(models.User)
-        .options(selectinload(models.User.role))  # Загружаем связь с ролью
-        .where(models.User.login == login)
-    )
-    user = result.scalar_one_or_none()
 
-    if user is None:
-        raise credentials_exception
+# Выход: отзываются все токены сессии во всех воркерах
+@router.post("/logout")
+async def logout(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    _, payload = await authenticate_token(db, token)
+    # Токены, выданные до появления сессий, не отзываются и истекают сами
+    if payload.get("sid"):
+        await revoke_session(db, payload["sid"])
+    return {"message": "Logged out successfully"}
 
-    return user
 
-# Получение информации о текущем пользователе
+# Получение информации о текущем пользователе (без запроса к базе, если пользователь в кэше)
 @router.get("/me", response_model=user_schema.UserResponse)
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
-    # Возвращаем схему с role_name
+async def read_users_me(current_user: Principal = Depends(get_current_principal)):
     return user_schema.UserResponse(
-        id=current_user.id,
+        id=current_user.user_id,
         login=current_user.login,
-        role_name=current_user.role.name,  # Используем имя роли
-        id_staff=current_user.id_staff,
+        role_name=current_user.role,
+        id_staff=current_user.staff_id,
         is_active=current_user.is_active
     )
 
 # Получение пользователя по ID
-@router.get("/{user_id}", response_model=user_schema.UserResponse)
+@router.get("/{user_id}", response_model=user_schema.UserResponse, dependencies=[Depends(require(USERS_MANAGE))])
 async def read_user(user_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(
-        select(models.User)
-        .options(selectinload(models.User.role))
-        .where(models.User.id == user_id)
+        select(models.User).where(models.User.id == user_id)
     )
     user = result.scalar_one_or_none()
 
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
 
+    roles = await dictionary_cache.get_covering(db, ROLES, [user.id_role_s])
     return user_schema.UserResponse(
         id=user.id,
         login=user.login,
-        role_name=user.role.name,
+        role_name=roles.get(user.id_role_s),
         id_staff=user.id_staff,
         is_active=user.is_active
     )
 
 
 # Получение всех пользователей
-@router.get("/", response_model=List[user_schema.UserResponse])
-async def read_users(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(models.User)
-        .options(selectinload(models.User.role))
-        .offset(skip).limit(limit)
+@router.get("/", response_model=List[user_schema.UserResponse], dependencies=[Depends(require(USERS_MANAGE))])
+async def read_users(
+    response: Response,
+    page: Page = Depends(page_params),
+    db: AsyncSession = Depends(get_db)
+):
+    users = await paginate(
+        db, select(models.User), models.User.id, page, response
     )
-    users = result.scalars().all()
+    roles = await dictionary_cache.get_covering(db, ROLES, [user.id_role_s for user in users])
     return [
         user_schema.UserResponse(
             id=user.id,
             login=user.login,
-            role_name=user.role.name,
+            role_name=roles.get(user.id_role_s),
             id_staff=user.id_staff,
             is_active=user.is_active
         )
         for user in users
     ]
 # Обновление пользователя
-@router.put("/{user_id}", response_model=user_schema.UserResponse)
+@router.put("/{user_id}", response_model=user_schema.UserResponse, dependencies=[Depends(require(USERS_MANAGE))])
 async def update_user(
     user_id: int,
     user_update: user_schema.UserUpdate,
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
-        select(models.User)
-        .options(selectinload(models.User.role))  # Загружаем связь с ролью
-        .where(models.User.id == user_id)
+        select(models.User).where(models.User.id == user_id)
     )
     db_user = result.scalar_one_or_none()
 
@@ -213,23 +220,25 @@ async def update_user(
     # Обновляем поля
     for field, value in user_update.dict(exclude_unset=True).items():
         if field == "password" and value is not None:
-            setattr(db_user, field, get_password_hash(value))
+            setattr(db_user, field, await hash_password_async(value))
         else:
             setattr(db_user, field, value)
 
     await db.commit()
+    await invalidate_principal(user_id)
     await db.refresh(db_user)
 
     # ✅ Возвращаем объект в формате UserResponse
+    roles = await dictionary_cache.get_covering(db, ROLES, [db_user.id_role_s])
     return user_schema.UserResponse(
         id=db_user.id,
         login=db_user.login,
-        role_name=db_user.role.name,
+        role_name=roles.get(db_user.id_role_s),
         id_staff=db_user.id_staff,
         is_active=db_user.is_active
     )
 # Удаление пользователя
-@router.delete("/{user_id}")
+@router.delete("/{user_id}", dependencies=[Depends(require(USERS_MANAGE))])
 async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(
         select(models.User).where(models.User.id == user_id)
@@ -241,4 +250,5 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     
     await db.delete(user)
     await db.commit()
+    await invalidate_principal(user_id)
     return {"message": "User deleted successfully"}
\ No newline at end of file
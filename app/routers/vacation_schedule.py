@@ -1,43 +1,144 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from sqlalchemy import select
+from sqlalchemy import select, func
 from app.config.database import get_db
 from app import models
 from app.schemas import vacation_schedule as vacation_schema
+from app.utils.auth import Principal, get_current_principal
+from app.utils.bulk_import import IMPORT_FORMAT_PATTERN, NDJSON_MEDIA_TYPE, import_vacation_rows, read_import_file
+from app.utils.data_versions import (
+    DICTIONARIES_SCOPE,
+    STAFF_SCOPE,
+    VACATIONS_SCOPE,
+    bump_report_versions,
+    bump_scope_versions,
+    get_department_version,
+    get_scope_versions,
+    staff_department_id,
+    vacation_years,
+)
+from app.utils.dictionaries import DEPARTMENTS, POSITIONS, RANKS, dictionary_cache
+from app.utils.etags import data_etag, etag_matches, not_modified, set_etag
+from app.utils.hierarchy import DEPTH_PATTERN, descendant_ids, parse_depth
+from app.utils.pagination import Page, page_params, paginate
+from app.utils.permissions import (
+    VACATIONS_READ_ALL,
+    VACATIONS_READ_OWN,
+    VACATIONS_WRITE_ALL,
+    VACATIONS_WRITE_OWN,
+    can_access_staff,
+    check_staff_access,
+    require,
+)
+from app.utils.vacation_analytics import absence_segments, daily_absence, peak_intervals
+from app.utils.vacation_rules import VacationConflict, check_vacation_conflicts
+
+# Максимальная длина периода для аналитики пересечений
+COVERAGE_MAX_DAYS = 731
 
 router = APIRouter(
     prefix="/vacation-schedules",
-    tags=["vacation_schedules"]
+    tags=["vacation_schedules"],
+    dependencies=[Depends(require(VACATIONS_READ_OWN))]
 )
 
+
+# Проверка дат и пересечений отпуска (409 при конфликте)
+async def validate_vacation_period(db: AsyncSession, staff_id, start_date, end_date, exclude_id=None):
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    try:
+        await check_vacation_conflicts(db, staff_id, start_date, end_date, exclude_id)
+    except VacationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+# Отпуск по id с проверкой доступа. Недоступный отпуск неотличим от несуществующего (404),
+# иначе по ответам можно узнать, какие отпуска есть вне своего поддерева
+async def get_accessible_vacation(
+    db: AsyncSession,
+    principal: Principal,
+    vacation_id: int,
+    all_permission: str,
+    own_permission: str,
+) -> models.VacationSchedule:
+    result = await db.execute(
+        select(models.VacationSchedule)
+        .where(models.VacationSchedule.id == vacation_id)
+    )
+    vacation = result.scalar_one_or_none()
+    if vacation is None or not await can_access_staff(db, principal, vacation.staff_id, all_permission, own_permission):
+        raise HTTPException(status_code=404, detail="Vacation schedule not found")
+    return vacation
+
+
 # Создание графика отпуска
 @router.post("/", response_model=vacation_schema.VacationSchedule)
 async def create_vacation_schedule(
     vacation: vacation_schema.VacationScheduleCreate, 
+    principal: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
+    await check_staff_access(db, principal, vacation.staff_id, VACATIONS_WRITE_ALL, VACATIONS_WRITE_OWN)
+    await validate_vacation_period(db, vacation.staff_id, vacation.start_date, vacation.end_date)
     new_vacation = models.VacationSchedule(**vacation.dict())
     db.add(new_vacation)
+    # Отмечаем изменение графика отдела для кэша отчётов
+    await bump_report_versions(
+        db, [await staff_department_id(db, new_vacation.staff_id)], vacation_years(new_vacation)
+    )
+    await bump_scope_versions(db, VACATIONS_SCOPE)
     await db.commit()
     await db.refresh(new_vacation)
     return new_vacation
 
 
+# Массовый импорт отпусков из CSV / XLSX / JSON Lines.
+# Ответ — поток NDJSON: ошибки по строкам, последней строкой итог.
+@router.post("/import", dependencies=[Depends(require(VACATIONS_WRITE_ALL))])
+async def import_vacation_schedules(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, alias="format", pattern=IMPORT_FORMAT_PATTERN),
+    all_or_nothing: bool = Query(False, description="Не вставлять ничего, если хотя бы одна строка с ошибкой"),
+):
+    rows = await read_import_file(file, file_format)
+    return StreamingResponse(import_vacation_rows(rows, all_or_nothing), media_type=NDJSON_MEDIA_TYPE)
+
 
+# Отпуска подчинённых начальника; ETag по версиям сотрудников, отпусков и справочников
 @router.get("/boss/{boss_id}", response_model=list[vacation_schema.VacationScheduleResponse])
-async def read_vacation_schedules_by_boss(boss_id: int, db: AsyncSession = Depends(get_db)):
-    # Найти всех сотрудников, у которых supervisor_id == boss_id
+async def read_vacation_schedules_by_boss(
+    boss_id: int,
+    response: Response,
+    depth: str = Query("1", pattern=DEPTH_PATTERN),
+    if_none_match: Optional[str] = Header(None),
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    await check_staff_access(db, principal, boss_id, VACATIONS_READ_ALL, VACATIONS_READ_OWN)
+    versions = await get_scope_versions(db, STAFF_SCOPE, VACATIONS_SCOPE, DICTIONARIES_SCOPE)
+    etag = data_etag(f"boss-{boss_id}-{depth}", *versions)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    # Сотрудники поддерева начальника по таблице замыкания (depth=1 — прямые подчинённые)
     result = await db.execute(
         select(models.Staff)
         .options(
-            selectinload(models.Staff.vacation_schedules),
-            selectinload(models.Staff.department)
+            selectinload(models.Staff.vacation_schedules)
         )
-        .where(models.Staff.supervisor_id == boss_id)
+        .where(models.Staff.id.in_(descendant_ids(boss_id, parse_depth(depth))))
     )
     staff_list = result.scalars().all()
+    departments = await dictionary_cache.get_covering(
+        db, DEPARTMENTS, [staff.department_id for staff in staff_list], db_version=versions[-1]
+    )
 
     # Собираем все отпуска
     vacations = []
@@ -53,7 +154,7 @@ async def read_vacation_schedules_by_boss(boss_id: int, db: AsyncSession = Depen
                     staff_last_name=staff.last_name,
                     staff_first_name=staff.first_name,
                     staff_middle_name=staff.middle_name,
-                    department_name=staff.department.name if staff.department else None,
+                    department_name=departments.get(staff.department_id),
                     display_color=staff.display_color or "#ffffff"  # по умолчанию белый
 
                 )
@@ -61,20 +162,42 @@ async def read_vacation_schedules_by_boss(boss_id: int, db: AsyncSession = Depen
 
     return vacations
 
-@router.get("/department/{dept_id}", response_model=list[vacation_schema.VacationScheduleKadryResponse])
-async def read_vacation_schedules_by_dept(dept_id: int, db: AsyncSession = Depends(get_db)):
+# Отпуска сотрудников отдела; ETag по версии данных отдела (как у отчётов) и справочников
+@router.get(
+    "/department/{dept_id}",
+    response_model=list[vacation_schema.VacationScheduleKadryResponse],
+    dependencies=[Depends(require(VACATIONS_READ_ALL))]
+)
+async def read_vacation_schedules_by_dept(
+    dept_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    (dictionaries_version,) = await get_scope_versions(db, DICTIONARIES_SCOPE)
+    etag = data_etag(f"department-{dept_id}", await get_department_version(db, dept_id), dictionaries_version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
     # Найти всех сотрудников, у которых supervisor_id == boss_id
     result = await db.execute(
         select(models.Staff)
         .options(
-            selectinload(models.Staff.vacation_schedules),
-            selectinload(models.Staff.department),
-            selectinload(models.Staff.position),
-            selectinload(models.Staff.rank)
+            selectinload(models.Staff.vacation_schedules)
         )
         .where(models.Staff.department_id == dept_id)
     )
     staff_list = result.scalars().all()
+    names = await dictionary_cache.get_many_covering(
+        db,
+        {
+            DEPARTMENTS: [dept_id],
+            POSITIONS: [staff.position_id for staff in staff_list],
+            RANKS: [staff.rank_id for staff in staff_list],
+        },
+        dictionaries_version,
+    )
 
     # Собираем все отпуска
     vacations = []
@@ -90,9 +213,9 @@ async def read_vacation_schedules_by_dept(dept_id: int, db: AsyncSession = Depen
                     staff_last_name=staff.last_name,
                     staff_first_name=staff.first_name,
                     staff_middle_name=staff.middle_name,
-                    department_name=staff.department.name if staff.department else None,
-                    rank_name=staff.rank.name,   # ✅ Добавлено условие
-                    position_name=staff.position.name
+                    department_name=names[DEPARTMENTS].get(staff.department_id),
+                    rank_name=names[RANKS].get(staff.rank_id),
+                    position_name=names[POSITIONS].get(staff.position_id)
                     
                 )
             )
@@ -101,37 +224,98 @@ async def read_vacation_schedules_by_dept(dept_id: int, db: AsyncSession = Depen
 
 
 
-# Получение графика отпуска по ID
-@router.get("/{vacation_id}", response_model=vacation_schema.VacationSchedule)
-async def read_vacation_schedule(vacation_id: int, db: AsyncSession = Depends(get_db)):
+# Аналитика пересечений: сколько сотрудников отсутствует в каждый день периода
+@router.get("/coverage/", response_model=vacation_schema.VacationCoverageResponse)
+async def read_vacation_coverage(
+    date_from: date,
+    date_to: date,
+    department_id: Optional[int] = None,
+    boss_id: Optional[int] = None,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    if (department_id is None) == (boss_id is None):
+        raise HTTPException(status_code=400, detail="Specify either department_id or boss_id")
+    # Отдел целиком (boss_id=None) доступен только с правом на все отпуска
+    await check_staff_access(db, principal, boss_id, VACATIONS_READ_ALL, VACATIONS_READ_OWN)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    if (date_to - date_from).days >= COVERAGE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Period must not exceed {COVERAGE_MAX_DAYS} days")
+
+    # Сотрудники отдела или всё поддерево начальника
+    if department_id is not None:
+        staff_filter = models.Staff.department_id == department_id
+    else:
+        staff_filter = models.Staff.id.in_(descendant_ids(boss_id))
+
+    staff_count = (await db.execute(
+        select(func.count()).select_from(models.Staff).where(staff_filter)
+    )).scalar_one()
+
+    # Только даты отпусков, пересекающих период, — без загрузки ORM-объектов
     result = await db.execute(
-        select(models.VacationSchedule)
-        .where(models.VacationSchedule.id == vacation_id)
+        select(
+            models.VacationSchedule.staff_id,
+            models.VacationSchedule.start_date,
+            models.VacationSchedule.end_date
+        )
+        .join(models.Staff)
+        .where(
+            staff_filter,
+            models.VacationSchedule.start_date <= date_to,
+            models.VacationSchedule.end_date >= date_from
+        )
     )
-    vacation = result.scalar_one_or_none()
-    
-    if vacation is None:
-        raise HTTPException(status_code=404, detail="Vacation schedule not found")
-    return vacation
+    periods_by_staff = {}
+    for staff_id, start_date, end_date in result.all():
+        periods_by_staff.setdefault(staff_id, []).append((start_date, end_date))
+
+    segments = absence_segments(periods_by_staff, date_from, date_to)
+    peak, intervals = peak_intervals(segments)
+    return vacation_schema.VacationCoverageResponse(
+        date_from=date_from,
+        date_to=date_to,
+        staff_count=staff_count,
+        peak_absent=peak,
+        peak_intervals=[
+            vacation_schema.AbsenceInterval(start_date=start, end_date=end, absent=peak)
+            for start, end in intervals
+        ],
+        days=[vacation_schema.AbsenceDay(date=day, absent=absent) for day, absent in daily_absence(segments)]
+    )
+
+
+
+# Получение графика отпуска по ID
+@router.get("/{vacation_id}", response_model=vacation_schema.VacationSchedule)
+async def read_vacation_schedule(
+    vacation_id: int,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    return await get_accessible_vacation(db, principal, vacation_id, VACATIONS_READ_ALL, VACATIONS_READ_OWN)
 
 # Получение всех графиков отпусков
-@router.get("/", response_model=list[vacation_schema.VacationSchedule])
+@router.get("/", response_model=list[vacation_schema.VacationSchedule], dependencies=[Depends(require(VACATIONS_READ_ALL))])
 async def read_vacation_schedules(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    page: Page = Depends(page_params),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(
-        select(models.VacationSchedule)
-        .offset(skip)
-        .limit(limit)
+    vacations = await paginate(
+        db, select(models.VacationSchedule), models.VacationSchedule.id, page, response
     )
-    vacations = result.scalars().all()
     return vacations
 
 # Получение графиков отпусков для конкретного сотрудника
 @router.get("/staff/{staff_id}", response_model=list[vacation_schema.VacationSchedule])
-async def read_vacation_schedules_by_staff(staff_id: int, db: AsyncSession = Depends(get_db)):
+async def read_vacation_schedules_by_staff(
+    staff_id: int,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    await check_staff_access(db, principal, staff_id, VACATIONS_READ_ALL, VACATIONS_READ_OWN)
     result = await db.execute(
         select(models.VacationSchedule)
         .where(models.VacationSchedule.staff_id == staff_id)
@@ -148,20 +332,39 @@ async def read_vacation_schedules_by_staff(staff_id: int, db: AsyncSession = Dep
 async def update_vacation_schedule(
     vacation_id: int,
     vacation_update: vacation_schema.VacationScheduleUpdate,  # id не включён
+    principal: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(
-        select(models.VacationSchedule)
-        .where(models.VacationSchedule.id == vacation_id)
+    db_vacation = await get_accessible_vacation(
+        db, principal, vacation_id, VACATIONS_WRITE_ALL, VACATIONS_WRITE_OWN
+    )
+
+    changes = vacation_update.dict(exclude_unset=True)
+    # Доступ нужен и к новому сотруднику, если отпуск переносится на другого
+    if changes.get("staff_id", db_vacation.staff_id) != db_vacation.staff_id:
+        await check_staff_access(db, principal, changes["staff_id"], VACATIONS_WRITE_ALL, VACATIONS_WRITE_OWN)
+
+    # Отдел и годы до изменения — их отчёты тоже устаревают
+    old_department_id = await staff_department_id(db, db_vacation.staff_id)
+    old_years = vacation_years(db_vacation)
+
+    await validate_vacation_period(
+        db,
+        changes.get("staff_id", db_vacation.staff_id),
+        changes.get("start_date", db_vacation.start_date),
+        changes.get("end_date", db_vacation.end_date),
+        exclude_id=vacation_id
     )
-    db_vacation = result.scalar_one_or_none()
-    
-    if db_vacation is None:
-        raise HTTPException(status_code=404, detail="Vacation schedule not found")
     
      # Обновляем только те поля, что были переданы
-    for field, value in vacation_update.dict(exclude_unset=True).items():
+    for field, value in changes.items():
         setattr(db_vacation, field, value)
+
+    new_department_id = await staff_department_id(db, db_vacation.staff_id)
+    await bump_report_versions(
+        db, [old_department_id, new_department_id], old_years | vacation_years(db_vacation)
+    )
+    await bump_scope_versions(db, VACATIONS_SCOPE)
     await db.commit()
     await db.refresh(db_vacation)
     return db_vacation
@@ -171,16 +374,17 @@ async def update_vacation_schedule(
 
 # Удаление графика отпуска
 @router.delete("/{vacation_id}")
-async def delete_vacation_schedule(vacation_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(models.VacationSchedule)
-        .where(models.VacationSchedule.id == vacation_id)
+async def delete_vacation_schedule(
+    vacation_id: int,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    vacation = await get_accessible_vacation(db, principal, vacation_id, VACATIONS_WRITE_ALL, VACATIONS_WRITE_OWN)
+
+    await bump_report_versions(
+        db, [await staff_department_id(db, vacation.staff_id)], vacation_years(vacation)
     )
-    vacation = result.scalar_one_or_none()
-    
-    if vacation is None:
-        raise HTTPException(status_code=404, detail="Vacation schedule not found")
-    
+    await bump_scope_versions(db, VACATIONS_SCOPE)
     await db.delete(vacation)
     await db.commit()
     return {"message": "Vacation schedule deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import Optional, Literal
+from datetime import datetime
+
+# Запрос на формирование отчёта
+class ReportJobCreate(BaseModel):
+    report_type: Literal["department", "all"]
+    department_id: Optional[int] = None  # Обязателен для report_type="department"
+    year: int
+    format: Literal["docx", "pdf"] = "docx"
+
+# Состояние задания
+class ReportJobResponse(BaseModel):
+    id: str
+    report_type: str
+    department_id: Optional[int] = None
+    year: int
+    format: str
+    status: str
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
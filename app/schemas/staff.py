@@ -30,4 +30,17 @@ class StaffResponse(StaffBase):
     supervisor_name: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Иерархия подчинения
+class StaffDescendant(BaseModel):
+    staff_id: int
+    depth: int
+
+
+class StaffIsUnder(BaseModel):
+    staff_id: int
+    boss_id: int
+    is_under: bool
+    depth: Optional[int] = None
@@ -20,7 +20,7 @@ class UserUpdate(UserBase):
 class UserResponse(BaseModel):
     id: int
     login: str
-    role_name: str  # Новое поле: имя роли
+    role_name: Optional[str] = None  # Имя роли (None, если роль не найдена)
     id_staff: int
     is_active: bool
 
@@ -34,8 +34,12 @@ class UserLogin(BaseModel):
 # Новые схемы для JWT
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class TokenData(BaseModel):
     user_id: Optional[int] = None
     login: Optional[str] = None
\ No newline at end of file
@@ -36,7 +36,7 @@ class VacationScheduleResponse(BaseModel):
     staff_last_name: str
     staff_first_name: str
     staff_middle_name: str
-    department_name: str
+    department_name: Optional[str] = None  # у сотрудника может не быть отдела
     display_color: str
 
       
@@ -50,10 +50,30 @@ class VacationScheduleKadryResponse(BaseModel):
     staff_last_name: str
     staff_first_name: str
     staff_middle_name: str
-    department_name: str
+    department_name: Optional[str] = None  # у сотрудника может не быть отдела
     rank_name: Optional[str] = None  # ✅ Сделано опциональным
     display_color: Optional[str] = "#ffffff"  # ✅ Сделано опциональным
     position_name: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Аналитика пересечений отпусков
+class AbsenceDay(BaseModel):
+    date: date
+    absent: int
+
+
+class AbsenceInterval(BaseModel):
+    start_date: date
+    end_date: date
+    absent: int
+
+
+class VacationCoverageResponse(BaseModel):
+    date_from: date
+    date_to: date
+    staff_count: int            # сотрудников в выборке
+    peak_absent: int            # максимум одновременно отсутствующих
+    peak_intervals: list[AbsenceInterval]
+    days: list[AbsenceDay]
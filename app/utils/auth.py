@@ -0,0 +1,263 @@
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config.database import get_db
+from app.config.security import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    PRINCIPAL_CACHE_SIZE,
+    PRINCIPAL_CACHE_TTL,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    create_access_token,
+    decode_access_token,
+)
+from app.utils.dictionaries import ROLES, dictionary_cache
+from app.utils.invalidation import invalidation_bus
+from app.utils.revocation import publish_revocation, revocation_list, revoke_token
+
+# Тема сообщений о сбросе кэша пользователей между воркерами
+PRINCIPALS_TOPIC = "principals"
+
+# Тип токена (claim "type"); токены без него выданы до появления refresh и считаются access
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+# Сколько держать отзыв сессии: дольше любого токена, выданного в ней до отзыва
+SESSION_REVOCATION_SECONDS = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Текущий пользователь запроса"""
+    user_id: int
+    login: str
+    role_id: int
+    role: Optional[str]
+    staff_id: Optional[int]
+    is_active: bool
+
+
+def token_claims(principal: Principal) -> dict:
+    """Данные пользователя для access-токена"""
+    return {
+        "sub": principal.login,
+        "user_id": principal.user_id,
+        "role_id": principal.role_id,
+        "role": principal.role,
+        "staff_id": principal.staff_id,
+    }
+
+
+def issue_tokens(principal: Principal, session_id: Optional[str] = None) -> dict:
+    """Пара access + refresh. Все токены одного входа имеют общий sid (сессия),
+    у каждого токена свой jti — по ним токен или сессию можно отозвать."""
+    session_id = session_id or uuid.uuid4().hex
+    access_token = create_access_token(
+        data={**token_claims(principal), "type": ACCESS_TOKEN, "jti": uuid.uuid4().hex, "sid": session_id},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_access_token(
+        data={
+            "sub": principal.login,
+            "user_id": principal.user_id,
+            "type": REFRESH_TOKEN,
+            "jti": uuid.uuid4().hex,
+            "sid": session_id,
+        },
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+class PrincipalCache:
+    """LRU-кэш пользователей с ограниченным временем жизни записи.
+
+    Хранит текущее состояние пользователя (None — пользователь удалён),
+    чтобы проверка токена не обращалась к базе на каждом запросе.
+    Изменение пользователя сбрасывает запись во всех воркерах,
+    а TTL ограничивает устаревание, если сообщение о сбросе потерялось.
+
+    Как и у DictionaryCache, загрузка, во время которой был сброс, в кэш
+    не попадает. Номер версии общий для всех пользователей, чтобы не
+    хранить счётчик на каждого: сброс одного пользователя лишь заставит
+    параллельные загрузки остальных повторить запрос в следующий раз.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._items = OrderedDict()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int):
+        """(найдено, пользователь или None)"""
+        item = self._items.get(user_id)
+        if item is None or item[0] < time.monotonic():
+            self.misses += 1
+            return False, None
+        self._items.move_to_end(user_id)
+        self.hits += 1
+        return True, item[1]
+
+    def version(self) -> int:
+        return self._version
+
+    def put(self, user_id: int, principal: Optional[Principal], version: Optional[int] = None):
+        """Сохранить запись; version — версия кэша до начала загрузки"""
+        if version is not None and version != self._version:
+            return
+        self._items[user_id] = (time.monotonic() + self._ttl, principal)
+        self._items.move_to_end(user_id)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        self._version += 1
+        if user_id is None:
+            self._items.clear()
+        else:
+            self._items.pop(user_id, None)
+
+    def on_invalidation(self, key: Optional[str]):
+        """Обработчик шины сброса кэшей: key — id пользователя, None — все"""
+        self.invalidate(None if key is None else int(key))
+
+    def on_dictionaries_invalidation(self, key: Optional[str]):
+        """Названия ролей хранятся в записях, поэтому изменение ролей сбрасывает весь кэш"""
+        if key is None or key == ROLES:
+            self.invalidate()
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+
+
+async def invalidate_principal(user_id: int):
+    """Сбросить пользователя в кэше всех воркеров (после commit)"""
+    await invalidation_bus.publish(PRINCIPALS_TOPIC, str(user_id))
+
+
+async def load_principal(db: AsyncSession, user_id: int) -> Optional[Principal]:
+    found, principal = principal_cache.get(user_id)
+    if found:
+        return principal
+    version = principal_cache.version()
+    result = await db.execute(
+        select(
+            models.User.login,
+            models.User.id_role_s,
+            models.User.id_staff,
+            models.User.is_active
+        ).where(models.User.id == user_id)
+    )
+    row = result.first()
+    principal = None
+    if row is not None:
+        roles = await dictionary_cache.get_covering(db, ROLES, [row.id_role_s])
+        principal = Principal(
+            user_id=user_id,
+            login=row.login,
+            role_id=row.id_role_s,
+            role=roles.get(row.id_role_s),
+            staff_id=row.id_staff,
+            is_active=row.is_active
+        )
+    principal_cache.put(user_id, principal, version)
+    return principal
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def authenticate_token(db: AsyncSession, token: str) -> Tuple[Principal, dict]:
+    """Пользователь и данные access-токена.
+
+    Подпись и срок токена проверяются локально, отзыв — по списку в памяти,
+    состояние пользователя берётся из кэша. Если пользователь удалён,
+    отключён или его роль и сотрудник уже не совпадают с токеном,
+    токен не принимается.
+    """
+    payload = decode_access_token(token)
+    if (
+        payload is None
+        or payload.get("type", ACCESS_TOKEN) != ACCESS_TOKEN
+        or not isinstance(payload.get("user_id"), int)
+        or revocation_list.is_revoked(payload.get("jti"), payload.get("sid"))
+    ):
+        raise _credentials_exception()
+
+    principal = await load_principal(db, payload["user_id"])
+    if principal is None or not principal.is_active or principal.login != payload.get("sub"):
+        raise _credentials_exception()
+    # Токены, выданные до изменения роли или сотрудника, больше не действуют
+    for claim, value in (("role_id", principal.role_id), ("staff_id", principal.staff_id)):
+        if claim in payload and payload[claim] != value:
+            raise _credentials_exception()
+    return principal, payload
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """Пользователь по access-токену"""
+    principal, _ = await authenticate_token(db, token)
+    return principal
+
+
+async def revoke_session(db: AsyncSession, session_id: str):
+    """Отозвать все токены сессии (commit и рассылка по воркерам)"""
+    expires_at = int(time.time()) + SESSION_REVOCATION_SECONDS
+    await revoke_token(db, session_id, expires_at)
+    await db.commit()
+    await publish_revocation(session_id, expires_at)
+
+
+async def refresh_tokens(db: AsyncSession, refresh_token: str) -> dict:
+    """Обмен refresh-токена на новую пару без проверки пароля (ротация).
+
+    Использованный refresh-токен отзывается. Повторное предъявление уже
+    обменянного токена означает, что он украден, — отзывается вся сессия.
+    """
+    payload = decode_access_token(refresh_token)
+    if (
+        payload is None
+        or payload.get("type") != REFRESH_TOKEN
+        or not isinstance(payload.get("user_id"), int)
+        or not isinstance(payload.get("exp"), int)
+        or not payload.get("jti")
+        or not payload.get("sid")
+        or revocation_list.is_revoked(payload["sid"])
+    ):
+        raise _credentials_exception()
+
+    principal = await load_principal(db, payload["user_id"])
+    if principal is None or not principal.is_active or principal.login != payload.get("sub"):
+        raise _credentials_exception()
+
+    jti, session_id = payload["jti"], payload["sid"]
+    if revocation_list.is_revoked(jti) or not await revoke_token(db, jti, payload["exp"]):
+        await revoke_session(db, session_id)
+        raise _credentials_exception()
+
+    # Новые токены получают текущие роль и сотрудника пользователя
+    tokens = issue_tokens(principal, session_id)
+    await db.commit()
+    await publish_revocation(jti, payload["exp"])
+    return tokens
@@ -0,0 +1,288 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import models
+from app.config.database import AsyncSessionLocal
+from app.config.imports import IMPORT_BATCH_SIZE, IMPORT_MAX_ROWS
+from app.schemas import staff as staff_schema
+from app.schemas import vacation_schedule as vacation_schema
+from app.utils.data_versions import (
+    STAFF_SCOPE,
+    VACATIONS_SCOPE,
+    bump_report_versions,
+    bump_scope_versions,
+    vacation_years,
+)
+from app.utils.hierarchy import add_staff_nodes
+from app.utils.references import STAFF_REFERENCES, existing_ids, staff_departments
+from app.utils.vacation_rules import VacationBatchChecker, lock_vacation_scope
+
+FORMAT_CSV = "csv"
+FORMAT_XLSX = "xlsx"
+FORMAT_JSONL = "jsonl"
+IMPORT_FORMATS = (FORMAT_CSV, FORMAT_XLSX, FORMAT_JSONL)
+IMPORT_FORMAT_PATTERN = r"^(csv|xlsx|jsonl)$"
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Расширения файлов и соответствующие форматы
+EXTENSIONS = {".csv": FORMAT_CSV, ".xlsx": FORMAT_XLSX, ".jsonl": FORMAT_JSONL, ".ndjson": FORMAT_JSONL}
+
+
+class ImportFormatError(Exception):
+    """Файл импорта не удалось разобрать"""
+
+
+class ImportTooLarge(Exception):
+    """В файле импорта больше строк, чем разрешено"""
+
+
+def detect_format(filename: Optional[str], file_format: Optional[str]) -> str:
+    if file_format:
+        return file_format
+    for extension, detected in EXTENSIONS.items():
+        if (filename or "").lower().endswith(extension):
+            return detected
+    raise ImportFormatError("Cannot detect file format, pass format=csv|xlsx|jsonl")
+
+
+def _clean(value):
+    """Пустые ячейки — None, даты из Excel — date"""
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _rows_from_table(header, rows) -> list:
+    columns = [str(_clean(title) or "").strip() for title in header]
+    result = []
+    for row in rows:
+        values = [_clean(value) for value in row]
+        if all(value is None for value in values):
+            continue
+        result.append({column: value for column, value in zip(columns, values) if column})
+    return result
+
+
+def _parse_csv(data: bytes) -> list:
+    text = data.decode("utf-8-sig")
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(io.StringIO(text), dialect)
+    header = next(reader, None)
+    if header is None:
+        return []
+    return _rows_from_table(header, reader)
+
+
+def _parse_xlsx(data: bytes) -> list:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return []
+        return _rows_from_table(header, rows)
+    finally:
+        workbook.close()
+
+
+def _parse_jsonl(data: bytes) -> list:
+    result = []
+    for number, line in enumerate(data.decode("utf-8-sig").splitlines(), start=1):
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        if not isinstance(row, dict):
+            raise ImportFormatError(f"Line {number}: expected a JSON object")
+        result.append({key: _clean(value) for key, value in row.items()})
+    return result
+
+
+PARSERS = {FORMAT_CSV: _parse_csv, FORMAT_XLSX: _parse_xlsx, FORMAT_JSONL: _parse_jsonl}
+
+
+def parse_import_file(data: bytes, filename: Optional[str], file_format: Optional[str] = None) -> list:
+    """Строки файла импорта в виде словарей {колонка: значение}"""
+    parser = PARSERS[detect_format(filename, file_format)]
+    try:
+        rows = parser(data)
+    except ImportFormatError:
+        raise
+    except Exception as e:
+        raise ImportFormatError(f"Cannot parse file: {e}")
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise ImportTooLarge(f"Import is limited to {IMPORT_MAX_ROWS} rows")
+    return rows
+
+
+async def read_import_file(file: UploadFile, file_format: Optional[str] = None) -> list:
+    """Прочитать загруженный файл; разбор идёт в пуле потоков, чтобы не блокировать цикл событий"""
+    data = await file.read()
+    try:
+        return await run_in_threadpool(parse_import_file, data, file.filename, file_format)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+def _line(payload: dict) -> bytes:
+    return (json.dumps(payload, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def _validate(rows: list, schema) -> tuple:
+    """Проверка строк схемой: ([(номер строки, объект)], {номер строки: [ошибки]})"""
+    valid, errors = [], {}
+    for number, row in enumerate(rows, start=1):
+        try:
+            valid.append((number, schema(**row)))
+        except ValidationError as e:
+            errors[number] = [
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ]
+    return valid, errors
+
+
+def _batches(items: list):
+    for start in range(0, len(items), IMPORT_BATCH_SIZE):
+        yield items[start:start + IMPORT_BATCH_SIZE]
+
+
+async def _insert_returning_ids(db, model, values: list) -> list:
+    """executemany INSERT ... RETURNING id с id в порядке переданных строк"""
+    result = await db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), values)
+    return list(result.scalars().all())
+
+
+def _summary(status: str, total: int, inserted: int, errors: dict) -> bytes:
+    return _line({"status": status, "total": total, "inserted": inserted, "failed": len(errors)})
+
+
+async def import_staff_rows(rows: list, all_or_nothing: bool = False):
+    """Массовый импорт сотрудников, NDJSON-отчёт по строкам.
+
+    Ссылки на отделы, должности, звания и начальников проверяются по наборам id,
+    загруженным одним запросом на таблицу; строки вставляются пакетами
+    executemany в одной транзакции. Сначала выдаются ошибки строк, последней —
+    итоговая строка со status.
+    """
+    valid, errors = _validate(rows, staff_schema.StaffCreate)
+    async with AsyncSessionLocal() as db:
+        references = [
+            (field, title, await existing_ids(db, column, (getattr(s, field) for _, s in valid)))
+            for field, column, title in STAFF_REFERENCES
+        ]
+        accepted = []
+        for number, staff in valid:
+            row_errors = []
+            for field, title, known in references:
+                value = getattr(staff, field)
+                if value is not None and value not in known:
+                    row_errors.append(f"{field}: {title} {value} not found")
+            if row_errors:
+                errors[number] = row_errors
+            else:
+                accepted.append(staff)
+
+        for number in sorted(errors):
+            yield _line({"row": number, "errors": errors[number]})
+        if errors and all_or_nothing:
+            yield _summary("rejected", len(rows), 0, errors)
+            return
+
+        try:
+            for batch in _batches(accepted):
+                ids = await _insert_returning_ids(db, models.Staff, [staff.dict() for staff in batch])
+                await add_staff_nodes(db, [(staff_id, staff.supervisor_id) for staff_id, staff in zip(ids, batch)])
+            if accepted:
+                await bump_report_versions(db, {staff.department_id for staff in accepted})
+                await bump_scope_versions(db, STAFF_SCOPE)
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            yield _line({"status": "failed", "detail": str(e.__cause__ or e)})
+            return
+    yield _summary("done", len(rows), len(accepted), errors)
+
+
+async def import_vacation_rows(rows: list, all_or_nothing: bool = False):
+    """Массовый импорт отпусков, NDJSON-отчёт по строкам.
+
+    Сотрудники проверяются одним запросом, пересечения и лимит отдела —
+    по заранее загруженным отпускам (VacationBatchChecker), в том числе
+    между строками самого файла.
+    """
+    valid, errors = _validate(rows, vacation_schema.VacationScheduleCreate)
+    async with AsyncSessionLocal() as db:
+        # Сотрудники и отделы заблокированы от проверки до commit (как при создании одного отпуска)
+        await lock_vacation_scope(db, (v.staff_id for _, v in valid))
+        departments = await staff_departments(db, (v.staff_id for _, v in valid))
+        checker = VacationBatchChecker(departments)
+        if valid:
+            await checker.load(
+                db,
+                min(v.start_date for _, v in valid),
+                max(v.end_date for _, v in valid)
+            )
+
+        accepted = []
+        for number, vacation in valid:
+            if vacation.staff_id is None:
+                errors[number] = ["staff_id: Field required"]
+            elif vacation.staff_id not in departments:
+                errors[number] = [f"staff_id: Staff {vacation.staff_id} not found"]
+            elif vacation.start_date > vacation.end_date:
+                errors[number] = ["start_date must not be after end_date"]
+            else:
+                conflict = checker.check(vacation.staff_id, vacation.start_date, vacation.end_date)
+                if conflict:
+                    errors[number] = [conflict]
+                else:
+                    checker.accept(vacation.staff_id, vacation.start_date, vacation.end_date)
+                    accepted.append(vacation)
+
+        # Строки с ошибками отдаются после commit, чтобы медленный клиент не держал блокировку
+        error_lines = [_line({"row": number, "errors": errors[number]}) for number in sorted(errors)]
+        if errors and all_or_nothing:
+            await db.rollback()
+            for line in error_lines:
+                yield line
+            yield _summary("rejected", len(rows), 0, errors)
+            return
+
+        try:
+            for batch in _batches(accepted):
+                await db.execute(insert(models.VacationSchedule), [vacation.dict() for vacation in batch])
+            if accepted:
+                await bump_report_versions(
+                    db,
+                    {departments[vacation.staff_id] for vacation in accepted},
+                    vacation_years(*accepted)
+                )
+                await bump_scope_versions(db, VACATIONS_SCOPE)
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            for line in error_lines:
+                yield line
+            yield _line({"status": "failed", "detail": str(e.__cause__ or e)})
+            return
+    for line in error_lines:
+        yield line
+    yield _summary("done", len(rows), len(accepted), errors)
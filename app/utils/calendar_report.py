@@ -0,0 +1,115 @@
+import calendar
+import re
+from datetime import date, timedelta
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+
+from app.config.database import AsyncSessionLocal
+from app.utils.report_data import calendar_staff_ids, load_calendar_rows
+from app.utils.xlsx_stream import StreamingXlsxWriter, HEADER_STYLE
+
+SCALE_DAY = "day"
+SCALE_WEEK = "week"
+
+# Цвет отпуска, если у сотрудника не задан или задан некорректно display_color
+DEFAULT_COLOR = "4F81BD"
+COLOR_RE = re.compile(r"^#?([0-9a-fA-F]{6})$")
+
+# Сколько сотрудников читать одним запросом и записывать в пуле потоков за раз
+CALENDAR_BATCH = 200
+
+
+def parse_color(value: Optional[str]) -> str:
+    match = COLOR_RE.match((value or "").strip())
+    return match.group(1) if match else DEFAULT_COLOR
+
+
+def calendar_columns(year: int, scale: str) -> list:
+    """Заголовки колонок календаря: дни года или недели (по 7 дней от 1 января)"""
+    days = 366 if calendar.isleap(year) else 365
+    year_start = date(year, 1, 1)
+    if scale == SCALE_WEEK:
+        return [f"с {(year_start + timedelta(days=offset)).strftime('%d.%m')}" for offset in range(0, days, 7)]
+    return [(year_start + timedelta(days=offset)).strftime('%d.%m') for offset in range(days)]
+
+
+def _staff_cells(staff, periods, year: int, scale: str, style: int) -> list:
+    """Ячейки строки сотрудника: ФИО, отдел и закрашенные дни/недели отпуска"""
+    staff_id, last_name, first_name, middle_name, department_name = staff
+    full_name = " ".join(part for part in (last_name, first_name, middle_name) if part)
+    year_start = date(year, 1, 1)
+    last_offset = (date(year, 12, 31) - year_start).days
+
+    # Дни отпуска (смещения от 1 января), отпуска обрезаются границами года
+    absent = set()
+    for start_date, end_date in periods:
+        first = max((start_date - year_start).days, 0)
+        last = min((end_date - year_start).days, last_offset)
+        absent.update(range(first, last + 1))
+
+    if scale == SCALE_WEEK:
+        weeks = {}
+        for offset in absent:
+            weeks[offset // 7] = weeks.get(offset // 7, 0) + 1
+        marks = [(2 + week, count, style) for week, count in sorted(weeks.items())]
+    else:
+        marks = [(2 + offset, None, style) for offset in sorted(absent)]
+
+    return [(0, full_name), (1, department_name or "")] + marks
+
+
+def _calendar_writer(year: int, scale: str) -> StreamingXlsxWriter:
+    """Новый календарь с заголовками колонок (в пуле потоков)"""
+    columns = calendar_columns(year, scale)
+    column_width = 8 if scale == SCALE_WEEK else 6
+    writer = StreamingXlsxWriter(
+        f"Отпуска {year}",
+        [36, 24] + [column_width] * len(columns),
+        freeze_rows=1,
+        freeze_cols=2,
+    )
+    writer.row(
+        [(0, "Сотрудник", HEADER_STYLE), (1, "Отдел", HEADER_STYLE)]
+        + [(2 + index, title, HEADER_STYLE) for index, title in enumerate(columns)]
+    )
+    return writer
+
+
+def _write_calendar_rows(writer: StreamingXlsxWriter, rows: list, year: int, scale: str) -> bytes:
+    """Записать строки сотрудников пачки и забрать сжатые байты (в пуле потоков)"""
+    current, color, periods = None, None, []
+    for staff_id, last_name, first_name, middle_name, department_name, display_color, start_date, end_date in rows:
+        if current is None or current[0] != staff_id:
+            if current is not None:
+                writer.row(_staff_cells(current, periods, year, scale, writer.fill_style(color)))
+            current = (staff_id, last_name, first_name, middle_name, department_name)
+            color = parse_color(display_color)
+            periods = []
+        if start_date is not None:
+            periods.append((start_date, end_date))
+    if current is not None:
+        writer.row(_staff_cells(current, periods, year, scale, writer.fill_style(color)))
+    return writer.take()
+
+
+async def vacation_calendar_chunks(year: int, scale: str = SCALE_DAY, department_id: Optional[int] = None):
+    """Потоковое построение годового календаря отпусков (сотрудник × день/неделя).
+
+    Ячейки отпуска закрашиваются цветом сотрудника (Staff.display_color);
+    в недельном режиме в ячейке стоит число дней отпуска в этой неделе.
+    Сотрудники читаются пачками по CALENDAR_BATCH, каждая пачка — в своей
+    короткой сессии, поэтому соединение не занято, пока клиент читает ответ.
+    XML строк и сжатие выполняются в пуле потоков, как в all_departments_docx_chunks.
+    """
+    async with AsyncSessionLocal() as db:
+        staff_ids = await calendar_staff_ids(db, year, department_id)
+    writer = await run_in_threadpool(_calendar_writer, year, scale)
+
+    for start in range(0, len(staff_ids), CALENDAR_BATCH):
+        async with AsyncSessionLocal() as db:
+            rows = await load_calendar_rows(db, year, staff_ids[start:start + CALENDAR_BATCH])
+        chunk = await run_in_threadpool(_write_calendar_rows, writer, rows, year, scale)
+        if chunk:
+            yield chunk
+
+    yield await run_in_threadpool(writer.close)
@@ -0,0 +1,114 @@
+from typing import Iterable, Optional
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+# Значение department_id / year, означающее "все отделы" / "все годы"
+ALL = 0
+
+# Области данных для ETag ответов API
+STAFF_SCOPE = "staff"
+VACATIONS_SCOPE = "vacations"
+DICTIONARIES_SCOPE = "dictionaries"
+
+
+def vacation_years(*vacations) -> set:
+    """Годы, в которые попадают отпуска (от года начала до года окончания)"""
+    years = set()
+    for vac in vacations:
+        if vac is not None:
+            years.update(range(vac.start_date.year, vac.end_date.year + 1))
+    return years
+
+
+async def staff_department_id(db: AsyncSession, staff_id: Optional[int]) -> Optional[int]:
+    if staff_id is None:
+        return None
+    result = await db.execute(
+        select(models.Staff.department_id).where(models.Staff.id == staff_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def bump_report_versions(
+    db: AsyncSession,
+    department_ids: Iterable[Optional[int]],
+    years: Optional[Iterable[int]] = None,
+):
+    """Увеличить счётчики изменений для отделов и лет.
+
+    Вызывается в той же транзакции, что и изменение данных, до commit.
+    years=None — изменение касается всех лет. None в department_ids —
+    сотрудник без отдела: он есть в отчёте по всем отделам и в календаре,
+    поэтому увеличивается счётчик ALL.
+    """
+    years = set(years) if years is not None else {ALL}
+    department_ids = {ALL if department_id is None else department_id for department_id in department_ids}
+    keys = [
+        {"department_id": department_id, "year": year, "version": 1}
+        for department_id in department_ids
+        for year in years
+    ]
+    if not keys:
+        return
+
+    await _increment(db, models.ReportDataVersion, keys, ["department_id", "year"])
+
+
+async def _increment(db: AsyncSession, model, keys: list, index_elements: list):
+    """Вставить счётчики или увеличить существующие одним запросом (upsert)"""
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(model).values(keys)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[getattr(model, column) for column in index_elements],
+        set_={"version": model.version + 1},
+    )
+    await db.execute(stmt)
+
+
+async def get_report_version(db: AsyncSession, year: int, department_id: Optional[int] = None) -> int:
+    """Версия данных отчёта за год (для отдела или для всех отделов).
+
+    Счётчики только растут, поэтому их сумма меняется при любом изменении.
+    """
+    conditions = [models.ReportDataVersion.year.in_([year, ALL])]
+    if department_id is not None:
+        conditions.append(models.ReportDataVersion.department_id.in_([department_id, ALL]))
+
+    result = await db.execute(
+        select(func.coalesce(func.sum(models.ReportDataVersion.version), 0))
+        .where(*conditions)
+    )
+    return result.scalar_one()
+
+
+async def get_department_version(db: AsyncSession, department_id: int) -> int:
+    """Версия данных отдела за все годы (сотрудники, отпуска, сам отдел, должности)"""
+    result = await db.execute(
+        select(func.coalesce(func.sum(models.ReportDataVersion.version), 0))
+        .where(models.ReportDataVersion.department_id.in_([department_id, ALL]))
+    )
+    return result.scalar_one()
+
+
+async def bump_scope_versions(db: AsyncSession, *scopes: str):
+    """Увеличить счётчики областей данных (в транзакции изменения, до commit)"""
+    await _increment(
+        db,
+        models.DataScopeVersion,
+        [{"scope": scope, "version": 1} for scope in scopes],
+        ["scope"],
+    )
+
+
+async def get_scope_versions(db: AsyncSession, *scopes: str) -> tuple:
+    """Текущие версии областей данных одним запросом (0 — не менялась)"""
+    result = await db.execute(
+        select(models.DataScopeVersion.scope, models.DataScopeVersion.version)
+        .where(models.DataScopeVersion.scope.in_(scopes))
+    )
+    versions = dict(result.all())
+    return tuple(versions.get(scope, 0) for scope in scopes)
@@ -0,0 +1,107 @@
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.utils.invalidation import invalidation_bus
+
+# Справочники, которые держим в памяти процесса
+ROLES = "roles"
+DEPARTMENTS = "departments"
+RANKS = "ranks"
+POSITIONS = "positions"
+
+# Тема сообщений о сбросе справочников между воркерами
+DICTIONARIES_TOPIC = "dictionaries"
+
+DICTIONARY_MODELS = {
+    ROLES: models.Role_s,
+    DEPARTMENTS: models.Department_s,
+    RANKS: models.Rank_s,
+    POSITIONS: models.Position_s,
+}
+
+
+class DictionaryCache:
+    """Кэш справочников {id: название} в памяти процесса.
+
+    Справочники маленькие и меняются редко, поэтому загружаются целиком
+    и держатся до изменения. Обработчики записи вызывают invalidate после
+    commit; у каждого справочника есть номер версии, и загрузка, во время
+    которой справочник изменили, в кэш не попадает.
+
+    Запрос может передать db_version — версию справочников из базы
+    (DICTIONARIES_SCOPE). Если кэш загружен при другой версии, он
+    перечитывается, даже если сообщение о сбросе ещё не дошло до воркера.
+    """
+
+    def __init__(self, dictionary_models: dict):
+        self._models = dictionary_models
+        self._data = {}
+        self._versions = dict.fromkeys(dictionary_models, 0)
+        # Версия справочников в базе, при которой загружены данные
+        self._db_versions = {}
+
+    def version(self, name: str) -> int:
+        return self._versions[name]
+
+    async def get(self, db: AsyncSession, name: str, db_version: Optional[int] = None) -> dict:
+        """Справочник {id: название}, при промахе загружается одним запросом"""
+        data = self._data.get(name)
+        if data is not None and (db_version is None or self._db_versions.get(name) == db_version):
+            return data
+        version = self._versions[name]
+        model = self._models[name]
+        result = await db.execute(select(model.id, model.name))
+        data = {item_id: item_name for item_id, item_name in result.all()}
+        # Справочник изменили во время загрузки — результат уже устарел
+        if self._versions[name] == version:
+            self._data[name] = data
+            self._db_versions[name] = db_version
+        return data
+
+    async def get_covering(self, db: AsyncSession, name: str, ids, db_version: Optional[int] = None) -> dict:
+        """Справочник, в котором есть все ids.
+
+        Запись могли добавить в базу в обход API (например, первую роль
+        при развёртывании) — тогда кэш этого воркера перечитывается один раз.
+        """
+        data = await self.get(db, name, db_version)
+        if any(item_id is not None and item_id not in data for item_id in ids):
+            self.invalidate(name)
+            data = await self.get(db, name, db_version)
+        return data
+
+    async def get_many(self, db: AsyncSession, *names: str, db_version: Optional[int] = None) -> dict:
+        """Несколько справочников: {имя справочника: {id: название}}"""
+        return {name: await self.get(db, name, db_version) for name in names}
+
+    async def get_many_covering(self, db: AsyncSession, ids_by_name: dict, db_version: Optional[int] = None) -> dict:
+        """Несколько справочников, в каждом есть все id из ids_by_name[имя] (см. get_covering)"""
+        return {name: await self.get_covering(db, name, ids, db_version) for name, ids in ids_by_name.items()}
+
+    async def load(self, db: AsyncSession):
+        """Загрузить все справочники (при старте приложения)"""
+        await self.get_many(db, *self._models)
+
+    def invalidate(self, *names: str):
+        """Сбросить справочники (без аргументов — все)"""
+        for name in names or tuple(self._models):
+            self._versions[name] += 1
+            self._data.pop(name, None)
+            self._db_versions.pop(name, None)
+
+    def on_invalidation(self, key: Optional[str]):
+        """Обработчик сообщений шины сброса кэшей: key — имя справочника, None — все"""
+        if key is None:
+            self.invalidate()
+        elif key in self._models:
+            self.invalidate(key)
+
+
+dictionary_cache = DictionaryCache(DICTIONARY_MODELS)
+
+
+async def invalidate_dictionary(name: str):
+    """Сбросить справочник в этом и остальных воркерах (после commit)"""
+    await invalidation_bus.publish(DICTIONARIES_TOPIC, name)
@@ -0,0 +1,117 @@
+from copy import deepcopy
+from io import BytesIO
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+
+from app.config.reports import (
+    REPORT_EXECUTOR_KIND,
+    REPORT_MAX_WORKERS,
+    REPORT_MAX_QUEUE,
+)
+from app.utils.executor import BoundedExecutor
+
+# Пул, в котором строятся и сериализуются документы
+report_executor = BoundedExecutor(
+    max_workers=REPORT_MAX_WORKERS,
+    max_queue=REPORT_MAX_QUEUE,
+    kind=REPORT_EXECUTOR_KIND,
+)
+
+W_T = qn("w:t")
+
+TABLE_HEADERS = ('Должность', 'Фамилия', 'Имя', 'Отчество', 'Кол-во дней', 'Период отпуска')
+
+
+def format_vacation_row(position_name, last_name, first_name, middle_name, main_vacation_days, start_date, end_date) -> tuple:
+    """Строка таблицы отчёта.
+
+    Возвращает кортеж строк, чтобы его можно было передать в пул процессов.
+    """
+    return (
+        position_name or "Не указана",
+        last_name,
+        first_name,
+        middle_name or "",
+        str(main_vacation_days),
+        f"{start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}",
+    )
+
+
+def vacation_row(vac) -> tuple:
+    """Строка таблицы отчёта из отпуска (с загруженными staff и position)"""
+    return format_vacation_row(
+        vac.staff.position.name if vac.staff.position else None,
+        vac.staff.last_name,
+        vac.staff.first_name,
+        vac.staff.middle_name,
+        vac.main_vacation_days,
+        vac.start_date,
+        vac.end_date,
+    )
+
+
+def _add_vacation_table(doc, rows):
+    table = doc.add_table(rows=1, cols=len(TABLE_HEADERS))
+    hdr_cells = table.rows[0].cells
+    for cell, title in zip(hdr_cells, TABLE_HEADERS):
+        cell.text = title
+
+    # Центрируем текст в заголовках таблицы
+    for cell in hdr_cells:
+        for paragraph in cell.paragraphs:
+            paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    fill_table_rows(table, rows)
+    return table
+
+
+def fill_table_rows(table, rows):
+    """Быстрое заполнение таблицы строками.
+
+    table.add_row().cells и cell.text каждый раз заново обходят XML таблицы,
+    поэтому вместо них один раз собирается шаблон строки, который затем
+    копируется через lxml, а в копии проставляются только тексты ячеек.
+    """
+    tbl = table._tbl
+    template = table.add_row()._tr
+    tbl.remove(template)
+    for tc in template.tc_lst:
+        t = tc.p_lst[0].add_r().add_t("")
+        t.set(qn("xml:space"), "preserve")
+
+    for row in rows:
+        tr = deepcopy(template)
+        for t, value in zip(tr.iter(W_T), row):
+            t.text = value
+        tbl.append(tr)
+
+
+def _to_bytes(doc) -> bytes:
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def build_department_docx(year: int, department_name: str, rows: list) -> bytes:
+    """График отпусков одного отдела"""
+    doc = Document()
+
+    # Заголовок "График отпусков за {year} год" по центру
+    heading1 = doc.add_paragraph()
+    heading1.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    heading1.add_run(f'График отпусков за {year} год').bold = True
+
+    # Заголовок "отдел: {department_name}" по центру
+    heading2 = doc.add_paragraph()
+    heading2.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    heading2.add_run(f'отдел: {department_name}').bold = True
+
+    _add_vacation_table(doc, rows)
+
+    # Подпись внизу
+    doc.add_paragraph()  # пустая строка перед подписью
+    signature = doc.add_paragraph()
+    signature.add_run('Начальник отдела: _____________________________')
+
+    return _to_bytes(doc)
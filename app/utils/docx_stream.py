@@ -0,0 +1,151 @@
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+# Минимальный набор частей DOCX-пакета
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+DOCUMENT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:styles xmlns:w="{W_NS}">'
+    '<w:docDefaults><w:rPrDefault><w:rPr><w:sz w:val="22"/><w:lang w:val="ru-RU"/></w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="160" w:line="259" w:lineRule="auto"/></w:pPr></w:pPrDefault>'
+    '</w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/>'
+    '<w:rPr><w:sz w:val="56"/></w:rPr></w:style>'
+    '<w:style w:type="table" w:default="1" w:styleId="TableNormal"><w:name w:val="Normal Table"/>'
+    '<w:tblPr><w:tblCellMar><w:left w:w="108" w:type="dxa"/><w:right w:w="108" w:type="dxa"/>'
+    '</w:tblCellMar></w:tblPr></w:style>'
+    '</w:styles>'
+)
+
+DOCUMENT_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:document xmlns:w="{W_NS}"><w:body>'
+)
+
+# Раздел A4 с полями по умолчанию
+DOCUMENT_END = (
+    '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/>'
+    '<w:pgMar w:top="1134" w:right="850" w:bottom="1134" w:left="1701" '
+    'w:header="708" w:footer="708" w:gutter="0"/></w:sectPr>'
+    '</w:body></w:document>'
+)
+
+
+class ChunkBuffer(io.RawIOBase):
+    """Поток без seek, накапливающий записанные байты до их выдачи"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _run(text: str, bold: bool = False) -> str:
+    rpr = "<w:rPr><w:b/></w:rPr>" if bold else ""
+    return f'<w:r>{rpr}<w:t xml:space="preserve">{escape(text)}</w:t></w:r>'
+
+
+def _cell(text: str, center: bool = False) -> str:
+    ppr = '<w:pPr><w:jc w:val="center"/></w:pPr>' if center else ""
+    return f'<w:tc><w:tcPr><w:tcW w:w="0" w:type="auto"/></w:tcPr><w:p>{ppr}{_run(text)}</w:p></w:tc>'
+
+
+class StreamingDocxWriter:
+    """Потоковая запись DOCX.
+
+    document.xml пишется в zip по мере добавления абзацев и строк таблиц,
+    а готовые сжатые байты забираются методом take(), поэтому память не
+    зависит от размера документа.
+    """
+
+    def __init__(self):
+        self._buffer = ChunkBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, mode="w", compression=zipfile.ZIP_DEFLATED)
+        self._zip.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+        self._zip.writestr("_rels/.rels", ROOT_RELS_XML)
+        self._zip.writestr("word/_rels/document.xml.rels", DOCUMENT_RELS_XML)
+        self._zip.writestr("word/styles.xml", STYLES_XML)
+        self._document = self._zip.open("word/document.xml", mode="w", force_zip64=True)
+        self._write(DOCUMENT_START)
+
+    def _write(self, xml: str):
+        self._document.write(xml.encode("utf-8"))
+
+    def take(self) -> bytes:
+        """Забрать накопленные байты архива"""
+        return self._buffer.take()
+
+    def title(self, text: str):
+        self._write(f'<w:p><w:pPr><w:pStyle w:val="Title"/></w:pPr>{_run(text)}</w:p>')
+
+    def paragraph(self, text: str = "", bold: bool = False, center: bool = False):
+        ppr = '<w:pPr><w:jc w:val="center"/></w:pPr>' if center else ""
+        run = _run(text, bold) if text else ""
+        self._write(f"<w:p>{ppr}{run}</w:p>")
+
+    def page_break(self):
+        self._write('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+
+    def table_start(self, headers):
+        grid = "".join('<w:gridCol/>' for _ in headers)
+        cells = "".join(_cell(title, center=True) for title in headers)
+        self._write(
+            '<w:tbl><w:tblPr><w:tblW w:w="0" w:type="auto"/></w:tblPr>'
+            f'<w:tblGrid>{grid}</w:tblGrid><w:tr>{cells}</w:tr>'
+        )
+
+    def table_row(self, row):
+        self._write("<w:tr>" + "".join(_cell(value) for value in row) + "</w:tr>")
+
+    def table_end(self):
+        self._write("</w:tbl>")
+
+    def close(self) -> bytes:
+        """Завершить документ и вернуть оставшиеся байты архива"""
+        self._write(DOCUMENT_END)
+        self._document.close()
+        self._zip.close()
+        return self.take()
@@ -0,0 +1,28 @@
+from typing import Optional
+from fastapi import Response
+
+# Ответ можно хранить, но перед использованием надо сверить ETag с сервером
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def data_etag(name: str, *versions) -> str:
+    """Сильный ETag ответа по версиям данных, из которых он построен"""
+    return '"' + "-".join([name, *(str(version) for version in versions)]) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Совпадает ли ETag с заголовком If-None-Match (слабое сравнение, как требует RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
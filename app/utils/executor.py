@@ -0,0 +1,112 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+
+class ExecutorBusy(Exception):
+    """Очередь пула переполнена"""
+
+
+def _timed_call(func, *args, **kwargs):
+    """Выполнить задачу в пуле и вернуть время её начала и окончания.
+
+    time.time, а не monotonic: для пула процессов время сравнивается
+    между процессами.
+    """
+    started = time.time()
+    result = func(*args, **kwargs)
+    return result, started, time.time()
+
+
+class BoundedExecutor:
+    """Пул потоков/процессов с ограниченной очередью задач.
+
+    Одновременно принимается не более max_workers + max_queue задач,
+    остальные сразу отклоняются исключением ExecutorBusy.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Неизвестный тип пула: {kind}")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self._executor = None
+        # Задачи в работе и в очереди
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        # Время ожидания в очереди и выполнения успешно завершённых задач, секунды
+        self.measured = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.run_time_total = 0.0
+        self.run_time_max = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="bounded-executor"
+                )
+        return self._executor
+
+    def _release(self):
+        self._pending -= 1
+        self.completed += 1
+
+    def _on_done(self, loop):
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # Цикл событий уже закрыт (остановка приложения)
+            pass
+
+    async def run(self, func, *args, **kwargs):
+        """Выполнить func в пуле и дождаться результата"""
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorBusy()
+
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        future = self._get_executor().submit(partial(_timed_call, func, *args, **kwargs))
+        self._pending += 1
+        self.submitted += 1
+        # Слот освобождается по завершении задачи в пуле, даже если клиент отключился
+        future.add_done_callback(lambda f: self._on_done(loop))
+        result, started, finished = await asyncio.wrap_future(future)
+        self._measure(started - submitted_at, finished - started)
+        return result
+
+    def _measure(self, wait_time: float, run_time: float):
+        wait_time = max(wait_time, 0.0)
+        self.measured += 1
+        self.wait_time_total += wait_time
+        self.wait_time_max = max(self.wait_time_max, wait_time)
+        self.run_time_total += run_time
+        self.run_time_max = max(self.run_time_max, run_time)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_time_total / self.measured * 1000, 2) if self.measured else 0.0,
+            "max_wait_ms": round(self.wait_time_max * 1000, 2),
+            "avg_run_ms": round(self.run_time_total / self.measured * 1000, 2) if self.measured else 0.0,
+            "max_run_ms": round(self.run_time_max * 1000, 2),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
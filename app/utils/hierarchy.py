@@ -0,0 +1,189 @@
+from typing import Optional
+from sqlalchemy import select, insert, delete, update, func, literal, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app import models
+
+# Ограничение глубины при пересборке из supervisor_id, чтобы ошибочные данные не зациклили запрос
+MAX_HIERARCHY_DEPTH = 64
+
+# Значение параметра depth для всего поддерева
+DEPTH_ALL = "all"
+DEPTH_PATTERN = r"^(all|[1-9][0-9]*)$"
+
+CLOSURE_COLUMNS = ["ancestor_id", "descendant_id", "depth"]
+
+
+class HierarchyCycle(Exception):
+    """Назначение начальника создаёт цикл подчинения"""
+
+
+def parse_depth(value: str) -> Optional[int]:
+    """Глубина из параметра запроса: "all" — без ограничения (None), иначе число уровней"""
+    return None if value == DEPTH_ALL else int(value)
+
+
+def descendants_query(boss_id: int, max_depth: Optional[int] = None):
+    """Подчинённые начальника (id и уровень) одним поиском по таблице замыкания"""
+    closure = models.StaffHierarchy
+    query = select(closure.descendant_id, closure.depth).where(
+        closure.ancestor_id == boss_id,
+        closure.depth >= 1
+    )
+    if max_depth is not None:
+        query = query.where(closure.depth <= max_depth)
+    return query
+
+
+def descendant_ids(boss_id: int, max_depth: Optional[int] = None):
+    """Подзапрос id подчинённых для фильтра Staff.id.in_(...)"""
+    return descendants_query(boss_id, max_depth).with_only_columns(models.StaffHierarchy.descendant_id)
+
+
+async def is_under(db: AsyncSession, staff_id: int, boss_id: int) -> Optional[int]:
+    """Уровень подчинения staff_id начальнику boss_id или None, если не подчинён"""
+    closure = models.StaffHierarchy
+    result = await db.execute(
+        select(closure.depth).where(
+            closure.ancestor_id == boss_id,
+            closure.descendant_id == staff_id,
+            closure.depth >= 1
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def check_supervisor(db: AsyncSession, staff_id: int, supervisor_id: Optional[int]):
+    """Начальник не может быть самим сотрудником или его подчинённым"""
+    if supervisor_id is None:
+        return
+    if supervisor_id == staff_id or await is_under(db, supervisor_id, staff_id) is not None:
+        raise HierarchyCycle("Supervisor cannot be the staff member or one of their subordinates")
+
+
+async def _link_subtree(db: AsyncSession, staff_id: int, supervisor_id: int):
+    """Связать поддерево сотрудника со всеми начальниками supervisor_id (включая его самого)"""
+    closure = models.StaffHierarchy
+    above, below = aliased(closure), aliased(closure)
+    await db.execute(
+        insert(closure).from_select(
+            CLOSURE_COLUMNS,
+            select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+            .select_from(above)
+            .join(below, true())
+            .where(above.descendant_id == supervisor_id, below.ancestor_id == staff_id)
+        )
+    )
+
+
+async def _unlink_subtree(db: AsyncSession, staff_id: int):
+    """Отвязать поддерево сотрудника от его начальников"""
+    closure = models.StaffHierarchy
+    subtree = aliased(closure)
+    subtree_ids = select(subtree.descendant_id).where(subtree.ancestor_id == staff_id)
+    await db.execute(
+        delete(closure).where(
+            closure.descendant_id.in_(subtree_ids),
+            closure.ancestor_id.not_in(subtree_ids)
+        )
+    )
+
+
+async def add_staff_node(db: AsyncSession, staff_id: int, supervisor_id: Optional[int]):
+    """Добавить нового сотрудника в таблицу замыкания"""
+    await db.execute(
+        insert(models.StaffHierarchy).values(ancestor_id=staff_id, descendant_id=staff_id, depth=0)
+    )
+    if supervisor_id is not None:
+        await _link_subtree(db, staff_id, supervisor_id)
+
+
+async def add_staff_nodes(db: AsyncSession, nodes: list):
+    """Добавить пакет новых сотрудников: nodes — пары (id, supervisor_id).
+
+    Пути начальников загружаются одним запросом, строки таблицы замыкания
+    вставляются одним executemany. Начальники должны уже быть в базе.
+    """
+    if not nodes:
+        return
+    closure = models.StaffHierarchy
+    supervisor_ids = {supervisor_id for _, supervisor_id in nodes if supervisor_id is not None}
+    ancestors = {}
+    if supervisor_ids:
+        result = await db.execute(
+            select(closure.descendant_id, closure.ancestor_id, closure.depth)
+            .where(closure.descendant_id.in_(supervisor_ids))
+        )
+        for descendant_id, ancestor_id, depth in result.all():
+            ancestors.setdefault(descendant_id, []).append((ancestor_id, depth))
+
+    rows = []
+    for staff_id, supervisor_id in nodes:
+        rows.append({"ancestor_id": staff_id, "descendant_id": staff_id, "depth": 0})
+        for ancestor_id, depth in ancestors.get(supervisor_id, ()):
+            rows.append({"ancestor_id": ancestor_id, "descendant_id": staff_id, "depth": depth + 1})
+    await db.execute(insert(closure), rows)
+
+
+async def move_staff_node(db: AsyncSession, staff_id: int, supervisor_id: Optional[int]):
+    """Перенести сотрудника вместе с подчинёнными к новому начальнику"""
+    await _unlink_subtree(db, staff_id)
+    if supervisor_id is not None:
+        await _link_subtree(db, staff_id, supervisor_id)
+
+
+async def remove_staff_node(db: AsyncSession, staff_id: int):
+    """Удалить сотрудника из иерархии.
+
+    Пути через него удаляются, прямые подчинённые остаются без начальника
+    и становятся корнями своих поддеревьев.
+    """
+    closure = models.StaffHierarchy
+    await _unlink_subtree(db, staff_id)
+    await db.execute(
+        delete(closure).where((closure.ancestor_id == staff_id) | (closure.descendant_id == staff_id))
+    )
+    await db.execute(
+        update(models.Staff)
+        .where(models.Staff.supervisor_id == staff_id, models.Staff.id != staff_id)
+        .values(supervisor_id=None)
+    )
+
+
+async def rebuild_staff_hierarchy(db: AsyncSession):
+    """Пересобрать таблицу замыкания из Staff.supervisor_id одним рекурсивным запросом"""
+    closure = models.StaffHierarchy
+    tree = (
+        select(
+            models.Staff.id.label("ancestor_id"),
+            models.Staff.id.label("descendant_id"),
+            literal(0).label("depth")
+        )
+        .cte("closure", recursive=True)
+    )
+    tree = tree.union_all(
+        select(tree.c.ancestor_id, models.Staff.id, tree.c.depth + 1)
+        .join(tree, models.Staff.supervisor_id == tree.c.descendant_id)
+        # Возврат в исходного сотрудника означает цикл в supervisor_id
+        .where(models.Staff.id != tree.c.ancestor_id, tree.c.depth < MAX_HIERARCHY_DEPTH)
+    )
+    await db.execute(delete(closure))
+    await db.execute(
+        insert(closure).from_select(
+            CLOSURE_COLUMNS,
+            select(tree.c.ancestor_id, tree.c.descendant_id, func.min(tree.c.depth))
+            .group_by(tree.c.ancestor_id, tree.c.descendant_id)
+        )
+    )
+
+
+async def ensure_staff_hierarchy(db: AsyncSession):
+    """Заполнить таблицу замыкания, если она пуста (первый запуск или новая база)"""
+    closure_count = (await db.execute(select(func.count()).select_from(models.StaffHierarchy))).scalar_one()
+    if closure_count:
+        return
+    staff_count = (await db.execute(select(func.count()).select_from(models.Staff))).scalar_one()
+    if staff_count:
+        await rebuild_staff_hierarchy(db)
+        await db.commit()
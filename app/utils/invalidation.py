@@ -0,0 +1,263 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Callable, Optional
+from sqlalchemy.engine import make_url
+
+from app.config.database import ASYNC_SQLALCHEMY_DATABASE_URL
+from app.config.invalidation import (
+    INVALIDATION_BACKEND,
+    INVALIDATION_CHANNEL,
+    INVALIDATION_FILE,
+    INVALIDATION_FILE_MAX_BYTES,
+    INVALIDATION_POLL_INTERVAL,
+    INVALIDATION_RECONNECT_DELAY,
+)
+
+logger = logging.getLogger(__name__)
+
+BACKEND_MEMORY = "memory"
+BACKEND_FILE = "file"
+BACKEND_POSTGRES = "postgres"
+
+# Идентификатор процесса: свои сообщения, вернувшиеся через транспорт, повторно не обрабатываются
+WORKER_ID = uuid.uuid4().hex
+
+# Проверка соединения LISTEN, секунды (обрыв без закрытия сокета иначе не заметить)
+POSTGRES_PING_INTERVAL = 30
+# Сколько неотправленных сообщений держать, пока нет соединения
+POSTGRES_MAX_PENDING = 1000
+
+
+class InvalidationBus:
+    """Сброс кэшей во всех воркерах.
+
+    Обработчики подписываются на тему (например, "dictionaries") и получают
+    ключ изменившихся данных. publish сразу вызывает обработчики текущего
+    процесса и передаёт сообщение остальным через транспорт. Если сообщения
+    могли потеряться (разрыв соединения, файл начат заново), обработчики
+    получают key=None — сбросить всё по теме.
+
+    Сам класс — транспорт memory для одного процесса и тестов.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+
+    def subscribe(self, topic: str, handler: Callable[[Optional[str]], None]):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def dispatch(self, topic: str, key: Optional[str] = None):
+        for handler in self._handlers.get(topic, ()):
+            handler(key)
+
+    def dispatch_all(self):
+        for topic in self._handlers:
+            self.dispatch(topic)
+
+    def _receive(self, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("origin") != WORKER_ID:
+            self.dispatch(message.get("topic"), message.get("key"))
+
+    async def publish(self, topic: str, key: Optional[str] = None):
+        """Сбросить кэш в этом и остальных воркерах (вызывается после commit)"""
+        self.dispatch(topic, key)
+        await self._send(json.dumps({"origin": WORKER_ID, "topic": topic, "key": key}))
+
+    async def _send(self, payload: str):
+        pass
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class FileInvalidationBus(InvalidationBus):
+    """Транспорт через общий файл: сообщения дописываются строками,
+    каждый воркер периодически читает новые строки.
+
+    Для SQLite и запуска нескольких воркеров на одной машине. Когда файл
+    вырастает больше max_bytes, он заменяется пустым; воркеры замечают
+    смену файла и сбрасывают всё.
+    """
+
+    def __init__(self, path: str, poll_interval: float, max_bytes: int):
+        super().__init__()
+        self._path = Path(path)
+        self._poll_interval = poll_interval
+        self._max_bytes = max_bytes
+        self._inode = None
+        self._offset = 0
+        self._task = None
+
+    async def start(self):
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._path.touch(exist_ok=True)
+        stat = self._path.stat()
+        self._inode, self._offset = stat.st_ino, stat.st_size
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _send(self, payload: str):
+        # O_APPEND: короткая строка дописывается целиком даже при записи из нескольких процессов
+        fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (payload + "\n").encode("utf-8"))
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size > self._max_bytes:
+            empty = self._path.with_name(f"{self._path.name}.{WORKER_ID}.tmp")
+            empty.touch()
+            os.replace(empty, self._path)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            try:
+                self.read_messages()
+            except OSError as e:
+                logger.warning("Cannot read invalidation file %s: %s", self._path, e)
+
+    def read_messages(self):
+        """Обработать строки, появившиеся с прошлой проверки"""
+        self._path.touch(exist_ok=True)
+        with open(self._path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                # Файл заменён: часть сообщений могла пройти мимо
+                self._inode, self._offset = stat.st_ino, 0
+                self.dispatch_all()
+            if stat.st_size <= self._offset:
+                return
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        # Недописанная последняя строка будет прочитана при следующей проверке
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        for line in data[:end].splitlines():
+            self._receive(line.decode("utf-8", "replace"))
+
+
+class PostgresInvalidationBus(InvalidationBus):
+    """Транспорт через LISTEN/NOTIFY PostgreSQL на отдельном соединении asyncpg.
+
+    При обрыве соединение восстанавливается, после восстановления все кэши
+    сбрасываются (уведомления за время разрыва не доставляются), а
+    неотправленные сообщения отправляются.
+    """
+
+    def __init__(self, dsn: str, channel: str, reconnect_delay: float):
+        super().__init__()
+        self._dsn = dsn
+        self._channel = channel
+        self._reconnect_delay = reconnect_delay
+        self._connection = None
+        self._pending = deque(maxlen=POSTGRES_MAX_PENDING)
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._receive(payload)
+
+    async def _run(self):
+        import asyncpg
+
+        reconnect = False
+        while True:
+            try:
+                connection = await asyncpg.connect(self._dsn)
+                await connection.add_listener(self._channel, self._on_notify)
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning("Cannot listen for cache invalidation: %s", e)
+                await asyncio.sleep(self._reconnect_delay)
+                continue
+
+            self._connection = connection
+            if reconnect:
+                self.dispatch_all()
+            reconnect = True
+            await self._flush()
+            while not connection.is_closed():
+                await asyncio.sleep(POSTGRES_PING_INTERVAL)
+                try:
+                    async with self._lock:
+                        await asyncio.wait_for(connection.execute("SELECT 1"), POSTGRES_PING_INTERVAL)
+                except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                    connection.terminate()
+            self._connection = None
+            await asyncio.sleep(self._reconnect_delay)
+
+    async def _send(self, payload: str):
+        self._pending.append(payload)
+        await self._flush()
+
+    async def _flush(self):
+        import asyncpg
+
+        async with self._lock:
+            while self._pending and self._connection is not None:
+                try:
+                    await self._connection.execute("SELECT pg_notify($1, $2)", self._channel, self._pending[0])
+                except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                    logger.warning("Cannot publish cache invalidation: %s", e)
+                    return
+                self._pending.popleft()
+
+
+def create_invalidation_bus(database_url: str, backend: str = INVALIDATION_BACKEND) -> InvalidationBus:
+    """Транспорт по настройке INVALIDATION_BACKEND (auto — по типу базы)"""
+    url = make_url(database_url)
+    if backend == "auto":
+        if url.get_driver_name() == "asyncpg":
+            backend = BACKEND_POSTGRES
+        elif url.get_backend_name() == "sqlite":
+            backend = BACKEND_FILE
+        else:
+            backend = BACKEND_MEMORY
+
+    if backend == BACKEND_POSTGRES:
+        # asyncpg принимает обычный DSN без драйвера и параметров диалекта SQLAlchemy
+        dsn = url.set(drivername="postgresql", query={}).render_as_string(hide_password=False)
+        return PostgresInvalidationBus(dsn, INVALIDATION_CHANNEL, INVALIDATION_RECONNECT_DELAY)
+    if backend == BACKEND_FILE:
+        return FileInvalidationBus(INVALIDATION_FILE, INVALIDATION_POLL_INTERVAL, INVALIDATION_FILE_MAX_BYTES)
+    if backend == BACKEND_MEMORY:
+        return InvalidationBus()
+    raise ValueError(f"Unknown INVALIDATION_BACKEND: {backend}")
+
+
+invalidation_bus = create_invalidation_bus(ASYNC_SQLALCHEMY_DATABASE_URL)
@@ -0,0 +1,87 @@
+import base64
+import json
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Заголовки ответа списка: курсор следующей страницы и общее количество
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+@dataclass
+class Page:
+    """Параметры страницы списка"""
+    limit: int
+    after_id: Optional[int] = None
+    skip: int = 0
+    with_total: bool = False
+
+    def key(self) -> str:
+        """Параметры страницы для ETag: у разных страниц разные ETag"""
+        # С курсором смещение не применяется (см. paginate)
+        start = f"after{self.after_id}" if self.after_id is not None else f"skip{self.skip}"
+        return f"{start}-limit{self.limit}-total{int(self.with_total)}"
+
+
+def encode_cursor(last_id: int) -> str:
+    """Непрозрачный курсор: id последней записи страницы"""
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
+
+def page_params(
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, description="Устаревшее смещение, используется только без cursor"),
+    with_total: bool = Query(False, description="Вернуть общее количество в заголовке X-Total-Count"),
+) -> Page:
+    """Зависимость FastAPI с параметрами постраничного вывода"""
+    return Page(
+        limit=limit,
+        after_id=decode_cursor(cursor) if cursor else None,
+        skip=skip,
+        with_total=with_total,
+    )
+
+
+async def paginate(db: AsyncSession, query, key_column, page: Page, response: Response) -> list:
+    """Страница списка по ключу (keyset): WHERE key > курсор ORDER BY key LIMIT n.
+
+    В отличие от OFFSET, стоимость не растёт с номером страницы, а вставки
+    во время обхода не сдвигают страницы. Курсор следующей страницы
+    возвращается в X-Next-Cursor, общее количество считается только
+    по запросу (with_total).
+    """
+    if page.with_total:
+        total = await db.execute(select(func.count()).select_from(query.order_by(None).subquery()))
+        response.headers[TOTAL_COUNT_HEADER] = str(total.scalar_one())
+
+    query = query.order_by(key_column)
+    if page.after_id is not None:
+        query = query.where(key_column > page.after_id)
+    elif page.skip:
+        query = query.offset(page.skip)
+
+    # Одна лишняя запись показывает, есть ли следующая страница
+    result = await db.execute(query.limit(page.limit + 1))
+    items = result.scalars().all()
+    if len(items) > page.limit:
+        items = items[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(items[-1], key_column.key))
+    return items
@@ -0,0 +1,38 @@
+from fastapi import HTTPException
+
+from app.config.security import (
+    PASSWORD_HASH_MAX_QUEUE,
+    PASSWORD_HASH_RETRY_AFTER,
+    PASSWORD_HASH_WORKERS,
+    get_password_hash,
+    verify_password,
+)
+from app.utils.executor import BoundedExecutor, ExecutorBusy
+
+# bcrypt занимает 100-300 мс процессора на пароль и освобождает GIL,
+# поэтому выполняется в отдельном пуле потоков, а не в цикле событий
+password_executor = BoundedExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    max_queue=PASSWORD_HASH_MAX_QUEUE,
+    kind="thread",
+)
+
+
+async def _run_in_pool(func, *args):
+    """Выполнить функцию в пуле паролей; при переполнении очереди — 503"""
+    try:
+        return await password_executor.run(func, *args)
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many password checks in progress, try again later",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+        )
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_pool(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_pool(get_password_hash, password)
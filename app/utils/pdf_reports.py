@@ -0,0 +1,109 @@
+from functools import lru_cache
+from pathlib import Path
+from fpdf import FPDF
+
+from app.config.reports import REPORT_PDF_FONT, REPORT_PDF_FONT_BOLD
+from app.utils.docx_reports import TABLE_HEADERS
+
+FONT_FAMILY = "DejaVu"
+# Ширины колонок (в долях), порядок как в TABLE_HEADERS
+COL_WIDTHS = (22, 18, 15, 18, 9, 18)
+ROW_HEIGHT = 6
+FONT_SEARCH_DIRS = (
+    "/usr/share/fonts/truetype/dejavu",
+    "/usr/share/fonts/truetype",
+    "/usr/share/fonts/dejavu",
+    "/usr/share/fonts/TTF",
+)
+
+
+@lru_cache(maxsize=None)
+def _font_path(configured: str) -> str:
+    """Путь к шрифту: из настроек или найденный в системных каталогах"""
+    if Path(configured).is_file():
+        return configured
+    name = Path(configured).name
+    for directory in FONT_SEARCH_DIRS:
+        candidate = Path(directory) / name
+        if candidate.is_file():
+            return str(candidate)
+    raise FileNotFoundError(f"Не найден шрифт для PDF: {configured}")
+
+
+def _new_pdf() -> FPDF:
+    pdf = FPDF(orientation="landscape", format="A4")
+    pdf.add_font(FONT_FAMILY, "", _font_path(REPORT_PDF_FONT))
+    pdf.add_font(FONT_FAMILY, "B", _font_path(REPORT_PDF_FONT_BOLD))
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    return pdf
+
+
+def _heading(pdf: FPDF, text: str, size: int = 12):
+    pdf.set_font(FONT_FAMILY, "B", size)
+    pdf.cell(0, 8, text, align="C", new_x="LMARGIN", new_y="NEXT")
+
+
+def _table_header(pdf: FPDF, widths):
+    pdf.set_font(FONT_FAMILY, "B", 9)
+    for width, title in zip(widths, TABLE_HEADERS):
+        pdf.cell(width, ROW_HEIGHT, title, border=1, align="C")
+    pdf.ln(ROW_HEIGHT)
+    pdf.set_font(FONT_FAMILY, "", 9)
+
+
+def _vacation_table(pdf: FPDF, rows):
+    """Таблица отпусков с повтором шапки на каждой странице.
+
+    Строки рисуются ячейками фиксированной высоты: это на порядок быстрее
+    pdf.table(), который для каждой ячейки рассчитывает перенос текста.
+    """
+    total = sum(COL_WIDTHS)
+    widths = [pdf.epw * width / total for width in COL_WIDTHS]
+    _table_header(pdf, widths)
+    for row in rows:
+        if pdf.will_page_break(ROW_HEIGHT):
+            pdf.add_page()
+            _table_header(pdf, widths)
+        for width, value in zip(widths, row):
+            pdf.cell(width, ROW_HEIGHT, value, border=1)
+        pdf.ln(ROW_HEIGHT)
+
+
+def build_department_pdf(year: int, department_name: str, rows: list) -> bytes:
+    """График отпусков одного отдела в PDF"""
+    pdf = _new_pdf()
+    _heading(pdf, f'График отпусков за {year} год')
+    _heading(pdf, f'отдел: {department_name}')
+    pdf.ln(2)
+
+    _vacation_table(pdf, rows)
+
+    # Подпись внизу
+    pdf.ln(8)
+    pdf.set_font(FONT_FAMILY, "", 11)
+    pdf.cell(0, 8, 'Начальник отдела: _____________________________', new_x="LMARGIN", new_y="NEXT")
+    return bytes(pdf.output())
+
+
+def build_all_departments_pdf(year: int, sections: list) -> bytes:
+    """График отпусков всех отделов в PDF.
+
+    sections - список пар (название отдела, строки таблицы).
+    """
+    pdf = _new_pdf()
+    _heading(pdf, f'График отпусков за {year} год (все отделы)', size=16)
+
+    for index, (department_name, rows) in enumerate(sections):
+        if index:
+            # Каждый отдел с новой страницы
+            pdf.add_page()
+        _heading(pdf, f'Отдел: {department_name}')
+        pdf.ln(2)
+
+        if not rows:
+            pdf.set_font(FONT_FAMILY, "", 11)
+            pdf.cell(0, 8, 'Нет данных об отпусках.', new_x="LMARGIN", new_y="NEXT")
+        else:
+            _vacation_table(pdf, rows)
+    return bytes(pdf.output())
@@ -0,0 +1,132 @@
+from types import MappingProxyType
+from typing import Optional
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.utils.auth import Principal, get_current_principal
+from app.utils.hierarchy import is_under
+
+# Права доступа
+DICTIONARIES_READ = "dictionaries:read"
+DICTIONARIES_WRITE = "dictionaries:write"
+ROLES_WRITE = "roles:write"
+USERS_MANAGE = "users:manage"
+STAFF_READ_ALL = "staff:read:all"
+# Только свои данные и данные подчинённых (по иерархии подчинения)
+STAFF_READ_OWN = "staff:read:own"
+STAFF_WRITE = "staff:write"
+VACATIONS_READ_ALL = "vacations:read:all"
+VACATIONS_READ_OWN = "vacations:read:own"
+VACATIONS_WRITE_ALL = "vacations:write:all"
+VACATIONS_WRITE_OWN = "vacations:write:own"
+REPORTS_GENERATE = "reports:generate"
+SYSTEM_MONITOR = "system:monitor"
+
+# Роли по Role_s.name
+ROLE_ADMIN = "admin"
+ROLE_KADRY = "kadry"
+ROLE_WORK = "work"
+
+# Право вместе с правами, которые из него следуют
+IMPLIED_PERMISSIONS = {
+    DICTIONARIES_WRITE: {DICTIONARIES_READ},
+    ROLES_WRITE: {DICTIONARIES_WRITE},
+    STAFF_READ_ALL: {STAFF_READ_OWN},
+    STAFF_WRITE: {STAFF_READ_ALL},
+    VACATIONS_READ_ALL: {VACATIONS_READ_OWN},
+    VACATIONS_WRITE_OWN: {VACATIONS_READ_OWN},
+    VACATIONS_WRITE_ALL: {VACATIONS_WRITE_OWN, VACATIONS_READ_ALL},
+}
+
+ALL_PERMISSIONS = frozenset({
+    DICTIONARIES_READ,
+    DICTIONARIES_WRITE,
+    ROLES_WRITE,
+    USERS_MANAGE,
+    STAFF_READ_ALL,
+    STAFF_READ_OWN,
+    STAFF_WRITE,
+    VACATIONS_READ_ALL,
+    VACATIONS_READ_OWN,
+    VACATIONS_WRITE_ALL,
+    VACATIONS_WRITE_OWN,
+    REPORTS_GENERATE,
+    SYSTEM_MONITOR,
+})
+
+ROLE_GRANTS = {
+    ROLE_ADMIN: ALL_PERMISSIONS,
+    # Отдел кадров ведёт персонал, справочники и графики всех отделов
+    ROLE_KADRY: {DICTIONARIES_WRITE, STAFF_WRITE, VACATIONS_WRITE_ALL, REPORTS_GENERATE},
+    # Сотрудник видит себя и подчинённых и планирует их отпуска
+    ROLE_WORK: {DICTIONARIES_READ, STAFF_READ_OWN, VACATIONS_WRITE_OWN},
+}
+
+NO_PERMISSIONS = frozenset()
+
+
+def compile_role_permissions(grants: dict) -> MappingProxyType:
+    """Раскрыть права ролей с учётом следующих из них прав в неизменяемую таблицу"""
+    compiled = {}
+    for role, permissions in grants.items():
+        expanded = set()
+        pending = list(permissions)
+        while pending:
+            permission = pending.pop()
+            if permission not in expanded:
+                expanded.add(permission)
+                pending.extend(IMPLIED_PERMISSIONS.get(permission, ()))
+        compiled[role] = frozenset(expanded)
+    return MappingProxyType(compiled)
+
+
+# Права по названию роли: проверка доступа — поиск в множестве, без запросов к базе
+ROLE_PERMISSIONS = compile_role_permissions(ROLE_GRANTS)
+
+
+def has_permission(principal: Principal, permission: str) -> bool:
+    return permission in ROLE_PERMISSIONS.get(principal.role, NO_PERMISSIONS)
+
+
+def _forbidden() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+
+
+def require(*permissions: str):
+    """Зависимость: пользователь с хотя бы одним из прав"""
+    async def dependency(principal: Principal = Depends(get_current_principal)) -> Principal:
+        if not any(has_permission(principal, permission) for permission in permissions):
+            raise _forbidden()
+        return principal
+
+    return dependency
+
+
+async def can_access_staff(
+    db: AsyncSession,
+    principal: Principal,
+    staff_id: Optional[int],
+    all_permission: str,
+    own_permission: str,
+) -> bool:
+    """Доступ к данным сотрудника: право на всех или на себя и подчинённых"""
+    granted = ROLE_PERMISSIONS.get(principal.role, NO_PERMISSIONS)
+    if all_permission in granted:
+        return True
+    if own_permission not in granted or principal.staff_id is None or staff_id is None:
+        return False
+    if staff_id == principal.staff_id:
+        return True
+    return await is_under(db, staff_id, principal.staff_id) is not None
+
+
+async def check_staff_access(
+    db: AsyncSession,
+    principal: Principal,
+    staff_id: Optional[int],
+    all_permission: str,
+    own_permission: str,
+):
+    """То же, что can_access_staff, но без доступа — 403"""
+    if not await can_access_staff(db, principal, staff_id, all_permission, own_permission):
+        raise _forbidden()
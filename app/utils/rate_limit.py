@@ -0,0 +1,361 @@
+import ipaddress
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Optional
+from fastapi import HTTPException, Request, status
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import models
+from app.config.database import AsyncSessionLocal, async_engine
+from app.config.rate_limits import (
+    LOGIN_LOCKOUT_SECONDS,
+    LOGIN_LOCKOUT_THRESHOLD,
+    LOGIN_LOCKOUT_WINDOW,
+    LOGIN_PER_IP_BURST,
+    LOGIN_PER_IP_PER_MINUTE,
+    LOGIN_PER_LOGIN_BURST,
+    LOGIN_PER_LOGIN_PER_MINUTE,
+    LOGIN_RATE_LIMIT_BACKEND,
+    LOGIN_RATE_LIMIT_ENABLED,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_PURGE_INTERVAL,
+    TRUSTED_PROXIES,
+)
+
+BACKEND_MEMORY = "memory"
+BACKEND_DATABASE = "database"
+
+
+class RateLimitStore(ABC):
+    """Хранилище счётчиков ограничителя.
+
+    Время передаётся явно (секунды от эпохи), одинаковое для всех воркеров.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, capacity: int, refill_per_second: float, now: float) -> float:
+        """Взять токен из корзины: 0 — разрешено, иначе через сколько секунд появится токен"""
+
+    @abstractmethod
+    async def add_failure(self, key: str, threshold: int, window: float, lockout: float, now: float) -> float:
+        """Учесть неудачную попытку: время окончания блокировки или 0"""
+
+    @abstractmethod
+    async def locked_until(self, key: str, now: float) -> float:
+        """Время окончания блокировки или 0"""
+
+    @abstractmethod
+    async def clear_failures(self, key: str):
+        """Сбросить неудачные попытки (после успешного входа)"""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Счётчики в памяти процесса.
+
+    Корзина — [токены, время обновления, время, когда она снова станет полной],
+    пополняется при обращении. Неудачные попытки — очередь времён не длиннее
+    порога (скользящее окно). Когда ключей больше max_keys, удаляются полные
+    корзины, окна без попыток за failure_ttl секунд и истёкшие блокировки,
+    затем — самые старые ключи.
+    """
+
+    def __init__(self, max_keys: int, failure_ttl: float):
+        self._max_keys = max_keys
+        self._failure_ttl = failure_ttl
+        self._buckets = {}
+        self._failures = {}
+        self._locks = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets) + len(self._failures) + len(self._locks)
+
+    async def take(self, key: str, capacity: int, refill_per_second: float, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._trim(now)
+            bucket = self._buckets[key] = [float(capacity), now, now]
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        bucket[0], bucket[1] = tokens, now
+        bucket[2] = now + (capacity - tokens) / refill_per_second if refill_per_second > 0 else math.inf
+        if allowed:
+            return 0.0
+        return (1 - tokens) / refill_per_second if refill_per_second > 0 else math.inf
+
+    async def add_failure(self, key: str, threshold: int, window: float, lockout: float, now: float) -> float:
+        failures = self._failures.get(key)
+        if failures is None:
+            self._trim(now)
+            failures = self._failures[key] = deque(maxlen=threshold)
+        failures.append(now)
+        # Очередь хранит последние threshold попыток: блокировка, если все они в окне
+        if len(failures) >= threshold and now - failures[0] <= window:
+            failures.clear()
+            self._locks[key] = now + lockout
+            return now + lockout
+        return 0.0
+
+    async def locked_until(self, key: str, now: float) -> float:
+        until = self._locks.get(key)
+        if until is None:
+            return 0.0
+        if until <= now:
+            del self._locks[key]
+            return 0.0
+        return until
+
+    async def clear_failures(self, key: str):
+        self._failures.pop(key, None)
+
+    def _trim(self, now: float):
+        if len(self) < self._max_keys:
+            return
+        # Полная корзина ничем не отличается от отсутствующей
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        self._failures = {
+            key: failures for key, failures in self._failures.items()
+            if failures and failures[-1] > now - self._failure_ttl
+        }
+        self._locks = {key: until for key, until in self._locks.items() if until > now}
+        for items in (self._buckets, self._failures):
+            while items and len(self) >= self._max_keys:
+                del items[next(iter(items))]
+
+
+def _least(a, b):
+    return case((a < b, a), else_=b)
+
+
+class DatabaseRateLimitStore(RateLimitStore):
+    """Счётчики в таблице rate_limit_counters, общие для всех воркеров.
+
+    Каждая операция — один INSERT .. ON CONFLICT DO UPDATE .. RETURNING,
+    поэтому одновременные попытки из разных воркеров не теряют изменений.
+    Неудачные попытки считаются в окне от первой неудачной попытки.
+    Счётчики без изменений дольше idle_ttl удаляются не чаще purge_interval.
+    """
+
+    def __init__(self, session_factory, idle_ttl: float, purge_interval: float):
+        self._session_factory = session_factory
+        self._idle_ttl = idle_ttl
+        self._purge_interval = purge_interval
+        self._purged_at = 0.0
+        self._table = models.RateLimitCounter.__table__
+
+    def _insert(self):
+        insert = pg_insert if async_engine.dialect.name == "postgresql" else sqlite_insert
+        return insert(self._table)
+
+    async def _execute(self, stmt):
+        async with self._session_factory() as db:
+            result = await db.execute(stmt)
+            row = result.first()
+            await db.commit()
+        return row
+
+    async def take(self, key: str, capacity: int, refill_per_second: float, now: float) -> float:
+        await self._purge(now)
+        t = self._table.c
+        refilled = _least(float(capacity), t.tokens + (now - t.updated_at) * refill_per_second)
+        stmt = self._insert().values(key=key, tokens=capacity - 1, updated_at=now, allowed=capacity >= 1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.key],
+            set_={
+                "tokens": case((refilled >= 1, refilled - 1), else_=refilled),
+                "updated_at": now,
+                "allowed": refilled >= 1,
+            },
+        ).returning(t.tokens, t.allowed)
+        tokens, allowed = await self._execute(stmt)
+        if allowed:
+            return 0.0
+        return (1 - tokens) / refill_per_second if refill_per_second > 0 else math.inf
+
+    async def add_failure(self, key: str, threshold: int, window: float, lockout: float, now: float) -> float:
+        t = self._table.c
+        expired = now - t.window_start > window
+        failures = case((expired, 1), else_=t.failures + 1)
+        locked = failures >= threshold
+        first_locked = threshold <= 1
+        stmt = self._insert().values(
+            key=key,
+            tokens=0,
+            updated_at=now,
+            allowed=False,
+            failures=0 if first_locked else 1,
+            window_start=now,
+            locked_until=now + lockout if first_locked else 0,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.key],
+            set_={
+                "failures": case((locked, 0), else_=failures),
+                "window_start": case((expired, now), else_=t.window_start),
+                "locked_until": case((locked, now + lockout), else_=t.locked_until),
+                "updated_at": now,
+            },
+        ).returning(t.locked_until)
+        (until,) = await self._execute(stmt)
+        return until if until > now else 0.0
+
+    async def locked_until(self, key: str, now: float) -> float:
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(models.RateLimitCounter.locked_until).where(models.RateLimitCounter.key == key)
+            )
+            until = result.scalar_one_or_none()
+        return until if until is not None and until > now else 0.0
+
+    async def clear_failures(self, key: str):
+        async with self._session_factory() as db:
+            await db.execute(
+                update(models.RateLimitCounter)
+                .where(models.RateLimitCounter.key == key, models.RateLimitCounter.failures > 0)
+                .values(failures=0)
+            )
+            await db.commit()
+
+    async def _purge(self, now: float):
+        if now - self._purged_at < self._purge_interval:
+            return
+        self._purged_at = now
+        async with self._session_factory() as db:
+            await db.execute(
+                delete(models.RateLimitCounter).where(
+                    models.RateLimitCounter.updated_at < now - self._idle_ttl,
+                    models.RateLimitCounter.locked_until <= now,
+                )
+            )
+            await db.commit()
+
+
+class LoginThrottled(Exception):
+    """Слишком много попыток входа"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class LoginRateLimiter:
+    """Ограничение попыток входа: корзины токенов на логин и на IP-адрес
+    и блокировка логина после серии неудачных попыток.
+
+    check вызывается до поиска пользователя и проверки пароля, поэтому
+    отклонённая попытка не стоит ни запроса к базе, ни bcrypt.
+    """
+
+    def __init__(self, store: RateLimitStore, enabled: bool = True):
+        self.store = store
+        self.enabled = enabled
+
+    @staticmethod
+    def _login_key(login: str) -> str:
+        return login.strip().lower()
+
+    async def check(self, login: str, client_ip: Optional[str]):
+        if not self.enabled:
+            return
+        now = time.time()
+        login_key = self._login_key(login)
+        until = await self.store.locked_until(f"lock:{login_key}", now)
+        if until:
+            raise LoginThrottled(until - now)
+        wait = 0.0
+        # Без адреса клиента корзина на IP не используется: иначе все такие запросы
+        # делили бы одну корзину и один клиент мог бы ограничить остальных
+        if client_ip is not None:
+            wait = await self.store.take(f"ip:{client_ip}", LOGIN_PER_IP_BURST, LOGIN_PER_IP_PER_MINUTE / 60, now)
+        if not wait:
+            wait = await self.store.take(
+                f"login:{login_key}", LOGIN_PER_LOGIN_BURST, LOGIN_PER_LOGIN_PER_MINUTE / 60, now
+            )
+        if wait:
+            raise LoginThrottled(wait)
+
+    async def failed(self, login: str):
+        """Неверный логин или пароль"""
+        if not self.enabled:
+            return
+        login_key = self._login_key(login)
+        await self.store.add_failure(
+            f"lock:{login_key}", LOGIN_LOCKOUT_THRESHOLD, LOGIN_LOCKOUT_WINDOW, LOGIN_LOCKOUT_SECONDS, time.time()
+        )
+
+    async def succeeded(self, login: str):
+        if self.enabled:
+            await self.store.clear_failures(f"lock:{self._login_key(login)}")
+
+
+def create_rate_limit_store(backend: str = LOGIN_RATE_LIMIT_BACKEND) -> RateLimitStore:
+    if backend == BACKEND_DATABASE:
+        # Счётчик не нужен, когда окно неудач прошло и обе корзины снова полны
+        idle_ttl = max(
+            LOGIN_LOCKOUT_WINDOW,
+            LOGIN_PER_LOGIN_BURST * 60 / LOGIN_PER_LOGIN_PER_MINUTE if LOGIN_PER_LOGIN_PER_MINUTE > 0 else math.inf,
+            LOGIN_PER_IP_BURST * 60 / LOGIN_PER_IP_PER_MINUTE if LOGIN_PER_IP_PER_MINUTE > 0 else math.inf,
+        )
+        return DatabaseRateLimitStore(AsyncSessionLocal, idle_ttl, RATE_LIMIT_PURGE_INTERVAL)
+    if backend == BACKEND_MEMORY:
+        return MemoryRateLimitStore(RATE_LIMIT_MAX_KEYS, LOGIN_LOCKOUT_WINDOW)
+    raise ValueError(f"Unknown LOGIN_RATE_LIMIT_BACKEND: {backend}")
+
+
+login_limiter = LoginRateLimiter(create_rate_limit_store(), LOGIN_RATE_LIMIT_ENABLED)
+
+
+def parse_trusted_proxies(value: str) -> tuple:
+    """Адреса и подсети прокси из строки через запятую"""
+    return tuple(ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip())
+
+
+TRUSTED_PROXY_NETWORKS = parse_trusted_proxies(TRUSTED_PROXIES)
+
+
+def _is_trusted(address: str, networks: tuple) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_ip(request: Request, trusted: tuple = TRUSTED_PROXY_NETWORKS) -> Optional[str]:
+    """Адрес клиента для ограничения попыток.
+
+    За обратным прокси все запросы приходят с его адреса, поэтому для
+    доверенных прокси адрес берётся из X-Forwarded-For: справа налево,
+    первый адрес, который не принадлежит доверенному прокси. Левую часть
+    заголовка клиент может подделать, правую дописывают наши прокси.
+    """
+    peer = request.client.host if request.client else None
+    if peer is None or not trusted or not _is_trusted(peer, trusted):
+        return peer
+    forwarded = [
+        item.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for item in header.split(",")
+        if item.strip()
+    ]
+    for address in reversed(forwarded):
+        if not _is_trusted(address, trusted):
+            return address
+    return forwarded[0] if forwarded else peer
+
+
+async def check_login_allowed(login: str, client_ip: Optional[str]):
+    """Проверка перед входом: при превышении — 429 с Retry-After"""
+    try:
+        await login_limiter.check(login, client_ip)
+    except LoginThrottled as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
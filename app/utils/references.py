@@ -0,0 +1,54 @@
+from typing import Iterable
+from sqlalchemy import select, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+# Ссылки сотрудника на справочники: поле, колонка id и название для сообщения об ошибке
+STAFF_REFERENCES = (
+    ("department_id", models.Department_s.id, "Department"),
+    ("position_id", models.Position_s.id, "Position"),
+    ("rank_id", models.Rank_s.id, "Rank"),
+    ("supervisor_id", models.Staff.id, "Supervisor"),
+)
+
+
+async def missing_references(db: AsyncSession, values: dict, references=STAFF_REFERENCES) -> list:
+    """Названия справочников, в которых нет указанных id.
+
+    Все ссылки проверяются одним запросом: UNION ALL из поисков по первичному
+    ключу, каждый возвращает имя поля, если запись найдена.
+    """
+    lookups = [
+        select(literal(field).label("field")).where(column == values[field])
+        for field, column, _ in references
+        if values.get(field) is not None
+    ]
+    if not lookups:
+        return []
+    result = await db.execute(union_all(*lookups))
+    found = set(result.scalars().all())
+    return [
+        title for field, _, title in references
+        if values.get(field) is not None and field not in found
+    ]
+
+
+async def existing_ids(db: AsyncSession, column, ids: Iterable) -> set:
+    """Какие из переданных id есть в таблице — один запрос с IN"""
+    ids = {value for value in ids if value is not None}
+    if not ids:
+        return set()
+    result = await db.execute(select(column).where(column.in_(ids)))
+    return set(result.scalars().all())
+
+
+async def staff_departments(db: AsyncSession, staff_ids: Iterable) -> dict:
+    """Отделы сотрудников: {id сотрудника: department_id} только для существующих"""
+    staff_ids = {value for value in staff_ids if value is not None}
+    if not staff_ids:
+        return {}
+    result = await db.execute(
+        select(models.Staff.id, models.Staff.department_id).where(models.Staff.id.in_(staff_ids))
+    )
+    return {staff_id: department_id for staff_id, department_id in result.all()}
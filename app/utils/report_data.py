@@ -0,0 +1,158 @@
+from datetime import date
+from typing import Optional
+from sqlalchemy import exists, select, or_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.utils.docx_reports import vacation_row, format_vacation_row
+
+
+class ReportNotFound(Exception):
+    """Нет данных для отчёта"""
+
+
+async def get_department_name(db: AsyncSession, department_id: int) -> str:
+    dept_result = await db.execute(
+        select(models.Department_s.name).where(models.Department_s.id == department_id)
+    )
+    department_name = dept_result.scalar_one_or_none()
+
+    if department_name is None:
+        raise ReportNotFound("Отдел не найден")
+    return department_name
+
+
+async def load_department_report(db: AsyncSession, department_id: int, year: int) -> list:
+    """Строки таблицы графика отпусков отдела"""
+    result = await db.execute(
+        select(models.VacationSchedule)
+        .options(
+            selectinload(models.VacationSchedule.staff)
+            .selectinload(models.Staff.position)
+        )
+        .join(models.Staff)
+        .where(
+            models.Staff.department_id == department_id,
+            models.VacationSchedule.start_date >= f"{year}-01-01",
+            models.VacationSchedule.end_date <= f"{year}-12-31"
+        )
+        .order_by(models.VacationSchedule.id)
+    )
+    vacations_db = result.scalars().all()
+
+    if not vacations_db:
+        raise ReportNotFound("Нет данных об отпусках для выбранного отдела и года")
+
+    return [vacation_row(vac) for vac in vacations_db]
+
+
+async def load_departments(db: AsyncSession) -> list:
+    """Отделы для графика всех отделов: список (id, название) по возрастанию id"""
+    dept_result = await db.execute(
+        select(models.Department_s.id, models.Department_s.name)
+        .order_by(models.Department_s.id)
+    )
+    departments = [tuple(row) for row in dept_result.all()]
+
+    if not departments:
+        raise ReportNotFound("Нет отделов в системе")
+    return departments
+
+
+async def iter_all_departments_rows(db: AsyncSession, year: int, batch_size: int = 500):
+    """Отпуска всех отделов за год: (id отдела, строка таблицы).
+
+    Один запрос, строки читаются из курсора пачками и упорядочены по отделу,
+    поэтому в памяти одновременно находится не больше batch_size строк.
+    """
+    result = await db.stream(
+        select(
+            models.Staff.department_id,
+            models.Position_s.name,
+            models.Staff.last_name,
+            models.Staff.first_name,
+            models.Staff.middle_name,
+            models.VacationSchedule.main_vacation_days,
+            models.VacationSchedule.start_date,
+            models.VacationSchedule.end_date,
+        )
+        .join(models.Staff, models.VacationSchedule.staff_id == models.Staff.id)
+        .outerjoin(models.Position_s, models.Staff.position_id == models.Position_s.id)
+        .where(
+            models.Staff.department_id.isnot(None),
+            models.VacationSchedule.start_date >= f"{year}-01-01",
+            models.VacationSchedule.end_date <= f"{year}-12-31"
+        )
+        .order_by(models.Staff.department_id, models.VacationSchedule.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for department_id, *columns in result:
+        yield department_id, format_vacation_row(*columns)
+
+
+async def load_all_departments_sections(db: AsyncSession, year: int, departments: list) -> list:
+    """Данные для графика всех отделов целиком: список (название отдела, строки таблицы)"""
+    rows_by_department = {department_id: [] for department_id, _ in departments}
+    async for department_id, row in iter_all_departments_rows(db, year):
+        if department_id in rows_by_department:
+            rows_by_department[department_id].append(row)
+    return [
+        (department_name, rows_by_department[department_id])
+        for department_id, department_name in departments
+    ]
+
+
+def _vacation_in_year(year: int):
+    return (
+        (models.VacationSchedule.staff_id == models.Staff.id)
+        & (models.VacationSchedule.start_date <= date(year, 12, 31))
+        & (models.VacationSchedule.end_date >= date(year, 1, 1))
+    )
+
+
+async def calendar_staff_ids(db: AsyncSession, year: int, department_id: Optional[int] = None) -> list:
+    """Id сотрудников календаря в порядке строк: по отделу, фамилии и имени.
+
+    Уволенные попадают в выборку, только если у них есть отпуск в этом году.
+    """
+    stmt = (
+        select(models.Staff.id)
+        .where(or_(models.Staff.is_active.is_(True), exists().where(_vacation_in_year(year))))
+        .order_by(
+            models.Staff.department_id,
+            models.Staff.last_name,
+            models.Staff.first_name,
+            models.Staff.id,
+        )
+    )
+    if department_id is not None:
+        stmt = stmt.where(models.Staff.department_id == department_id)
+    result = await db.execute(stmt)
+    return list(result.scalars())
+
+
+async def load_calendar_rows(db: AsyncSession, year: int, staff_ids: list) -> list:
+    """Сотрудники staff_ids (в том же порядке) и их отпуска, пересекающиеся с годом.
+
+    У сотрудника без отпусков даты равны None.
+    """
+    result = await db.execute(
+        select(
+            models.Staff.id,
+            models.Staff.last_name,
+            models.Staff.first_name,
+            models.Staff.middle_name,
+            models.Department_s.name,
+            models.Staff.display_color,
+            models.VacationSchedule.start_date,
+            models.VacationSchedule.end_date,
+        )
+        .outerjoin(models.Department_s, models.Staff.department_id == models.Department_s.id)
+        .outerjoin(models.VacationSchedule, _vacation_in_year(year))
+        .where(models.Staff.id.in_(staff_ids))
+        .order_by(models.VacationSchedule.start_date)
+    )
+    # Сортировка устойчивая: отпуска сотрудника остаются упорядочены по дате
+    position = {staff_id: index for index, staff_id in enumerate(staff_ids)}
+    return sorted((tuple(row) for row in result.all()), key=lambda row: position[row[0]])
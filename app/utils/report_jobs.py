@@ -0,0 +1,425 @@
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select, update
+
+from app import models
+from app.config.database import AsyncSessionLocal
+from app.config.reports import (
+    REPORT_CACHE_DIR,
+    REPORT_JOB_BUSY_TIMEOUT,
+    REPORT_JOB_LEASE,
+    REPORT_MAX_JOBS,
+    REPORT_RETRY_AFTER,
+)
+from app.utils.executor import ExecutorBusy
+from app.utils.docx_reports import (
+    TABLE_HEADERS,
+    report_executor,
+    build_department_docx,
+)
+from app.utils.docx_stream import StreamingDocxWriter
+from app.utils.pdf_reports import build_department_pdf, build_all_departments_pdf
+from app.utils.data_versions import get_report_version
+from app.utils.report_data import (
+    ReportNotFound,
+    get_department_name,
+    load_department_report,
+    load_departments,
+    load_all_departments_sections,
+    iter_all_departments_rows,
+)
+
+REPORT_DEPARTMENT = "department"
+REPORT_ALL = "all"
+
+FORMAT_DOCX = "docx"
+FORMAT_PDF = "pdf"
+FORMAT_XLSX = "xlsx"
+
+# Сколько вызовов writer (строк таблиц, абзацев) передавать в пул за раз
+# при потоковом построении DOCX всех отделов
+DOCX_STREAM_BATCH = 500
+
+# Сколько раз строить отчёт, если файл кэша удаляют раньше, чем его удаётся открыть
+REPORT_CACHE_ATTEMPTS = 3
+
+UNFINISHED_STATUSES = ("pending", "running")
+FINISHED_STATUSES = ("done", "failed")
+
+MEDIA_TYPES = {
+    FORMAT_DOCX: "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    FORMAT_PDF: "application/pdf",
+    FORMAT_XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+class ReportCache:
+    """Готовые отчёты на диске.
+
+    Ключ - (тип отчёта, отдел, год, версия данных, формат), поэтому при изменении
+    данных меняется и имя файла, а более старые версии удаляются при записи новой.
+    Файл отдаётся через открытый дескриптор (open), поэтому удаление файла
+    не прерывает уже начатую отдачу; файл, удалённый до открытия, — промах кэша.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    @staticmethod
+    def _prefix(report_type: str, department_id: Optional[int], year: int) -> str:
+        return f"{report_type}_{department_id if department_id is not None else 'all'}_{year}_"
+
+    def path(self, report_type: str, department_id: Optional[int], year: int, version: int, fmt: str = FORMAT_DOCX) -> Path:
+        return self.directory / f"{self._prefix(report_type, department_id, year)}{version}.{fmt}"
+
+    def get(self, report_type: str, department_id: Optional[int], year: int, version: int, fmt: str = FORMAT_DOCX) -> Optional[Path]:
+        path = self.path(report_type, department_id, year, version, fmt)
+        return path if path.is_file() else None
+
+    def _temp_path(self, path: Path) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+    @staticmethod
+    def open(path: Path) -> Optional[BinaryIO]:
+        """Открыть файл кэша для отдачи; None, если его уже удалили"""
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+    def _commit(self, tmp_path: Path, path: Path, prefix: str, version: int):
+        # Атомарно переименовываем временный файл
+        os.replace(tmp_path, path)
+
+        # Удаляем только более старые версии этого же отчёта: медленная запись
+        # старой версии не должна удалить более новую, которую уже отдают
+        for old in self.directory.glob(f"{prefix}*{path.suffix}"):
+            old_version = old.name[len(prefix):-len(path.suffix)]
+            if old_version.isdigit() and int(old_version) < version:
+                old.unlink(missing_ok=True)
+
+    def put(self, report_type: str, department_id: Optional[int], year: int, version: int, content: bytes, fmt: str = FORMAT_DOCX) -> Path:
+        path = self.path(report_type, department_id, year, version, fmt)
+        tmp_path = self._temp_path(path)
+        tmp_path.write_bytes(content)
+        self._commit(tmp_path, path, self._prefix(report_type, department_id, year), version)
+        return path
+
+    async def stream_into(self, report_type: str, department_id: Optional[int], year: int, version: int, chunks, fmt: str = FORMAT_DOCX):
+        """Отдавать чанки дальше, одновременно записывая их в кэш.
+
+        Файл попадает в кэш, только если поток дочитан до конца.
+        """
+        path = self.path(report_type, department_id, year, version, fmt)
+        tmp_path = self._temp_path(path)
+        completed = False
+        try:
+            with open(tmp_path, "wb") as file:
+                async for chunk in chunks:
+                    file.write(chunk)
+                    yield chunk
+            self._commit(tmp_path, path, self._prefix(report_type, department_id, year), version)
+            completed = True
+        finally:
+            await chunks.aclose()
+            if not completed:
+                tmp_path.unlink(missing_ok=True)
+
+
+report_cache = ReportCache(REPORT_CACHE_DIR)
+
+
+def report_filename(report_type: str, year: int, department_name: Optional[str] = None, fmt: str = FORMAT_DOCX) -> str:
+    if report_type == REPORT_ALL:
+        return f"grafik_otpuska_all_departments_{year}.{fmt}"
+    return f"grafik_otpuska_{year}_{department_name}.{fmt}"
+
+
+async def render_with_retry(func, *args):
+    """Построение документа в пуле; при переполнении очереди ждём и повторяем.
+
+    Если пул не освободился за REPORT_JOB_BUSY_TIMEOUT секунд, ExecutorBusy
+    передаётся дальше и задание завершается ошибкой.
+    """
+    deadline = time.monotonic() + REPORT_JOB_BUSY_TIMEOUT
+    while True:
+        try:
+            return await report_executor.run(func, *args)
+        except ExecutorBusy:
+            if time.monotonic() + REPORT_RETRY_AFTER > deadline:
+                raise
+            await asyncio.sleep(REPORT_RETRY_AFTER)
+
+
+def report_etag(report_type: str, department_id: Optional[int], year: int, version: int, fmt: str = FORMAT_DOCX) -> str:
+    """ETag отчёта по версии данных"""
+    return f'"{report_type}-{department_id if department_id is not None else "all"}-{year}-{version}-{fmt}"'
+
+
+def _write_docx_batch(writer: StreamingDocxWriter, calls: list, close: bool = False) -> bytes:
+    """Выполнить накопленные вызовы writer и забрать сжатые байты (в пуле потоков)"""
+    for method, args in calls:
+        method(*args)
+    return writer.close() if close else writer.take()
+
+
+async def all_departments_docx_chunks(year: int, departments: list):
+    """Потоковое построение графика отпусков всех отделов.
+
+    departments - список (id, название) по возрастанию id. Отпуска читаются
+    в отдельной сессии одним запросом, отсортированным по отделу. В цикле
+    событий только накапливаются вызовы writer; XML и сжатие выполняются
+    в пуле потоков пачками по DOCX_STREAM_BATCH вызовов, а готовые части
+    документа сразу отдаются. Writer хранит состояние между пачками,
+    поэтому используется пул потоков, а не report_executor (он может быть
+    пулом процессов).
+    """
+    writer = StreamingDocxWriter()
+    calls = [(writer.title, (f'График отпусков за {year} год (все отделы)',))]
+
+    async with AsyncSessionLocal() as db:
+        rows = iter_all_departments_rows(db, year)
+        pending = await anext(rows, None)
+        for department_id, department_name in departments:
+            # Заголовок отдела
+            calls.append((writer.paragraph, (f'Отдел: {department_name}', True, True)))
+
+            # Пропускаем отпуска отделов, которых уже нет в списке
+            while pending is not None and pending[0] < department_id:
+                pending = await anext(rows, None)
+
+            if pending is None or pending[0] != department_id:
+                calls.append((writer.paragraph, ('Нет данных об отпусках.',)))
+            else:
+                calls.append((writer.table_start, (TABLE_HEADERS,)))
+                while pending is not None and pending[0] == department_id:
+                    calls.append((writer.table_row, (pending[1],)))
+                    if len(calls) >= DOCX_STREAM_BATCH:
+                        chunk = await run_in_threadpool(_write_docx_batch, writer, calls)
+                        calls = []
+                        if chunk:
+                            yield chunk
+                    pending = await anext(rows, None)
+                calls.append((writer.table_end, ()))
+
+            # Разделитель между отделами
+            calls.append((writer.page_break, ()))
+            if len(calls) >= DOCX_STREAM_BATCH:
+                chunk = await run_in_threadpool(_write_docx_batch, writer, calls)
+                calls = []
+                if chunk:
+                    yield chunk
+
+    yield await run_in_threadpool(_write_docx_batch, writer, calls, True)
+
+
+async def build_report(
+    db,
+    report_type: str,
+    department_id: Optional[int],
+    year: int,
+    render,
+    version: Optional[int] = None,
+    fmt: str = FORMAT_DOCX,
+):
+    """Получить отчёт из кэша или построить его.
+
+    Кэш проверяется по счётчику изменений, поэтому при попадании запрос
+    отпусков не выполняется. render - корутина, строящая документ в пуле
+    (func, *args) -> bytes. Возвращает (путь к файлу, имя файла для скачивания).
+    """
+    if version is None:
+        version = await get_report_version(db, year, department_id)
+
+    if report_type == REPORT_ALL:
+        filename = report_filename(REPORT_ALL, year, fmt=fmt)
+        path = report_cache.get(REPORT_ALL, None, year, version, fmt)
+        if path is None:
+            departments = await load_departments(db)
+            if fmt == FORMAT_PDF:
+                sections = await load_all_departments_sections(db, year, departments)
+                content = await render(build_all_departments_pdf, year, sections)
+                path = report_cache.put(REPORT_ALL, None, year, version, content, fmt)
+            else:
+                chunks = all_departments_docx_chunks(year, departments)
+                async for _ in report_cache.stream_into(REPORT_ALL, None, year, version, chunks):
+                    pass
+                path = report_cache.path(REPORT_ALL, None, year, version)
+    else:
+        department_name = await get_department_name(db, department_id)
+        filename = report_filename(REPORT_DEPARTMENT, year, department_name, fmt)
+        path = report_cache.get(REPORT_DEPARTMENT, department_id, year, version, fmt)
+        if path is None:
+            rows = await load_department_report(db, department_id, year)
+            build = build_department_pdf if fmt == FORMAT_PDF else build_department_docx
+            content = await render(build, year, department_name, rows)
+            path = report_cache.put(REPORT_DEPARTMENT, department_id, year, version, content, fmt)
+    return path, filename
+
+
+async def open_report(
+    db,
+    report_type: str,
+    department_id: Optional[int],
+    year: int,
+    render,
+    version: Optional[int] = None,
+    fmt: str = FORMAT_DOCX,
+) -> Tuple[BinaryIO, str]:
+    """То же, что build_report, но возвращает открытый файл отчёта.
+
+    Если файл удалили между построением и открытием (записана более новая
+    версия), это промах кэша: отчёт строится заново по текущим данным.
+    """
+    for _ in range(REPORT_CACHE_ATTEMPTS):
+        path, filename = await build_report(db, report_type, department_id, year, render, version, fmt)
+        file = report_cache.open(path)
+        if file is not None:
+            return file, filename
+        version = None
+    raise RuntimeError("Отчёт удаляется из кэша быстрее, чем строится")
+
+
+class ReportJobManager:
+    """Задания на формирование отчётов.
+
+    Состояние хранится в таблице report_jobs, поэтому задание видно всем
+    воркерам и не теряется при перезапуске. Задание строит воркер, который
+    держит аренду (lease_until) и продлевает её, пока отчёт строится. Если
+    воркер остановился, аренда истекает и задание забирает воркер, к
+    которому пришёл следующий запрос о нём.
+    """
+
+    def __init__(self, max_jobs: int, lease: float):
+        self.max_jobs = max_jobs
+        self.lease = lease
+        self._tasks: set = set()
+
+    async def get(self, job_id: str) -> Optional[models.ReportJob]:
+        async with AsyncSessionLocal() as db:
+            job = await db.get(models.ReportJob, job_id)
+        if job is not None and not job.finished and job.lease_until < time.time():
+            if await self._claim(job_id):
+                self._start(job_id)
+        return job
+
+    async def submit(self, report_type: str, department_id: Optional[int], year: int, fmt: str = FORMAT_DOCX) -> models.ReportJob:
+        now = time.time()
+        async with AsyncSessionLocal() as db:
+            # Такое же незавершённое задание уже есть — возвращаем его
+            result = await db.execute(
+                select(models.ReportJob)
+                .where(
+                    models.ReportJob.report_type == report_type,
+                    models.ReportJob.department_id.is_(None) if department_id is None
+                    else models.ReportJob.department_id == department_id,
+                    models.ReportJob.year == year,
+                    models.ReportJob.format == fmt,
+                    models.ReportJob.status.in_(UNFINISHED_STATUSES),
+                    models.ReportJob.lease_until >= now,
+                )
+                .order_by(models.ReportJob.created_at.desc())
+                .limit(1)
+            )
+            job = result.scalar_one_or_none()
+            if job is not None:
+                return job
+
+            await self._evict(db)
+            job = models.ReportJob(
+                id=uuid.uuid4().hex,
+                report_type=report_type,
+                department_id=department_id,
+                year=year,
+                format=fmt,
+                status="pending",
+                created_at=datetime.utcnow(),
+                lease_until=now + self.lease,
+            )
+            db.add(job)
+            await db.commit()
+        self._start(job.id)
+        return job
+
+    async def _evict(self, db):
+        # Удаляем самые старые завершённые задания, если их слишком много
+        stale = (
+            select(models.ReportJob.id)
+            .where(models.ReportJob.status.in_(FINISHED_STATUSES))
+            .order_by(models.ReportJob.created_at.desc())
+            .offset(max(self.max_jobs - 1, 0))
+        )
+        await db.execute(delete(models.ReportJob).where(models.ReportJob.id.in_(stale)))
+
+    async def _claim(self, job_id: str) -> bool:
+        """Забрать задание с истёкшей арендой (из двух воркеров его получит один)"""
+        now = time.time()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(models.ReportJob)
+                .where(
+                    models.ReportJob.id == job_id,
+                    models.ReportJob.status.in_(UNFINISHED_STATUSES),
+                    models.ReportJob.lease_until < now,
+                )
+                .values(status="pending", lease_until=now + self.lease)
+            )
+            await db.commit()
+        return result.rowcount == 1
+
+    async def _update(self, job_id: str, **values):
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(models.ReportJob).where(models.ReportJob.id == job_id).values(**values))
+            await db.commit()
+
+    async def _renew(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await self._update(job_id, lease_until=time.time() + self.lease)
+
+    def _start(self, job_id: str):
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job_id: str):
+        async with AsyncSessionLocal() as db:
+            job = await db.get(models.ReportJob, job_id)
+        await self._update(job_id, status="running")
+        renew = asyncio.create_task(self._renew(job_id))
+        # При остановке воркера (CancelledError) задание остаётся незавершённым
+        # и после окончания аренды достраивается другим воркером
+        try:
+            async with AsyncSessionLocal() as db:
+                path, filename = await build_report(
+                    db, job.report_type, job.department_id, job.year, render_with_retry, fmt=job.format
+                )
+            values = {"status": "done", "path": str(path), "filename": filename}
+        except ReportNotFound as e:
+            values = {"status": "failed", "error": str(e)}
+        except ExecutorBusy:
+            values = {
+                "status": "failed",
+                "error": f"Сервер занят формированием отчётов: очередь не освободилась за "
+                         f"{REPORT_JOB_BUSY_TIMEOUT:g} с, повторите запрос позже",
+            }
+        except Exception as e:
+            values = {"status": "failed", "error": f"Ошибка генерации {job.format.upper()}: {str(e)}"}
+        finally:
+            renew.cancel()
+        await self._update(job_id, finished_at=datetime.utcnow(), **values)
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+report_jobs = ReportJobManager(REPORT_MAX_JOBS, REPORT_JOB_LEASE)
@@ -0,0 +1,121 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Optional
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config.database import AsyncSessionLocal
+from app.utils.invalidation import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+# Тема сообщений об отзыве токенов между воркерами
+REVOCATIONS_TOPIC = "revocations"
+
+
+def _key(token_id) -> Optional[bytes]:
+    """jti/sid (32 шестнадцатеричных символа) хранится в памяти как 16 байт"""
+    try:
+        return bytes.fromhex(token_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class RevocationList:
+    """Отозванные токены (jti) и сессии (sid) в памяти процесса.
+
+    Проверка токена — поиск в словаре, без запроса к базе. Запись нужна
+    только до окончания срока действия: дальше токен отклоняется по exp,
+    поэтому истёкшие записи удаляются по куче сроков. База — источник
+    истины: список загружается при старте и перечитывается, если сообщения
+    шины могли потеряться; новые отзывы приходят через шину.
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._expiry = []
+        self._reload_task = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def is_revoked(self, *token_ids: Optional[str]) -> bool:
+        """Отозван ли хотя бы один из идентификаторов (None — в токене его нет)"""
+        for token_id in token_ids:
+            if token_id is None:
+                continue
+            key = _key(token_id)
+            if key is None or key in self._items:
+                return True
+        return False
+
+    def add(self, token_id: str, expires_at: int):
+        now = time.time()
+        key = _key(token_id)
+        if key is not None and expires_at > now and self._items.get(key, 0) < expires_at:
+            self._items[key] = expires_at
+            heapq.heappush(self._expiry, (expires_at, key))
+        self._purge(now)
+
+    def _purge(self, now: float):
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            if self._items.get(key) == expires_at:
+                del self._items[key]
+
+    async def load(self, db: AsyncSession):
+        """Удалить истёкшие записи из базы и добавить действующие в память"""
+        now = int(time.time())
+        await db.execute(delete(models.RevokedToken).where(models.RevokedToken.expires_at <= now))
+        await db.commit()
+        result = await db.execute(
+            select(models.RevokedToken.jti, models.RevokedToken.expires_at)
+            .where(models.RevokedToken.expires_at > now)
+        )
+        # Записи только добавляются: отзывы, пришедшие во время загрузки, не теряются
+        for token_id, expires_at in result.all():
+            self.add(token_id, expires_at)
+
+    async def reload(self):
+        try:
+            async with AsyncSessionLocal() as db:
+                await self.load(db)
+        except (OSError, SQLAlchemyError) as e:
+            logger.warning("Cannot reload revoked tokens: %s", e)
+
+    def on_invalidation(self, key: Optional[str]):
+        """Обработчик шины: key — "jti:expires_at", None — перечитать список из базы"""
+        if key is not None:
+            token_id, _, expires_at = key.partition(":")
+            if expires_at.isdigit():
+                self.add(token_id, int(expires_at))
+            return
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.get_running_loop().create_task(self.reload())
+
+
+revocation_list = RevocationList()
+
+
+async def revoke_token(db: AsyncSession, token_id: str, expires_at: int) -> bool:
+    """Записать отзыв в транзакции вызывающего (до commit).
+
+    False — идентификатор уже был отозван: вставка атомарна, поэтому
+    из двух одновременных обновлений по одному refresh-токену проходит одно.
+    """
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(models.RevokedToken).values(jti=token_id, expires_at=expires_at)
+    stmt = stmt.on_conflict_do_nothing(index_elements=[models.RevokedToken.jti])
+    result = await db.execute(stmt)
+    return result.rowcount == 1
+
+
+async def publish_revocation(token_id: str, expires_at: int):
+    """Разослать отзыв в этот и остальные воркеры (после commit)"""
+    await invalidation_bus.publish(REVOCATIONS_TOPIC, f"{token_id}:{expires_at}")
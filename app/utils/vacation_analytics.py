@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+
+def merge_periods(periods) -> list:
+    """Объединить пересекающиеся и смежные периоды одного сотрудника"""
+    merged = []
+    for start, end in sorted(periods):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def absence_segments(periods_by_staff: dict, date_from: date, date_to: date) -> list:
+    """Отрезки с постоянным числом отсутствующих: [(начало, конец, число)].
+
+    Заметающая прямая по отсортированным событиям начала (+1) и окончания (-1)
+    отпусков — O(n log n) вместо попарного сравнения отпусков. Периоды одного
+    сотрудника предварительно объединяются, поэтому считаются люди, а не отпуска.
+    """
+    events = {}
+    for periods in periods_by_staff.values():
+        for start, end in merge_periods(periods):
+            start, end = max(start, date_from), min(end, date_to)
+            if start > end:
+                continue
+            events[start] = events.get(start, 0) + 1
+            next_day = end + timedelta(days=1)
+            events[next_day] = events.get(next_day, 0) - 1
+
+    segments = []
+    current, count = date_from, 0
+    for day in sorted(events):
+        if day > current:
+            segments.append((current, day - timedelta(days=1), count))
+            current = day
+        count += events[day]
+    if current <= date_to:
+        segments.append((current, date_to, count))
+    return segments
+
+
+def daily_absence(segments) -> list:
+    """Число отсутствующих по дням: [(дата, число)]"""
+    days = []
+    for start, end, count in segments:
+        for offset in range((end - start).days + 1):
+            days.append((start + timedelta(days=offset), count))
+    return days
+
+
+def peak_intervals(segments):
+    """Максимальное число отсутствующих и интервалы, когда оно достигается"""
+    peak = max((count for _, _, count in segments), default=0)
+    if peak == 0:
+        return 0, []
+    intervals = [(start, end) for start, end, count in segments if count == peak]
+    return peak, intervals
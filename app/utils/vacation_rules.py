@@ -0,0 +1,218 @@
+from datetime import date
+from typing import Iterable, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config.vacations import VACATION_MAX_CONCURRENT_PER_DEPARTMENT
+from app.utils.data_versions import staff_department_id
+from app.utils.vacation_analytics import absence_segments, peak_intervals
+
+
+class VacationConflict(Exception):
+    """Отпуск пересекается с другими отпусками"""
+
+
+def _period(start_date: date, end_date: date) -> str:
+    return f"{start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"
+
+
+def _overlap_message(start_date: date, end_date: date, vacation_id: Optional[int] = None) -> str:
+    suffix = f" (id={vacation_id})" if vacation_id is not None else ""
+    return f"Отпуск пересекается с отпуском {_period(start_date, end_date)}{suffix}"
+
+
+def _department_limit_message(periods_by_staff: dict, start_date: date, end_date: date) -> Optional[str]:
+    """Сообщение, если с новым отпуском в отделе будет отсутствовать больше допустимого"""
+    peak, intervals = peak_intervals(absence_segments(periods_by_staff, start_date, end_date))
+    if peak + 1 <= VACATION_MAX_CONCURRENT_PER_DEPARTMENT:
+        return None
+    return (
+        f"В период {_period(*intervals[0])} в отделе уже отсутствуют {peak} сотр. "
+        f"(допустимо одновременно: {VACATION_MAX_CONCURRENT_PER_DEPARTMENT})"
+    )
+
+
+async def lock_vacation_scope(db: AsyncSession, staff_ids: Iterable[Optional[int]]):
+    """Заблокировать отпуска сотрудников и их отделов до конца транзакции.
+
+    Проверка пересечений и вставка отпуска — разные запросы, поэтому
+    одновременные запросы должны идти по очереди. PostgreSQL: строки
+    сотрудников и их отделов блокируются FOR NO KEY UPDATE. SQLite:
+    пустое изменение сразу открывает пишущую транзакцию — очередь писателей
+    и блокировка записи файла держатся до commit, а следующие чтения
+    видят последние данные.
+    """
+    staff_ids = sorted({staff_id for staff_id in staff_ids if staff_id is not None})
+    if not staff_ids:
+        return
+    if db.get_bind().dialect.name == "sqlite":
+        await db.execute(
+            update(models.Staff).where(models.Staff.id == staff_ids[0]).values(id=models.Staff.id)
+        )
+        return
+    # Всегда сначала сотрудники, затем отделы, по возрастанию id — без взаимных блокировок
+    result = await db.execute(
+        select(models.Staff.department_id)
+        .where(models.Staff.id.in_(staff_ids))
+        .order_by(models.Staff.id)
+        .with_for_update(key_share=True)
+    )
+    department_ids = sorted({department_id for department_id in result.scalars() if department_id is not None})
+    if department_ids:
+        await db.execute(
+            select(models.Department_s.id)
+            .where(models.Department_s.id.in_(department_ids))
+            .order_by(models.Department_s.id)
+            .with_for_update(key_share=True)
+        )
+
+
+async def check_vacation_conflicts(
+    db: AsyncSession,
+    staff_id: Optional[int],
+    start_date: date,
+    end_date: date,
+    exclude_id: Optional[int] = None,
+):
+    """Проверить, что отпуск не пересекается с отпусками сотрудника
+    и не превышает лимит одновременно отсутствующих в отделе.
+
+    Пересечения ищутся диапазонным запросом по индексу
+    (staff_id, start_date, end_date), отпуска сотрудника целиком не загружаются.
+    Проверка блокирует сотрудника и отдел до конца транзакции (lock_vacation_scope),
+    поэтому вызывается непосредственно перед записью отпуска.
+    """
+    if staff_id is None:
+        return
+    await lock_vacation_scope(db, [staff_id])
+
+    overlap = select(
+        models.VacationSchedule.id,
+        models.VacationSchedule.start_date,
+        models.VacationSchedule.end_date
+    ).where(
+        models.VacationSchedule.staff_id == staff_id,
+        models.VacationSchedule.start_date <= end_date,
+        models.VacationSchedule.end_date >= start_date
+    )
+    if exclude_id is not None:
+        overlap = overlap.where(models.VacationSchedule.id != exclude_id)
+    conflict = (await db.execute(overlap.limit(1))).first()
+    if conflict is not None:
+        raise VacationConflict(_overlap_message(conflict.start_date, conflict.end_date, conflict.id))
+
+    if VACATION_MAX_CONCURRENT_PER_DEPARTMENT <= 0:
+        return
+    department_id = await staff_department_id(db, staff_id)
+    if department_id is None:
+        return
+
+    # Отпуска остальных сотрудников отдела, пересекающие период
+    others = (
+        select(
+            models.VacationSchedule.staff_id,
+            models.VacationSchedule.start_date,
+            models.VacationSchedule.end_date
+        )
+        .join(models.Staff)
+        .where(
+            models.Staff.department_id == department_id,
+            models.VacationSchedule.staff_id != staff_id,
+            models.VacationSchedule.start_date <= end_date,
+            models.VacationSchedule.end_date >= start_date
+        )
+    )
+    # Отпуск, переданный другому сотруднику, не должен учитываться как отсутствие прежнего
+    if exclude_id is not None:
+        others = others.where(models.VacationSchedule.id != exclude_id)
+    result = await db.execute(others)
+    periods_by_staff = {}
+    for other_id, other_start, other_end in result.all():
+        periods_by_staff.setdefault(other_id, []).append((other_start, other_end))
+
+    message = _department_limit_message(periods_by_staff, start_date, end_date)
+    if message:
+        raise VacationConflict(message)
+
+
+class VacationBatchChecker:
+    """Те же проверки, что в check_vacation_conflicts, для пакета отпусков.
+
+    Существующие отпуска затронутых сотрудников (и их отделов, если задан лимит)
+    загружаются заранее двумя запросами, дальше каждая строка проверяется
+    в памяти — и против базы, и против уже принятых строк пакета.
+    """
+
+    def __init__(self, staff_department: dict):
+        # {id сотрудника: department_id}
+        self._staff_department = staff_department
+        # {id сотрудника: [(начало, конец, id отпуска)]}
+        self._staff_periods = {}
+        # {id отдела: {id сотрудника: [(начало, конец)]}}
+        self._department_periods = {}
+
+    async def load(self, db: AsyncSession, date_from: date, date_to: date):
+        if not self._staff_department:
+            return
+        result = await db.execute(
+            select(
+                models.VacationSchedule.staff_id,
+                models.VacationSchedule.start_date,
+                models.VacationSchedule.end_date,
+                models.VacationSchedule.id
+            ).where(
+                models.VacationSchedule.staff_id.in_(self._staff_department),
+                models.VacationSchedule.start_date <= date_to,
+                models.VacationSchedule.end_date >= date_from
+            )
+        )
+        for staff_id, start_date, end_date, vacation_id in result.all():
+            self._staff_periods.setdefault(staff_id, []).append((start_date, end_date, vacation_id))
+
+        department_ids = {value for value in self._staff_department.values() if value is not None}
+        if VACATION_MAX_CONCURRENT_PER_DEPARTMENT <= 0 or not department_ids:
+            return
+        result = await db.execute(
+            select(
+                models.Staff.department_id,
+                models.VacationSchedule.staff_id,
+                models.VacationSchedule.start_date,
+                models.VacationSchedule.end_date
+            )
+            .join(models.Staff)
+            .where(
+                models.Staff.department_id.in_(department_ids),
+                models.VacationSchedule.start_date <= date_to,
+                models.VacationSchedule.end_date >= date_from
+            )
+        )
+        for department_id, staff_id, start_date, end_date in result.all():
+            self._department_periods.setdefault(department_id, {}).setdefault(staff_id, []).append(
+                (start_date, end_date)
+            )
+
+    def check(self, staff_id: int, start_date: date, end_date: date) -> Optional[str]:
+        """Сообщение о конфликте или None"""
+        for other_start, other_end, vacation_id in self._staff_periods.get(staff_id, ()):
+            if other_start <= end_date and other_end >= start_date:
+                return _overlap_message(other_start, other_end, vacation_id)
+
+        department_id = self._staff_department.get(staff_id)
+        if VACATION_MAX_CONCURRENT_PER_DEPARTMENT <= 0 or department_id is None:
+            return None
+        others = {
+            other_id: periods
+            for other_id, periods in self._department_periods.get(department_id, {}).items()
+            if other_id != staff_id
+        }
+        return _department_limit_message(others, start_date, end_date)
+
+    def accept(self, staff_id: int, start_date: date, end_date: date):
+        """Учесть принятую строку в проверках следующих строк"""
+        self._staff_periods.setdefault(staff_id, []).append((start_date, end_date, None))
+        department_id = self._staff_department.get(staff_id)
+        if department_id is not None:
+            self._department_periods.setdefault(department_id, {}).setdefault(staff_id, []).append(
+                (start_date, end_date)
+            )
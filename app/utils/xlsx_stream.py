@@ -0,0 +1,174 @@
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+from app.utils.docx_stream import ChunkBuffer
+
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+# Стили: 0 — обычная ячейка, 1 — шапка; далее по стилю на каждый цвет заливки
+HEADER_STYLE = 1
+
+
+def column_letter(index: int) -> str:
+    """Буквенное имя колонки по индексу (0 -> A)"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class StreamingXlsxWriter:
+    """Потоковая запись XLSX с одним листом.
+
+    Строки пишутся в sheet1.xml сразу и сжимаются по мере записи, поэтому
+    память не зависит от числа строк. Стили заливки копятся по ходу записи,
+    а styles.xml пишется в архив последним.
+    """
+
+    def __init__(self, sheet_name: str, column_widths, freeze_rows: int = 0, freeze_cols: int = 0):
+        self._buffer = ChunkBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, mode="w", compression=zipfile.ZIP_DEFLATED)
+        self._zip.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+        self._zip.writestr("_rels/.rels", ROOT_RELS_XML)
+        self._zip.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS_XML)
+        self._zip.writestr(
+            "xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets>'
+            f'<sheet name={quoteattr(sheet_name[:31])} sheetId="1" r:id="rId1"/>'
+            '</sheets></workbook>'
+        )
+        self._fills = {}
+        self._row_index = 0
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True)
+        self._write(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+        )
+        if freeze_rows or freeze_cols:
+            cell = f"{column_letter(freeze_cols)}{freeze_rows + 1}"
+            split = (f' xSplit="{freeze_cols}"' if freeze_cols else "") + (f' ySplit="{freeze_rows}"' if freeze_rows else "")
+            self._write(
+                f'<sheetViews><sheetView workbookViewId="0"><pane{split} topLeftCell="{cell}" '
+                'activePane="bottomRight" state="frozen"/></sheetView></sheetViews>'
+            )
+        cols = "".join(
+            f'<col min="{index}" max="{index}" width="{width}" customWidth="1"/>'
+            for index, width in enumerate(column_widths, start=1)
+        )
+        self._write(f"<cols>{cols}</cols><sheetData>")
+
+    def _write(self, xml: str):
+        self._sheet.write(xml.encode("utf-8"))
+
+    def take(self) -> bytes:
+        """Забрать накопленные байты архива"""
+        return self._buffer.take()
+
+    def fill_style(self, color: str) -> int:
+        """Индекс стиля с заливкой цветом RRGGBB"""
+        color = color.upper()
+        if color not in self._fills:
+            self._fills[color] = HEADER_STYLE + 1 + len(self._fills)
+        return self._fills[color]
+
+    def row(self, cells):
+        """Записать строку.
+
+        cells - пары (индекс колонки, значение) или тройки (колонка, значение,
+        стиль) по возрастанию колонки; значение None даёт пустую ячейку со стилем.
+        """
+        self._row_index += 1
+        parts = [f'<row r="{self._row_index}">']
+        for cell in cells:
+            column, value = cell[0], cell[1]
+            style = cell[2] if len(cell) > 2 else 0
+            ref = f"{column_letter(column)}{self._row_index}"
+            style_attr = f' s="{style}"' if style else ""
+            if value is None:
+                parts.append(f'<c r="{ref}"{style_attr}/>')
+            elif isinstance(value, (int, float)):
+                parts.append(f'<c r="{ref}"{style_attr}><v>{value}</v></c>')
+            else:
+                parts.append(
+                    f'<c r="{ref}"{style_attr} t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+                )
+        parts.append("</row>")
+        self._write("".join(parts))
+
+    def _styles_xml(self) -> str:
+        fills = "".join(
+            f'<fill><patternFill patternType="solid"><fgColor rgb="FF{color}"/><bgColor indexed="64"/></patternFill></fill>'
+            for color in self._fills
+        )
+        fill_xfs = "".join(
+            f'<xf numFmtId="0" fontId="0" fillId="{2 + index}" borderId="1" xfId="0" applyFill="1" applyBorder="1" applyAlignment="1">'
+            '<alignment horizontal="center"/></xf>'
+            for index in range(len(self._fills))
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<styleSheet xmlns="{MAIN_NS}">'
+            '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+            '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+            f'<fills count="{2 + len(self._fills)}"><fill><patternFill patternType="none"/></fill>'
+            f'<fill><patternFill patternType="gray125"/></fill>{fills}</fills>'
+            '<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border>'
+            '<border><left style="thin"><color rgb="FFD9D9D9"/></left><right style="thin"><color rgb="FFD9D9D9"/></right>'
+            '<top style="thin"><color rgb="FFD9D9D9"/></top><bottom style="thin"><color rgb="FFD9D9D9"/></bottom>'
+            '<diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            f'<cellXfs count="{2 + len(self._fills)}">'
+            '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1" applyAlignment="1">'
+            '<alignment horizontal="center"/></xf>'
+            f'{fill_xfs}</cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            '</styleSheet>'
+        )
+
+    def close(self) -> bytes:
+        """Завершить лист, записать стили и вернуть оставшиеся байты архива"""
+        self._write("</sheetData></worksheet>")
+        self._sheet.close()
+        self._zip.writestr("xl/styles.xml", self._styles_xml())
+        self._zip.close()
+        return self.take()
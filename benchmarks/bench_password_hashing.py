@@ -0,0 +1,73 @@
+"""Нагрузочный тест входа: проверка bcrypt в цикле событий против пула потоков.
+
+Одновременно приходит пачка входов (как в начале смены), параллельно идут
+лёгкие запросы — их задержка показывает, насколько bcrypt блокирует цикл
+событий. База не используется: измеряется только проверка пароля.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_password_hashing
+"""
+import asyncio
+import statistics
+import time
+
+from app.config.security import PASSWORD_HASH_WORKERS, get_password_hash, verify_password
+from app.utils.password import password_executor, verify_password_async
+
+LOGINS = 48
+# Период лёгких запросов, секунды
+TICK = 0.01
+
+PASSWORD = "correct horse battery staple"
+
+
+async def blocking_login(hashed: str) -> bool:
+    return verify_password(PASSWORD, hashed)
+
+
+async def pooled_login(hashed: str) -> bool:
+    return await verify_password_async(PASSWORD, hashed)
+
+
+async def light_requests(done: asyncio.Event, delays: list):
+    """Имитация лёгких запросов: насколько позже запланированного они выполняются"""
+    while not done.is_set():
+        planned = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        delays.append(max(time.perf_counter() - planned, 0.0))
+
+
+async def run_mode(login, hashed: str) -> dict:
+    delays = []
+    done = asyncio.Event()
+    ticker = asyncio.create_task(light_requests(done, delays))
+    await asyncio.sleep(TICK * 2)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login(hashed) for _ in range(LOGINS)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker
+    assert all(results)
+    return {
+        "elapsed": elapsed,
+        "p50": statistics.median(delays) * 1000 if delays else 0.0,
+        "max": max(delays) * 1000 if delays else 0.0,
+    }
+
+
+def main():
+    hashed = get_password_hash(PASSWORD)
+    print(f"входов: {LOGINS}, потоков bcrypt: {PASSWORD_HASH_WORKERS}")
+    print(f"{'режим':<20} {'время, с':>9} {'входов/с':>9} {'задержка p50, мс':>17} {'max, мс':>9}")
+    for title, login in (("в цикле событий", blocking_login), ("пул потоков", pooled_login)):
+        stats = asyncio.run(run_mode(login, hashed))
+        print(
+            f"{title:<20} {stats['elapsed']:>9.2f} {LOGINS / stats['elapsed']:>9.1f} "
+            f"{stats['p50']:>17.1f} {stats['max']:>9.1f}"
+        )
+    print("пул:", password_executor.stats())
+    password_executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
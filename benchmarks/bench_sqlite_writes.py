@@ -0,0 +1,109 @@
+"""Нагрузочный тест записи в SQLite: режим по умолчанию против WAL + PRAGMA + очереди писателей.
+
+Несколько одновременных "запросов" создают отпуска (INSERT + обновление версии
+отчётов, как в create_vacation_schedule), параллельно идут чтения графика.
+Каждый режим работает со своей временной базой.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_sqlite_writes
+"""
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import select, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.config.database import Base
+from app.config.sqlite import configure_sqlite_engine
+from app.utils.data_versions import bump_report_versions
+
+WRITERS = 32
+WRITES_PER_WRITER = 25
+READERS = 8
+STAFF = 200
+
+
+async def prepare(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as db:
+        db.add(models.Department_s(id=1, name="Отдел"))
+        db.add_all(
+            models.Staff(id=i, last_name=f"Иванов{i}", first_name="Иван", hire_date=date(2020, 1, 1), department_id=1)
+            for i in range(1, STAFF + 1)
+        )
+        await db.commit()
+
+
+async def writer(factory, number: int, stats: dict):
+    for i in range(WRITES_PER_WRITER):
+        staff_id = (number * WRITES_PER_WRITER + i) % STAFF + 1
+        async with factory() as db:
+            try:
+                db.add(models.VacationSchedule(
+                    staff_id=staff_id,
+                    start_date=date(2025, 1 + i % 12, 1),
+                    end_date=date(2025, 1 + i % 12, 14),
+                    main_vacation_days=14,
+                ))
+                await bump_report_versions(db, [1], {2025})
+                await db.commit()
+                stats["ok"] += 1
+            except OperationalError:
+                await db.rollback()
+                stats["locked"] += 1
+
+
+async def reader(factory, done: asyncio.Event, stats: dict):
+    while not done.is_set():
+        async with factory() as db:
+            await db.execute(
+                select(models.Staff.id, func.count(models.VacationSchedule.id))
+                .join(models.VacationSchedule, isouter=True)
+                .group_by(models.Staff.id)
+            )
+        stats["reads"] += 1
+        await asyncio.sleep(0)
+
+
+async def run_mode(tuned: bool) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        # Таймаут ожидания блокировки как у sqlite3 по умолчанию — 5 с
+        engine = create_async_engine(url, connect_args={"timeout": 5})
+        if tuned:
+            configure_sqlite_engine(engine, single_writer=True)
+        factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        await prepare(engine)
+
+        stats = {"ok": 0, "locked": 0, "reads": 0}
+        done = asyncio.Event()
+        readers = [asyncio.create_task(reader(factory, done, stats)) for _ in range(READERS)]
+        started = time.perf_counter()
+        await asyncio.gather(*(writer(factory, number, stats) for number in range(WRITERS)))
+        stats["elapsed"] = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*readers)
+        await engine.dispose()
+        return stats
+
+
+def main():
+    print(f"писателей: {WRITERS} x {WRITES_PER_WRITER} транзакций, читателей: {READERS}")
+    print(f"{'режим':<28} {'успешно':>8} {'locked':>7} {'время, с':>9} {'записей/с':>10} {'чтений':>7}")
+    for title, tuned in (("по умолчанию", False), ("WAL + PRAGMA + очередь", True)):
+        stats = asyncio.run(run_mode(tuned))
+        print(
+            f"{title:<28} {stats['ok']:>8} {stats['locked']:>7} {stats['elapsed']:>9.2f} "
+            f"{stats['ok'] / stats['elapsed']:>10.0f} {stats['reads']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
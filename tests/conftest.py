@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+# Отдельная временная база и транспорт шины в памяти — до импорта приложения
+_TEST_DIR = tempfile.mkdtemp(prefix="vacation_tests_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_TEST_DIR, 'test.db')}"
+os.environ["DB_ECHO"] = "false"
+os.environ["INVALIDATION_BACKEND"] = "memory"
+os.environ["LOGIN_RATE_LIMIT_BACKEND"] = "memory"
+
+import pytest
+
+from app.config.database import AsyncSessionLocal, Base, async_engine
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    """Сессия с чистыми таблицами для каждого теста"""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        yield session
+    # Соединения пула привязаны к циклу событий теста
+    await async_engine.dispose()
@@ -0,0 +1,30 @@
+import pytest
+
+from app import models
+from app.utils.dictionaries import DEPARTMENTS, DICTIONARY_MODELS, RANKS, DictionaryCache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_covering_reloads_record_added_outside_api(db):
+    db.add(models.Department_s(id=1, name="АХО"))
+    db.add(models.Rank_s(id=1, name="Секретарь"))
+    await db.commit()
+    cache = DictionaryCache(DICTIONARY_MODELS)
+    assert await cache.get(db, DEPARTMENTS, db_version=1) == {1: "АХО"}
+
+    # Отдел добавлен в базу без сброса кэша этого воркера
+    db.add(models.Department_s(id=2, name="Кадры"))
+    await db.commit()
+    assert 2 not in await cache.get(db, DEPARTMENTS, db_version=1)
+
+    names = await cache.get_many_covering(db, {DEPARTMENTS: [2, None], RANKS: [1]}, db_version=1)
+    assert names == {DEPARTMENTS: {1: "АХО", 2: "Кадры"}, RANKS: {1: "Секретарь"}}
+    # Перечитанный справочник остаётся в кэше
+    assert await cache.get(db, DEPARTMENTS, db_version=1) == {1: "АХО", 2: "Кадры"}
+
+
+async def test_covering_missing_id_is_not_an_error(db):
+    cache = DictionaryCache(DICTIONARY_MODELS)
+    names = await cache.get_many_covering(db, {DEPARTMENTS: [5]})
+    assert names[DEPARTMENTS].get(5) is None
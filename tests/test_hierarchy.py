@@ -0,0 +1,110 @@
+import pytest
+from sqlalchemy import delete, select
+
+from app import models
+from app.utils.hierarchy import (
+    HierarchyCycle,
+    add_staff_node,
+    check_supervisor,
+    move_staff_node,
+    rebuild_staff_hierarchy,
+    remove_staff_node,
+)
+
+pytestmark = pytest.mark.anyio
+
+# Дерево: 1 -> 2 -> 3 -> 4, 2 -> 5; отдельный корень 6 -> 7
+TREE = {1: None, 2: 1, 3: 2, 4: 3, 5: 2, 6: None, 7: 6}
+
+
+async def _closure(db) -> set:
+    result = await db.execute(
+        select(
+            models.StaffHierarchy.ancestor_id,
+            models.StaffHierarchy.descendant_id,
+            models.StaffHierarchy.depth,
+        )
+    )
+    return set(result.all())
+
+
+async def _rebuilt_closure(db) -> set:
+    """Таблица замыкания, пересобранная с нуля из supervisor_id"""
+    await rebuild_staff_hierarchy(db)
+    return await _closure(db)
+
+
+async def _set_supervisor(db, staff_id: int, supervisor_id):
+    staff = await db.get(models.Staff, staff_id)
+    staff.supervisor_id = supervisor_id
+    await db.flush()
+
+
+@pytest.fixture
+async def tree(db):
+    for staff_id, supervisor_id in TREE.items():
+        db.add(models.Staff(id=staff_id, last_name=f"Staff {staff_id}", supervisor_id=supervisor_id))
+        await db.flush()
+        await add_staff_node(db, staff_id, supervisor_id)
+    await db.commit()
+    return db
+
+
+async def test_add_builds_all_paths(tree):
+    closure = await _closure(tree)
+    assert (1, 4, 3) in closure
+    assert (2, 5, 1) in closure
+    assert (6, 7, 1) in closure
+    assert not any(ancestor == 6 and descendant == 4 for ancestor, descendant, _ in closure)
+    assert closure == await _rebuilt_closure(tree)
+
+
+async def test_move_subtree(tree):
+    # Поддерево 3 -> 4 переходит к 7
+    await _set_supervisor(tree, 3, 7)
+    await move_staff_node(tree, 3, 7)
+    closure = await _closure(tree)
+
+    assert (7, 3, 1) in closure
+    assert (6, 4, 3) in closure
+    assert (3, 4, 1) in closure
+    # Прежние начальники поддерева его больше не видят
+    assert not any(ancestor in (1, 2) and descendant in (3, 4) for ancestor, descendant, _ in closure)
+    assert (2, 5, 1) in closure
+    assert closure == await _rebuilt_closure(tree)
+
+
+async def test_move_subtree_to_root(tree):
+    await _set_supervisor(tree, 2, None)
+    await move_staff_node(tree, 2, None)
+    closure = await _closure(tree)
+
+    assert not any(ancestor == 1 and descendant != 1 for ancestor, descendant, _ in closure)
+    assert (2, 4, 2) in closure
+    assert closure == await _rebuilt_closure(tree)
+
+
+async def test_move_under_own_subordinate_is_rejected(tree):
+    with pytest.raises(HierarchyCycle):
+        await check_supervisor(tree, 2, 4)
+    with pytest.raises(HierarchyCycle):
+        await check_supervisor(tree, 2, 2)
+    await check_supervisor(tree, 2, 7)
+
+
+async def test_remove_mid_level_node(tree):
+    await remove_staff_node(tree, 2)
+    await tree.commit()
+    closure = await _closure(tree)
+
+    assert not any(2 in (ancestor, descendant) for ancestor, descendant, _ in closure)
+    # Прямые подчинённые становятся корнями, их поддеревья сохраняются
+    assert not any(ancestor == 1 and descendant != 1 for ancestor, descendant, _ in closure)
+    assert (3, 4, 1) in closure
+    assert (5, 5, 0) in closure
+    result = await tree.execute(select(models.Staff.id).where(models.Staff.supervisor_id.is_(None)))
+    assert set(result.scalars()) == {1, 3, 5, 6}
+
+    # Без удалённого сотрудника таблица совпадает с пересобранной из supervisor_id
+    await tree.execute(delete(models.Staff).where(models.Staff.id == 2))
+    assert closure == await _rebuilt_closure(tree)
@@ -0,0 +1,121 @@
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import delete, select
+
+from app import models
+from app.utils.pagination import (
+    NEXT_CURSOR_HEADER,
+    TOTAL_COUNT_HEADER,
+    Page,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+)
+
+
+async def _page(db, limit: int, cursor=None, **options):
+    response = Response()
+    page = Page(limit=limit, after_id=decode_cursor(cursor) if cursor else None, **options)
+    items = await paginate(db, select(models.Staff), models.Staff.id, page, response)
+    return [item.id for item in items], response.headers.get(NEXT_CURSOR_HEADER), response
+
+
+async def _walk(db, limit: int) -> list:
+    """Все страницы по курсорам: [[id страницы]]"""
+    pages, cursor = [], None
+    while True:
+        ids, cursor, _ = await _page(db, limit, cursor)
+        pages.append(ids)
+        if cursor is None:
+            return pages
+
+
+@pytest.fixture
+async def staff(db):
+    # Пропуски в id и одинаковые фамилии: порядок задаёт только уникальный ключ
+    for staff_id in (1, 2, 3, 5, 8, 9, 10):
+        db.add(models.Staff(id=staff_id, last_name="Иванов" if staff_id % 2 else "Петров"))
+    await db.commit()
+    return db
+
+
+def test_cursor_round_trip():
+    for last_id in (0, 1, 2 ** 40):
+        assert decode_cursor(encode_cursor(last_id)) == last_id
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(1)[:-2], "eyJpZCI6ICIxIn0", "W10"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_pages_cover_all_rows_once(staff):
+    assert await _walk(staff, 3) == [[1, 2, 3], [5, 8, 9], [10]]
+    assert await _walk(staff, 1) == [[1], [2], [3], [5], [8], [9], [10]]
+
+
+@pytest.mark.anyio
+async def test_no_cursor_after_exactly_full_last_page(staff):
+    ids, cursor, _ = await _page(staff, 7)
+    assert ids == [1, 2, 3, 5, 8, 9, 10]
+    assert cursor is None
+    assert await _walk(staff, 4) == [[1, 2, 3, 5], [8, 9, 10]]
+
+
+@pytest.mark.anyio
+async def test_cursor_boundaries(staff):
+    # Курсор — последний id страницы, следующая начинается строго после него
+    assert (await _page(staff, 2, encode_cursor(3)))[0] == [5, 8]
+    # id курсора может отсутствовать (запись удалена) — страница продолжается со следующей
+    assert (await _page(staff, 2, encode_cursor(4)))[0] == [5, 8]
+    assert (await _page(staff, 2, encode_cursor(0)))[0] == [1, 2]
+    ids, cursor, _ = await _page(staff, 2, encode_cursor(10))
+    assert ids == []
+    assert cursor is None
+
+
+@pytest.mark.anyio
+async def test_changes_during_walk_do_not_shift_pages(staff):
+    ids, cursor, _ = await _page(staff, 3)
+    assert ids == [1, 2, 3]
+    await staff.execute(delete(models.Staff).where(models.Staff.id.in_([1, 2])))
+    staff.add(models.Staff(id=4, last_name="Иванов"))
+    staff.add(models.Staff(id=11, last_name="Иванов"))
+    await staff.commit()
+
+    ids, cursor, _ = await _page(staff, 3, cursor)
+    assert ids == [4, 5, 8]
+    ids, cursor, _ = await _page(staff, 3, cursor)
+    assert ids == [9, 10, 11]
+    assert cursor is None
+
+
+@pytest.mark.anyio
+async def test_total_and_legacy_offset(staff):
+    ids, cursor, response = await _page(staff, 2, skip=5, with_total=True)
+    assert ids == [9, 10]
+    assert cursor is None
+    assert response.headers[TOTAL_COUNT_HEADER] == "7"
+    # Смещение без курсора продолжается курсором
+    ids, cursor, _ = await _page(staff, 2, skip=2)
+    assert ids == [3, 5]
+    assert (await _page(staff, 2, cursor))[0] == [8, 9]
+    # С курсором устаревшее смещение не применяется
+    assert (await _page(staff, 2, encode_cursor(5), skip=2))[0] == [8, 9]
+
+
+def test_page_key_distinguishes_pages():
+    first = Page(limit=2)
+    keys = {
+        first.key(),
+        Page(limit=2, after_id=2).key(),
+        Page(limit=3).key(),
+        Page(limit=2, skip=2).key(),
+        Page(limit=2, with_total=True).key(),
+    }
+    assert len(keys) == 5
+    # Смещение с курсором не применяется и не меняет ключ
+    assert Page(limit=2, after_id=2, skip=4).key() == Page(limit=2, after_id=2).key()
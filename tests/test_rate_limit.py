@@ -0,0 +1,138 @@
+import math
+
+import pytest
+from starlette.requests import Request
+
+from app.config.database import AsyncSessionLocal
+from app.config.rate_limits import LOGIN_LOCKOUT_SECONDS, LOGIN_LOCKOUT_THRESHOLD, LOGIN_PER_IP_BURST, LOGIN_PER_LOGIN_BURST
+from app.utils import rate_limit
+from app.utils.rate_limit import (
+    DatabaseRateLimitStore,
+    LoginRateLimiter,
+    LoginThrottled,
+    MemoryRateLimitStore,
+    RateLimitStore,
+    client_ip,
+    parse_trusted_proxies,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(params=["memory", "database"])
+async def store(request, db):
+    if request.param == "memory":
+        return MemoryRateLimitStore(max_keys=100, failure_ttl=60)
+    return DatabaseRateLimitStore(AsyncSessionLocal, idle_ttl=60, purge_interval=10)
+
+
+async def _taken(store: RateLimitStore, count: int, now: float) -> list:
+    return [await store.take("key", 3, 1.0, now) for _ in range(count)]
+
+
+async def test_bucket_allows_burst_then_waits(store):
+    assert await _taken(store, 4, 0.0) == [0.0, 0.0, 0.0, 1.0]
+    # Отклонённая попытка токен не тратит
+    assert await store.take("key", 3, 1.0, 0.5) == pytest.approx(0.5)
+    assert await store.take("other", 3, 1.0, 0.5) == 0.0
+
+
+async def test_bucket_refill(store):
+    await _taken(store, 3, 0.0)
+    assert await store.take("key", 3, 1.0, 1.0) == 0.0
+    assert await store.take("key", 3, 1.0, 1.0) == pytest.approx(1.0)
+    # Запас не превышает ёмкость корзины
+    assert await _taken(store, 4, 100.0) == [0.0, 0.0, 0.0, 1.0]
+
+
+async def test_bucket_without_refill(store):
+    await store.take("key", 1, 0.0, 0.0)
+    assert await store.take("key", 1, 0.0, 30.0) == math.inf
+
+
+async def test_lockout_and_expiry(store):
+    assert await store.add_failure("key", 3, 10, 60, 0.0) == 0.0
+    assert await store.add_failure("key", 3, 10, 60, 1.0) == 0.0
+    assert await store.add_failure("key", 3, 10, 60, 2.0) == 62.0
+    assert await store.locked_until("key", 61.9) == 62.0
+    assert await store.locked_until("key", 62.0) == 0.0
+    # После блокировки неудачные попытки считаются заново
+    assert await store.add_failure("key", 3, 10, 60, 63.0) == 0.0
+    assert await store.locked_until("key", 63.0) == 0.0
+
+
+async def test_failures_outside_window_do_not_lock(store):
+    for now in (0.0, 1.0, 20.0, 21.0):
+        assert await store.add_failure("key", 3, 10, 60, now) == 0.0
+    assert await store.add_failure("key", 3, 10, 60, 22.0) == 82.0
+
+
+async def test_clear_failures(store):
+    await store.add_failure("key", 3, 10, 60, 0.0)
+    await store.add_failure("key", 3, 10, 60, 1.0)
+    await store.clear_failures("key")
+    assert await store.add_failure("key", 3, 10, 60, 2.0) == 0.0
+    assert await store.locked_until("key", 2.0) == 0.0
+
+
+async def test_memory_store_drops_idle_keys():
+    store = MemoryRateLimitStore(max_keys=2, failure_ttl=60)
+    await store.take("a", 1, 1.0, 0.0)
+    await store.take("b", 1, 1.0, 0.0)
+    # К моменту 10 обе корзины снова полны и удаляются при добавлении ключа
+    await store.take("c", 1, 1.0, 10.0)
+    assert len(store) == 1
+
+
+async def test_limiter_lockout_expires(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: clock[0])
+    limiter = LoginRateLimiter(MemoryRateLimitStore(max_keys=100, failure_ttl=60))
+
+    for _ in range(LOGIN_LOCKOUT_THRESHOLD):
+        await limiter.failed("Ivanov")
+    with pytest.raises(LoginThrottled) as error:
+        await limiter.check("ivanov ", "10.0.0.1")
+    assert error.value.retry_after == pytest.approx(LOGIN_LOCKOUT_SECONDS)
+
+    clock[0] += LOGIN_LOCKOUT_SECONDS
+    await limiter.check("ivanov", "10.0.0.1")
+
+
+async def test_limiter_login_bucket(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: clock[0])
+    limiter = LoginRateLimiter(MemoryRateLimitStore(max_keys=100, failure_ttl=60))
+
+    for index in range(LOGIN_PER_LOGIN_BURST):
+        await limiter.check("ivanov", f"10.0.0.{index}")
+    with pytest.raises(LoginThrottled):
+        await limiter.check("ivanov", "10.0.1.1")
+    # Другой логин с того же адреса не ограничен
+    await limiter.check("petrov", "10.0.1.1")
+
+
+async def test_limiter_without_client_address(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: clock[0])
+    limiter = LoginRateLimiter(MemoryRateLimitStore(max_keys=100, failure_ttl=60))
+
+    # Запросы без адреса не делят общую корзину на IP, действует только корзина логина
+    for index in range(LOGIN_PER_IP_BURST + 1):
+        await limiter.check(f"user{index}", None)
+    assert len(limiter.store) == LOGIN_PER_IP_BURST + 1
+
+
+def _request(peer: str, forwarded=None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (peer, 1234), "headers": headers})
+
+
+def test_client_ip_uses_trusted_forwarded_for():
+    trusted = parse_trusted_proxies("10.0.0.0/8, 192.168.1.1")
+    assert client_ip(_request("203.0.113.5", "1.2.3.4"), trusted) == "203.0.113.5"
+    assert client_ip(_request("10.0.0.2", "1.2.3.4"), trusted) == "1.2.3.4"
+    # Левая часть заголовка задаётся клиентом и не используется
+    assert client_ip(_request("10.0.0.2", "6.6.6.6, 1.2.3.4, 192.168.1.1"), trusted) == "1.2.3.4"
+    assert client_ip(_request("10.0.0.2"), trusted) == "10.0.0.2"
+    assert client_ip(_request("10.0.0.2", "1.2.3.4"), ()) == "10.0.0.2"
@@ -0,0 +1,99 @@
+import pytest
+from fastapi import HTTPException
+
+from app import models
+from app.config.security import decode_access_token
+from app.utils import auth, revocation
+from app.utils.auth import authenticate_token, issue_tokens, load_principal, principal_cache, refresh_tokens, revoke_session
+from app.utils.invalidation import InvalidationBus
+from app.utils.revocation import REVOCATIONS_TOPIC, RevocationList
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def revocations(monkeypatch):
+    """Свой список отзывов, получающий отзывы через шину, как после старта приложения"""
+    revocations = RevocationList()
+    bus = InvalidationBus()
+    bus.subscribe(REVOCATIONS_TOPIC, revocations.on_invalidation)
+    monkeypatch.setattr(revocation, "invalidation_bus", bus)
+    monkeypatch.setattr(auth, "revocation_list", revocations)
+    return revocations
+
+
+@pytest.fixture
+async def principal(db, revocations):
+    db.add(models.Role_s(id=1, name="work"))
+    db.add(models.Staff(id=1, last_name="Иванов"))
+    await db.flush()
+    db.add(models.User(id=1, login="ivanov", password="-", id_role_s=1, id_staff=1, is_active=True))
+    await db.commit()
+    principal_cache.invalidate()
+    return await load_principal(db, 1)
+
+
+async def _rejected(call):
+    with pytest.raises(HTTPException) as error:
+        await call
+    assert error.value.status_code == 401
+
+
+async def test_refresh_rotates_tokens(db, principal):
+    tokens = issue_tokens(principal)
+    rotated = await refresh_tokens(db, tokens["refresh_token"])
+
+    old, new = decode_access_token(tokens["refresh_token"]), decode_access_token(rotated["refresh_token"])
+    assert new["sid"] == old["sid"]
+    assert new["jti"] != old["jti"]
+    assert (await authenticate_token(db, rotated["access_token"]))[0] == principal
+    # Новый refresh-токен тоже обменивается
+    await refresh_tokens(db, rotated["refresh_token"])
+
+
+async def test_access_token_is_not_a_refresh_token(db, principal):
+    tokens = issue_tokens(principal)
+    await _rejected(refresh_tokens(db, tokens["access_token"]))
+    await _rejected(refresh_tokens(db, "not-a-token"))
+
+
+async def test_reused_refresh_token_revokes_session(db, principal, revocations):
+    tokens = issue_tokens(principal)
+    rotated = await refresh_tokens(db, tokens["refresh_token"])
+
+    # Повторное предъявление обменянного токена
+    await _rejected(refresh_tokens(db, tokens["refresh_token"]))
+
+    session_id = decode_access_token(tokens["refresh_token"])["sid"]
+    assert revocations.is_revoked(session_id)
+    # Токены, выданные в сессии после ротации, тоже больше не действуют
+    await _rejected(authenticate_token(db, rotated["access_token"]))
+    await _rejected(refresh_tokens(db, rotated["refresh_token"]))
+
+    # Другая сессия того же пользователя не затронута
+    other = issue_tokens(principal)
+    await refresh_tokens(db, other["refresh_token"])
+
+
+async def test_reuse_is_detected_by_database(db, principal, monkeypatch):
+    """Токен обменян в другом воркере: в памяти отзыва нет, но вставка в базу не проходит"""
+    tokens = issue_tokens(principal)
+    await refresh_tokens(db, tokens["refresh_token"])
+
+    restarted = RevocationList()
+    revocation.invalidation_bus.subscribe(REVOCATIONS_TOPIC, restarted.on_invalidation)
+    monkeypatch.setattr(auth, "revocation_list", restarted)
+    await _rejected(refresh_tokens(db, tokens["refresh_token"]))
+
+    session_id = decode_access_token(tokens["refresh_token"])["sid"]
+    assert restarted.is_revoked(session_id)
+    # После перезапуска отзыв сессии загружается из базы
+    reloaded = RevocationList()
+    await reloaded.load(db)
+    assert reloaded.is_revoked(session_id)
+
+
+async def test_logout_revokes_refresh_token(db, principal):
+    tokens = issue_tokens(principal)
+    await revoke_session(db, decode_access_token(tokens["refresh_token"])["sid"])
+    await _rejected(refresh_tokens(db, tokens["refresh_token"]))
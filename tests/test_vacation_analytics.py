@@ -0,0 +1,85 @@
+from datetime import date
+
+import pytest
+
+from app import models
+from app.utils import vacation_rules
+from app.utils.vacation_analytics import absence_segments, daily_absence, merge_periods, peak_intervals
+from app.utils.vacation_rules import VacationBatchChecker, VacationConflict, check_vacation_conflicts
+
+
+def d(day: int, month: int = 7) -> date:
+    return date(2025, month, day)
+
+
+def test_merge_periods_joins_overlapping_and_adjacent():
+    periods = [(d(10), d(12)), (d(1), d(5)), (d(6), d(8)), (d(11), d(15)), (d(20), d(21))]
+    assert merge_periods(periods) == [(d(1), d(8)), (d(10), d(15)), (d(20), d(21))]
+
+
+def test_segments_count_people_not_vacations():
+    periods = {
+        1: [(d(1), d(10)), (d(5), d(12))],
+        2: [(d(8), d(9))],
+        3: [(d(11), d(11))],
+    }
+    assert absence_segments(periods, d(1), d(15)) == [
+        (d(1), d(7), 1),
+        (d(8), d(9), 2),
+        (d(10), d(10), 1),
+        (d(11), d(11), 2),
+        (d(12), d(12), 1),
+        (d(13), d(15), 0),
+    ]
+
+
+def test_segments_are_clipped_to_range():
+    periods = {1: [(d(25, 6), d(3))], 2: [(d(30), d(10, 8))], 3: [(d(1, 6), d(5, 6))]}
+    assert absence_segments(periods, d(1), d(31)) == [
+        (d(1), d(3), 1),
+        (d(4), d(29), 0),
+        (d(30), d(31), 1),
+    ]
+
+
+def test_segments_cover_every_day_once():
+    periods = {1: [(d(2), d(4))], 2: [(d(4), d(6))]}
+    days = daily_absence(absence_segments(periods, d(1), d(7)))
+    assert days == [(d(1), 0), (d(2), 1), (d(3), 1), (d(4), 2), (d(5), 1), (d(6), 1), (d(7), 0)]
+
+
+def test_peak_intervals():
+    periods = {1: [(d(1), d(10))], 2: [(d(3), d(4)), (d(8), d(12))], 3: [(d(20), d(25))]}
+    assert peak_intervals(absence_segments(periods, d(1), d(31))) == (2, [(d(3), d(4)), (d(8), d(10))])
+    assert peak_intervals(absence_segments({}, d(1), d(31))) == (0, [])
+
+
+def test_batch_checker_counts_accepted_rows(monkeypatch):
+    monkeypatch.setattr(vacation_rules, "VACATION_MAX_CONCURRENT_PER_DEPARTMENT", 2)
+    checker = VacationBatchChecker({1: 10, 2: 10, 3: 10})
+    assert checker.check(1, d(1), d(10)) is None
+    checker.accept(1, d(1), d(10))
+    assert checker.check(1, d(10), d(12)) is not None
+    assert checker.check(2, d(5), d(15)) is None
+    checker.accept(2, d(5), d(15))
+    # Третий сотрудник отдела 5–10 июля превышает лимит, после 10 июля — нет
+    assert checker.check(3, d(9), d(9)) is not None
+    assert checker.check(3, d(11), d(20)) is None
+
+
+@pytest.mark.anyio
+async def test_department_limit_ignores_excluded_vacation(db, monkeypatch):
+    monkeypatch.setattr(vacation_rules, "VACATION_MAX_CONCURRENT_PER_DEPARTMENT", 1)
+    db.add(models.Department_s(id=1, name="Отдел"))
+    for staff_id in (1, 2):
+        db.add(models.Staff(id=staff_id, last_name=f"Staff {staff_id}", department_id=1))
+    await db.flush()
+    db.add(models.VacationSchedule(id=1, staff_id=1, start_date=d(1), end_date=d(10), main_vacation_days=10))
+    await db.commit()
+
+    with pytest.raises(VacationConflict):
+        await check_vacation_conflicts(db, 2, d(5), d(6))
+    await db.rollback()
+    # Тот же отпуск, переданный сотруднику 2, не конфликтует сам с собой
+    await check_vacation_conflicts(db, 2, d(1), d(10), exclude_id=1)
+    await db.rollback()